@@ -1,14 +1,56 @@
+import asyncio
 import bcrypt
+import logging
+import math
 import re
-from typing import Dict, Optional, List, Any
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, List, Any, Callable
 from Back.dbManager import execute_query
+from Back.cacheManager import TTLCache, MISSING
+
+logger = logging.getLogger("AccountService")
+
+# --- Coût bcrypt (work factor) ---
+# Ajusté à la machine par calibrate_bcrypt_cost ; les hachages d'un autre coût sont refaits à la connexion.
+DEFAULT_BCRYPT_ROUNDS = 12
+MIN_BCRYPT_ROUNDS = 10
+MAX_BCRYPT_ROUNDS = 16
+DEFAULT_TARGET_HASH_MS = 250.0
+
+_bcrypt_rounds: int = DEFAULT_BCRYPT_ROUNDS
+
+# --- Cache des lectures de comptes ---
+# Les comptes changent rarement : get_account_by_id et get_all_accounts sont servis depuis
+# la mémoire et invalidés par les fonctions d'écriture de ce module.
+ACCOUNT_CACHE_SIZE = 512
+ACCOUNT_CACHE_TTL = 300.0  # secondes
+_ALL_ACCOUNTS_KEY = ('all',)
+
+_account_cache = TTLCache(maxsize=ACCOUNT_CACHE_SIZE, ttl=ACCOUNT_CACHE_TTL)
+# Incrémentée à chaque invalidation : une lecture lancée avant une écriture ne remplit pas le cache
+_account_version = 0
+
+# --- Exécuteur dédié au hachage ---
+# bcrypt bloque le thread appelant (~100-300 ms par appel) : les appels sont déportés
+# sur un pool de threads borné pour ne pas figer la boucle asyncio.
+DEFAULT_HASH_WORKERS = 4
+
+_hash_executor: Optional[ThreadPoolExecutor] = None
+_hash_metrics: Dict[str, Any] = {
+    "appels": 0,
+    "en_cours": 0,
+    "attente_totale_ms": 0.0,
+    "attente_max_ms": 0.0,
+    "execution_totale_ms": 0.0,
+}
 
 
 # --- Fonctions de Hachage et Vérification (Synchrones) ---
 
 def hash_password(password: str) -> str:
-    """Hache le mot de passe en utilisant bcrypt et le retourne en chaîne de caractères."""
-    hashed_bytes = bcrypt.hashpw(password.encode('utf8'), bcrypt.gensalt())
+    """Hache le mot de passe en utilisant bcrypt (coût courant) et le retourne en chaîne de caractères."""
+    hashed_bytes = bcrypt.hashpw(password.encode('utf8'), bcrypt.gensalt(rounds=_bcrypt_rounds))
     return hashed_bytes.decode('utf8')
 
 
@@ -22,6 +64,137 @@ def check_password(password: str, hashed_password: str) -> bool:
         return False
 
 
+# --- Calibration du Coût bcrypt ---
+
+def get_bcrypt_rounds() -> int:
+    """Retourne le coût bcrypt utilisé pour les nouveaux hachages."""
+    return _bcrypt_rounds
+
+
+def set_bcrypt_rounds(rounds: int):
+    """Fixe le coût bcrypt utilisé pour les nouveaux hachages."""
+    global _bcrypt_rounds
+    if not MIN_BCRYPT_ROUNDS <= rounds <= MAX_BCRYPT_ROUNDS:
+        raise ValueError(f"Le coût bcrypt doit être compris entre {MIN_BCRYPT_ROUNDS} et {MAX_BCRYPT_ROUNDS}.")
+    _bcrypt_rounds = rounds
+
+
+def calibrate_bcrypt_cost(target_ms: float = DEFAULT_TARGET_HASH_MS, min_rounds: int = MIN_BCRYPT_ROUNDS,
+                          max_rounds: int = MAX_BCRYPT_ROUNDS) -> int:
+    """
+    Choisit le coût bcrypt le plus élevé dont la durée de hachage reste sous target_ms sur cette machine,
+    puis l'applique. Chaque incrément du coût double la durée : on mesure au coût minimal
+    et on extrapole, ce qui évite de lancer des hachages de plusieurs secondes.
+    """
+    sample = b"calibration-prospectius"
+    salt = bcrypt.gensalt(rounds=min_rounds)
+
+    # Meilleur de trois mesures pour lisser le bruit (démarrage, ordonnanceur)
+    durations = []
+    for _ in range(3):
+        started = time.perf_counter()
+        bcrypt.hashpw(sample, salt)
+        durations.append((time.perf_counter() - started) * 1000)
+    base_ms = max(min(durations), 0.001)
+
+    rounds = min_rounds
+    if target_ms > base_ms:
+        rounds += int(math.floor(math.log2(target_ms / base_ms)))
+    rounds = max(min_rounds, min(rounds, max_rounds))
+
+    set_bcrypt_rounds(rounds)
+    logger.info(f"Coût bcrypt calibré à {rounds} (≈{base_ms * 2 ** (rounds - min_rounds):.0f} ms, cible {target_ms} ms).")
+    return rounds
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    Indique si un hachage stocké utilise un coût inférieur au coût courant (format $2b$<coût>$...).
+    Un coût supérieur n'est jamais abaissé : une calibration à ±1 près ne déclenche pas de rehachage.
+    """
+    try:
+        return int(hashed_password.split('$')[2]) < _bcrypt_rounds
+    except (IndexError, ValueError):
+        return False
+
+
+# --- Exécution Asynchrone du Hachage (hors boucle asyncio) ---
+
+def configure_hash_executor(max_workers: int = DEFAULT_HASH_WORKERS):
+    """
+    (Re)crée l'exécuteur de hachage avec max_workers threads.
+    max_workers borne le nombre de hachages bcrypt exécutés en parallèle ; les suivants attendent.
+    """
+    global _hash_executor
+    if max_workers < 1:
+        raise ValueError("max_workers doit être supérieur ou égal à 1.")
+    if _hash_executor:
+        _hash_executor.shutdown(wait=False)
+    _hash_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+
+
+def shutdown_hash_executor():
+    """Arrête l'exécuteur de hachage (à appeler à la fermeture de l'application)."""
+    global _hash_executor
+    if _hash_executor:
+        _hash_executor.shutdown(wait=True)
+        _hash_executor = None
+
+
+def get_hash_metrics() -> Dict[str, Any]:
+    """Retourne les métriques de l'exécuteur de hachage (temps d'attente en file et d'exécution)."""
+    appels = _hash_metrics["appels"]
+    return {
+        "appels": appels,
+        "en_cours": _hash_metrics["en_cours"],
+        "attente_moyenne_ms": round(_hash_metrics["attente_totale_ms"] / appels, 2) if appels else 0.0,
+        "attente_max_ms": round(_hash_metrics["attente_max_ms"], 2),
+        "execution_moyenne_ms": round(_hash_metrics["execution_totale_ms"] / appels, 2) if appels else 0.0,
+    }
+
+
+async def _run_in_hash_executor(func: Callable, *args) -> Any:
+    """Exécute func(*args) sur l'exécuteur de hachage et enregistre le temps passé en file d'attente."""
+    if _hash_executor is None:
+        configure_hash_executor()
+
+    submitted = time.perf_counter()
+
+    def timed_call():
+        # Exécuté dans le thread : on mesure l'attente avant le démarrage effectif
+        started = time.perf_counter()
+        result = func(*args)
+        return started - submitted, time.perf_counter() - started, result
+
+    _hash_metrics["en_cours"] += 1
+    try:
+        queue_time, run_time, result = await asyncio.get_running_loop().run_in_executor(_hash_executor, timed_call)
+    finally:
+        _hash_metrics["en_cours"] -= 1
+
+    # Mise à jour sur le thread de la boucle uniquement (pas de verrou nécessaire)
+    _hash_metrics["appels"] += 1
+    _hash_metrics["attente_totale_ms"] += queue_time * 1000
+    _hash_metrics["attente_max_ms"] = max(_hash_metrics["attente_max_ms"], queue_time * 1000)
+    _hash_metrics["execution_totale_ms"] += run_time * 1000
+    return result
+
+
+async def hash_password_async(password: str) -> str:
+    """Version non bloquante de hash_password."""
+    return await _run_in_hash_executor(hash_password, password)
+
+
+async def check_password_async(password: str, hashed_password: str) -> bool:
+    """Version non bloquante de check_password."""
+    return await _run_in_hash_executor(check_password, password, hashed_password)
+
+
+async def calibrate_bcrypt_cost_async(target_ms: float = DEFAULT_TARGET_HASH_MS) -> int:
+    """Version non bloquante de calibrate_bcrypt_cost (à lancer au démarrage)."""
+    return await _run_in_hash_executor(calibrate_bcrypt_cost, target_ms)
+
+
 # --- Fonctions de Validation des Données (Python) ---
 
 def validate_account_data(nom: str, prenom: str, email: str, username: str, password: str) -> Optional[str]:
@@ -50,6 +223,29 @@ def validate_account_data(nom: str, prenom: str, email: str, username: str, pass
     return None  # Validation réussie
 
 
+# --- Gestion du Cache des Comptes ---
+
+def get_account_cache_stats() -> Dict[str, Any]:
+    """Retourne les compteurs de succès/échecs du cache des comptes."""
+    return _account_cache.stats()
+
+
+def clear_account_cache():
+    """Vide le cache des comptes (ex: après une modification directe en BDD)."""
+    global _account_version
+    _account_version += 1
+    _account_cache.clear()
+
+
+def _invalidate_account(id_compte: Optional[int] = None):
+    """Invalide la liste des comptes et, si fourni, le compte id_compte."""
+    global _account_version
+    _account_version += 1
+    _account_cache.invalidate(_ALL_ACCOUNTS_KEY)
+    if id_compte is not None:
+        _account_cache.invalidate(('id', id_compte))
+
+
 # --- Fonctions CRUD Asynchrones ---
 
 # C. CREATE (Création de compte)
@@ -62,8 +258,8 @@ async def create_account(nom: str, prenom: str, email: str, username: str, passw
     if validation_error:
         return {"success": False, "message": validation_error}
 
-    # Hachage
-    hashed_pwd = hash_password(password)
+    # Hachage (hors boucle asyncio)
+    hashed_pwd = await hash_password_async(password)
 
     # Requête SQL
     sql = """
@@ -75,6 +271,7 @@ async def create_account(nom: str, prenom: str, email: str, username: str, passw
     try:
         # Exécute la requête (execute_query retourne rowcount pour INSERT)
         await execute_query(sql, params)
+        _invalidate_account()
         # La table Account a un trigger qui gère l'unicité et le compte Admin unique
         return {"success": True, "message": "Compte créé avec succès."}
     except Exception as e:
@@ -85,16 +282,36 @@ async def create_account(nom: str, prenom: str, email: str, username: str, passw
 # R. READ (Lecture et Liste des comptes)
 async def get_account_by_id(id_compte: int) -> Optional[Dict]:
     """Récupère les informations d'un compte (sans le mot de passe)."""
+    cached = _account_cache.get(('id', id_compte))
+    if cached is not MISSING:
+        return dict(cached)  # Copie : l'appelant peut modifier le résultat sans altérer le cache
+
     sql = "SELECT id_compte, nom, prenom, email, username, type_compte, date_creation FROM Account WHERE id_compte = %s"
+    version = _account_version
     # fetch_one=True retourne un dictionnaire (si DictCursor est utilisé)
-    return await execute_query(sql, (id_compte,), fetch_one=True)
+    account = await execute_query(sql, (id_compte,), fetch_one=True)
+    # Un compte absent n'est pas mis en cache, ni un résultat lu pendant une écriture (version changée)
+    if account and version == _account_version:
+        _account_cache.set(('id', id_compte), account)
+    if account:
+        return dict(account)
+    return account
 
 
 async def get_all_accounts() -> List[Dict]:
     """Récupère la liste complète des comptes (sans mot de passe)."""
     sql = "SELECT id_compte, nom, prenom, email, username, type_compte, date_creation FROM Account ORDER BY nom, prenom"
+    cached = _account_cache.get(_ALL_ACCOUNTS_KEY)
+    if cached is not MISSING:
+        return [dict(a) for a in cached]
+
+    version = _account_version
     # fetch_all=True retourne une liste de dictionnaires
-    return await execute_query(sql, fetch_all=True)
+    accounts = await execute_query(sql, fetch_all=True)
+    # Version lue avant la requête : une écriture pendant la lecture rend le résultat obsolète
+    if version == _account_version:
+        _account_cache.set(_ALL_ACCOUNTS_KEY, list(accounts))
+    return [dict(a) for a in accounts]
 
 
 # U. UPDATE (Mise à jour des informations d'un compte)
@@ -123,6 +340,7 @@ async def update_account_info(id_compte: int, fields_to_update: Dict[str, Any])
     try:
         rows_affected = await execute_query(sql, tuple(params))
         if rows_affected > 0:
+            _invalidate_account(id_compte)
             return {"success": True, "message": "Informations du compte mises à jour."}
         return {"success": False, "message": "Compte non trouvé ou aucune modification effectuée."}
     except Exception as e:
@@ -137,12 +355,13 @@ async def update_account_password(id_compte: int, new_password: str) -> Dict[str
     if len(new_password) < 8:
         return {"success": False, "message": "Le nouveau mot de passe doit contenir au moins 8 caractères."}
 
-    hashed_pwd = hash_password(new_password)
+    hashed_pwd = await hash_password_async(new_password)
     sql = "UPDATE Account SET password = %s WHERE id_compte = %s"
 
     try:
         rows_affected = await execute_query(sql, (hashed_pwd, id_compte))
         if rows_affected > 0:
+            # Le mot de passe ne fait pas partie des colonnes en cache : rien à invalider
             return {"success": True, "message": "Mot de passe mis à jour avec succès."}
         return {"success": False, "message": "Compte non trouvé."}
     except Exception as e:
@@ -158,6 +377,7 @@ async def delete_account(id_compte: int) -> Dict[str, Any]:
     try:
         rows_affected = await execute_query(sql, (id_compte,))
         if rows_affected > 0:
+            _invalidate_account(id_compte)
             return {"success": True, "message": "Compte supprimé avec succès."}
         return {"success": False, "message": "Compte non trouvé."}
     except Exception as e:
@@ -166,6 +386,20 @@ async def delete_account(id_compte: int) -> Dict[str, Any]:
 
 
 # --- Fonction d'Authentification (pour la connexion) ---
+async def _rehash_password(id_compte: int, password: str, old_hashed_pwd: str):
+    """
+    Remplace un hachage au coût obsolète par un hachage au coût courant.
+    Un échec n'empêche pas la connexion : le hachage sera refait à la prochaine.
+    """
+    try:
+        new_hashed_pwd = await hash_password_async(password)
+        # La condition sur l'ancien hachage évite d'écraser un changement de mot de passe concurrent
+        sql = "UPDATE Account SET password = %s WHERE id_compte = %s AND password = %s"
+        await execute_query(sql, (new_hashed_pwd, id_compte, old_hashed_pwd))
+    except Exception as e:
+        logger.warning(f"Échec du re-hachage du mot de passe du compte {id_compte}: {e}")
+
+
 async def authenticate_account(username: str, password: str) -> Dict[str, Any]:
     """Authentifie l'utilisateur via le nom d'utilisateur et le mot de passe."""
 
@@ -177,7 +411,11 @@ async def authenticate_account(username: str, password: str) -> Dict[str, Any]:
         # 2. Vérifier le mot de passe
         stored_hashed_pwd = account_data['password']
 
-        if check_password(password, stored_hashed_pwd):
+        if await check_password_async(password, stored_hashed_pwd):
+            # Coût trop faible : on profite du mot de passe en clair pour refaire le hachage
+            if password_needs_rehash(stored_hashed_pwd):
+                await _rehash_password(account_data['id_compte'], password, stored_hashed_pwd)
+
             # Succès
             return {
                 "authenticated": True,
@@ -0,0 +1,334 @@
+# benchmarkSuite.py - Micro-benchmarks des services sur une base MySQL/MariaDB locale
+"""
+Utilisation (depuis la racine du projet) :
+
+    python -m Back.Benchmark.benchmarkSuite generer --echelle petit --utilisateur root
+    python -m Back.Benchmark.benchmarkSuite mesurer --utilisateur root --etiquette avant-index
+
+Le mot de passe MySQL est lu dans PROSPECTIUS_DB_PASSWORD, ou demandé à l'exécution.
+Chaque mesure est enregistrée en JSON dans le dossier de résultats et comparée à la précédente.
+"""
+import argparse
+import asyncio
+import getpass
+import json
+import logging
+import os
+import platform
+import statistics
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
+
+from Back.dbManager import initialize_db_pool, close_db_pool, execute_query, pool_config_from_env
+from Back.dbMetrics import reset_query_metrics, get_query_metrics_snapshot
+from Back.Account.accountService import authenticate_account, clear_account_cache, shutdown_hash_executor
+from Back.Prospect.prospectService import get_prospects_list, get_prospects_page, get_prospect_detail
+from Back.Interaction.interactionService import get_interactions_by_prospect
+from Back.StatsReport.statService import (
+    configure_report_cache, REPORT_CACHE_TTL, get_prospect_status_distribution, get_conversion_rate,
+    get_user_conversion_performance, get_prospects_created_by_month, get_prospect_trend,
+    get_dashboard_snapshot, get_conversion_funnel, get_cohort_conversion
+)
+from Back.Benchmark.dataGenerator import (
+    SCALES, DEFAULT_SEED, DEFAULT_BATCH_SIZE, BENCH_USERNAME, BENCH_PASSWORD, generate_dataset
+)
+
+logger = logging.getLogger("BenchmarkSuite")
+
+DEFAULT_ITERATIONS = 20
+DEFAULT_WARMUP = 2
+DEFAULT_RESULTS_DIR = "bench_results"
+# Variation de la médiane au-delà de laquelle une comparaison est signalée (en %)
+REGRESSION_THRESHOLD_PCT = 10.0
+
+Benchmark = Tuple[str, Callable[[], Awaitable[Any]]]
+
+
+# --- 1. Définition des Benchmarks ---
+
+async def _resolve_targets() -> Dict[str, Any]:
+    """Choisit dans la base les valeurs utilisées par les benchmarks (commercial, prospect, recherche)."""
+    account = await execute_query("SELECT id_compte FROM Account WHERE username = %s", (BENCH_USERNAME,),
+                                  fetch_one=True)
+    if not account:
+        account = await execute_query("SELECT id_compte FROM Account ORDER BY id_compte LIMIT 1", fetch_one=True)
+    if not account:
+        raise RuntimeError("Base vide : lancez d'abord la commande 'generer'.")
+
+    prospect = await execute_query(
+        "SELECT id_prospect, nomp, telephone FROM Prospect WHERE assignation = %s AND deleted_at IS NULL"
+        " ORDER BY id_prospect LIMIT 1",
+        (account['id_compte'],), fetch_one=True
+    )
+    if not prospect:
+        raise RuntimeError("Aucun prospect assigné au compte de benchmark.")
+
+    digits = ''.join(c for c in (prospect['telephone'] or '') if c.isdigit())
+    return {
+        "id_compte": account['id_compte'],
+        "id_prospect": prospect['id_prospect'],
+        "recherche_nom": prospect['nomp'] or 'Rakoto',
+        "recherche_telephone": digits[:6] or '261',
+    }
+
+
+def build_benchmarks(targets: Dict[str, Any]) -> List[Benchmark]:
+    """Liste (nom, fabrique de coroutine) de tous les services mesurés."""
+    id_compte = targets['id_compte']
+    name = targets['recherche_nom']
+    phone = targets['recherche_telephone']
+
+    return [
+        # Prospects : chaque filtre séparément puis combinés
+        ("prospects.liste.sans_filtre", lambda: get_prospects_list()),
+        ("prospects.liste.assignation", lambda: get_prospects_list(assignation_filter=id_compte)),
+        ("prospects.liste.statut", lambda: get_prospects_list(status_filter='negociation')),
+        ("prospects.liste.recherche_fulltext", lambda: get_prospects_list(search_term=name)),
+        ("prospects.liste.recherche_like", lambda: get_prospects_list(search_term=name, search_mode='like')),
+        ("prospects.liste.recherche_telephone", lambda: get_prospects_list(search_term=phone)),
+        ("prospects.liste.filtres_combines",
+         lambda: get_prospects_list(assignation_filter=id_compte, status_filter='interesse', search_term=name)),
+        ("prospects.page.premiere", lambda: get_prospects_page()),
+        ("prospects.page.statut", lambda: get_prospects_page(status_filter='negociation')),
+        ("prospects.page.inactifs", lambda: get_prospects_page(inactive_days=90, sort='inactivite')),
+        # Interactions
+        ("interactions.par_prospect", lambda: get_interactions_by_prospect(targets['id_prospect'])),
+        ("prospects.detail", lambda: get_prospect_detail(targets['id_prospect'])),
+        # Rapports (cache désactivé pendant la mesure)
+        ("rapports.distribution_statuts", get_prospect_status_distribution),
+        ("rapports.taux_conversion", get_conversion_rate),
+        ("rapports.performance_commerciaux", get_user_conversion_performance),
+        ("rapports.creations_par_mois", get_prospects_created_by_month),
+        ("rapports.tendance_semaine", lambda: get_prospect_trend(granularite='semaine')),
+        ("rapports.tableau_de_bord", get_dashboard_snapshot),
+        ("rapports.tunnel_conversion", get_conversion_funnel),
+        ("rapports.cohortes", get_cohort_conversion),
+        # Authentification (dominée par le coût bcrypt)
+        ("comptes.authentification", lambda: authenticate_account(BENCH_USERNAME, BENCH_PASSWORD)),
+    ]
+
+
+# --- 2. Mesure ---
+
+def _summarize(durations_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(durations_ms)
+    p95 = statistics.quantiles(ordered, n=20)[-1] if len(ordered) >= 2 else ordered[0]
+    return {
+        "iterations": len(ordered),
+        "min_ms": round(ordered[0], 3),
+        "mediane_ms": round(statistics.median(ordered), 3),
+        "moyenne_ms": round(statistics.fmean(ordered), 3),
+        "p95_ms": round(p95, 3),
+        "max_ms": round(ordered[-1], 3),
+        "ecart_type_ms": round(statistics.stdev(ordered), 3) if len(ordered) >= 2 else 0.0,
+    }
+
+
+async def run_benchmark(func: Callable[[], Awaitable[Any]], iterations: int = DEFAULT_ITERATIONS,
+                        warmup: int = DEFAULT_WARMUP) -> Dict[str, Any]:
+    """Exécute func() warmup fois sans mesure, puis iterations fois en mesurant chaque appel."""
+    for _ in range(warmup):
+        await func()
+
+    durations_ms = []
+    rows = 0
+    for _ in range(iterations):
+        clear_account_cache()
+        start = time.perf_counter()
+        result = await func()
+        durations_ms.append((time.perf_counter() - start) * 1000)
+        # fetchall() d'aiomysql retourne un tuple
+        rows = len(result) if isinstance(result, (list, tuple)) else 0
+
+    summary = _summarize(durations_ms)
+    summary["lignes"] = rows
+    return summary
+
+
+async def run_suite(iterations: int = DEFAULT_ITERATIONS, warmup: int = DEFAULT_WARMUP,
+                    only: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Mesure tous les benchmarks (ou ceux dont le nom commence par only).
+
+    Le cache des rapports est désactivé (TTL nul) pour mesurer la base et non le cache ;
+    il est rétabli à la fin. Les métriques par requête SQL (dbMetrics) sont jointes au résultat.
+    """
+    targets = await _resolve_targets()
+    benchmarks = [b for b in build_benchmarks(targets) if not only or b[0].startswith(only)]
+
+    configure_report_cache(ttl=0)
+    reset_query_metrics()
+    results: Dict[str, Any] = {}
+    try:
+        for name, func in benchmarks:
+            try:
+                results[name] = await run_benchmark(func, iterations, warmup)
+                logger.info(f"{name}: médiane {results[name]['mediane_ms']} ms, p95 {results[name]['p95_ms']} ms")
+            except Exception as e:
+                results[name] = {"erreur": str(e)}
+                logger.error(f"{name}: échec ({e})")
+    finally:
+        configure_report_cache(ttl=REPORT_CACHE_TTL)
+
+    return {
+        "genere_le": datetime.now().isoformat(timespec='seconds'),
+        "environnement": await _describe_environment(),
+        "cibles": targets,
+        "resultats": results,
+        "requetes_sql": get_query_metrics_snapshot()["requetes"],
+    }
+
+
+async def _describe_environment() -> Dict[str, Any]:
+    """Volumes et versions, pour savoir si deux exécutions sont comparables."""
+    volumes = await execute_query(
+        "SELECT (SELECT COUNT(*) FROM Account) AS comptes, (SELECT COUNT(*) FROM Prospect) AS prospects, "
+        "(SELECT COUNT(*) FROM Interaction) AS interactions",
+        fetch_one=True
+    )
+    server = await execute_query("SELECT VERSION() AS version", fetch_one=True)
+    return {
+        "python": platform.python_version(),
+        "plateforme": platform.platform(),
+        "serveur_sql": server['version'] if server else None,
+        "volumes": volumes,
+    }
+
+
+# --- 3. Enregistrement et Comparaison ---
+
+def save_results(results: Dict[str, Any], results_dir: str = DEFAULT_RESULTS_DIR,
+                 label: Optional[str] = None) -> str:
+    """Écrit les résultats dans results_dir/<horodatage>[-<etiquette>].json et retourne le chemin."""
+    os.makedirs(results_dir, exist_ok=True)
+    results["etiquette"] = label
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(results_dir, f"{stamp}-{label}.json" if label else f"{stamp}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2, default=str)
+    return path
+
+
+def latest_results(results_dir: str = DEFAULT_RESULTS_DIR, exclude: Optional[str] = None) -> Optional[str]:
+    """Chemin du dernier fichier de résultats (ordre des noms horodatés), hors exclude."""
+    if not os.path.isdir(results_dir):
+        return None
+    files = sorted(f for f in os.listdir(results_dir) if f.endswith('.json'))
+    paths = [os.path.join(results_dir, f) for f in files]
+    paths = [p for p in paths if exclude is None or os.path.abspath(p) != os.path.abspath(exclude)]
+    return paths[-1] if paths else None
+
+
+def compare_results(previous: Dict[str, Any], current: Dict[str, Any],
+                    threshold_pct: float = REGRESSION_THRESHOLD_PCT) -> List[Dict[str, Any]]:
+    """
+    Compare les médianes benchmark par benchmark.
+
+    Returns:
+        Une entrée par benchmark commun : médianes, variation en % et verdict
+        ('regression', 'amelioration' ou 'stable' selon threshold_pct).
+    """
+    comparison = []
+    for name, current_stats in current["resultats"].items():
+        previous_stats = previous.get("resultats", {}).get(name)
+        if not previous_stats or "mediane_ms" not in previous_stats or "mediane_ms" not in current_stats:
+            continue
+        before, after = previous_stats["mediane_ms"], current_stats["mediane_ms"]
+        delta_pct = (after - before) / before * 100 if before else 0.0
+        if delta_pct > threshold_pct:
+            verdict = 'regression'
+        elif delta_pct < -threshold_pct:
+            verdict = 'amelioration'
+        else:
+            verdict = 'stable'
+        comparison.append({"benchmark": name, "avant_ms": before, "apres_ms": after,
+                           "variation_pct": round(delta_pct, 1), "verdict": verdict})
+    return comparison
+
+
+def print_comparison(comparison: List[Dict[str, Any]]):
+    print(f"\n{'Benchmark':<42} | {'Avant (ms)':>10} | {'Après (ms)':>10} | {'Var.':>8} | Verdict")
+    print("-" * 92)
+    for row in comparison:
+        print(f"{row['benchmark']:<42} | {row['avant_ms']:>10.2f} | {row['apres_ms']:>10.2f} | "
+              f"{row['variation_pct']:>7.1f}% | {row['verdict']}")
+
+
+# --- 4. Ligne de Commande ---
+
+def add_db_arguments(parser: argparse.ArgumentParser):
+    """Options de connexion communes aux outils de performance."""
+    parser.add_argument('--hote', default='localhost')
+    parser.add_argument('--port', type=int, default=3306)
+    parser.add_argument('--utilisateur', default='root')
+    parser.add_argument('--base', default='Prospectius')
+
+
+async def connect_from_args(args: argparse.Namespace):
+    """
+    Initialise le pool ; mot de passe lu dans PROSPECTIUS_DB_PASSWORD ou demandé à l'exécution,
+    options du pool lues dans les variables PROSPECTIUS_POOL_*.
+    """
+    password = os.environ.get('PROSPECTIUS_DB_PASSWORD')
+    if password is None:
+        password = getpass.getpass("Mot de passe MySQL: ")
+    return await initialize_db_pool(args.hote, args.port, args.utilisateur, password, args.base,
+                                    **pool_config_from_env())
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Jeu de données synthétique et benchmarks Prospectius.")
+    add_db_arguments(parser)
+    commands = parser.add_subparsers(dest='commande', required=True)
+
+    generate = commands.add_parser('generer', help="Remplit la base avec un jeu de données synthétique.")
+    generate.add_argument('--echelle', choices=sorted(SCALES), default='petit')
+    generate.add_argument('--interactions', type=int, help="Nombre d'interactions (remplace --echelle).")
+    generate.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    generate.add_argument('--lot', type=int, default=DEFAULT_BATCH_SIZE)
+
+    measure = commands.add_parser('mesurer', help="Mesure les services et compare à l'exécution précédente.")
+    measure.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS)
+    measure.add_argument('--echauffement', type=int, default=DEFAULT_WARMUP)
+    measure.add_argument('--seulement', help="Préfixe des benchmarks à exécuter (ex: rapports.).")
+    measure.add_argument('--dossier', default=DEFAULT_RESULTS_DIR)
+    measure.add_argument('--etiquette', help="Étiquette ajoutée au nom du fichier de résultats.")
+    measure.add_argument('--comparer', help="Fichier de référence (par défaut : le précédent du dossier).")
+    return parser.parse_args(argv)
+
+
+async def main(argv: Optional[List[str]] = None):
+    args = _parse_args(argv)
+    pool = await connect_from_args(args)
+    if not pool:
+        logger.error("Benchmark impossible sans connexion DB.")
+        return
+
+    try:
+        if args.commande == 'generer':
+            total = args.interactions or SCALES[args.echelle]
+            result = await generate_dataset(total, seed=args.seed, batch_size=args.lot)
+            print(result['message'])
+            if result['success']:
+                print(f"Durée: {result['duree_sec']} s ({result['lignes_par_sec']} lignes/s)")
+            return
+
+        results = await run_suite(args.iterations, args.echauffement, args.seulement)
+        path = save_results(results, args.dossier, args.etiquette)
+        print(f"Résultats enregistrés dans {path}")
+
+        reference = args.comparer or latest_results(args.dossier, exclude=path)
+        if reference:
+            with open(reference, encoding='utf-8') as f:
+                previous = json.load(f)
+            print(f"Comparaison avec {reference}")
+            print_comparison(compare_results(previous, results))
+    finally:
+        await close_db_pool()
+        shutdown_hash_executor()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
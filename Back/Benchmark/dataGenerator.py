@@ -0,0 +1,208 @@
+# dataGenerator.py - Jeu de données synthétique et déterministe pour les tests de performance
+import logging
+import random
+import time
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Tuple, Iterator
+
+from Back.dbManager import execute_query, execute_many
+from Back.Account.accountService import hash_password_async
+from Back.Interaction.interactionService import backfill_interaction_summary
+
+logger = logging.getLogger("DataGenerator")
+
+# --- Échelles (exprimées en nombre d'interactions) ---
+# 10 interactions par prospect en moyenne, un commercial pour 2 000 prospects (minimum 5)
+SCALES = {
+    'petit': 10_000,
+    'moyen': 1_000_000,
+    'grand': 10_000_000,
+}
+INTERACTIONS_PER_PROSPECT = 10
+PROSPECTS_PER_ACCOUNT = 2000
+MIN_ACCOUNTS = 5
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_SEED = 2025
+HISTORY_DAYS = 3 * 365
+
+# Compte connu, utilisé par le benchmark d'authentification
+BENCH_USERNAME = "bench_commercial_0"
+BENCH_PASSWORD = "BenchProspectius#2025"
+
+# --- Distributions réalistes (poids relatifs) ---
+STATUS_WEIGHTS = {'nouveau': 35, 'interesse': 25, 'negociation': 15, 'perdu': 15, 'converti': 10}
+TYPE_WEIGHTS = {'particulier': 60, 'societe': 30, 'organisation': 10}
+INTERACTION_WEIGHTS = {'appel': 40, 'email': 35, 'sms': 15, 'reunion': 10}
+
+FIRST_NAMES = ('Jean', 'Marie', 'Hery', 'Fara', 'Tiana', 'Paul', 'Sophie', 'Andry', 'Lova', 'Nathalie',
+               'Rija', 'Claire', 'Michel', 'Voahangy', 'Luc', 'Aina', 'Julie', 'Toky', 'Anne', 'Fidy')
+LAST_NAMES = ('Rakoto', 'Rabe', 'Randria', 'Martin', 'Bernard', 'Rasoa', 'Dubois', 'Andrian', 'Petit',
+              'Razafy', 'Moreau', 'Ravelo', 'Laurent', 'Rajao', 'Simon', 'Ramanana', 'Michel', 'Rafidy')
+DOMAINS = ('gmail.com', 'yahoo.fr', 'outlook.com', 'entreprise.mg', 'societe.fr')
+NOTES = ("Premier contact, intéressé par une démonstration.", "Relance prévue la semaine prochaine.",
+         "Demande un devis détaillé.", "Pas disponible, rappeler plus tard.", "Réunion de présentation faite.",
+         "Négociation sur le prix en cours.", "Envoi de la documentation commerciale.")
+
+SQL_INSERT_ACCOUNT = """
+    INSERT INTO Account (id_compte, nom, prenom, email, username, password, type_compte, date_creation)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+SQL_INSERT_PROSPECT = """
+    INSERT INTO Prospect (id_prospect, nomp, prenomp, telephone, email, adresse, type, status,
+                          creation, date_update, assignation)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+SQL_INSERT_INTERACTION = """
+    INSERT INTO Interaction (id_prospect, id_compte, type, note, date_interaction)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+
+# --- Fonctions Utilitaires ---
+
+def scale_sizes(total_interactions: int) -> Dict[str, int]:
+    """Déduit le nombre de comptes et de prospects à partir du nombre d'interactions visé."""
+    prospects = max(1, total_interactions // INTERACTIONS_PER_PROSPECT)
+    accounts = max(MIN_ACCOUNTS, prospects // PROSPECTS_PER_ACCOUNT)
+    return {"comptes": accounts, "prospects": prospects, "interactions": total_interactions}
+
+
+def _weighted_sampler(rng: random.Random, weights: Dict[str, int]):
+    """Retourne une fonction de tirage pondéré (cum_weights précalculés une seule fois)."""
+    values = list(weights)
+    cumulative = []
+    total = 0
+    for value in values:
+        total += weights[value]
+        cumulative.append(total)
+    return lambda: rng.choices(values, cum_weights=cumulative)[0]
+
+
+def _batched(rows: Iterator[Tuple], batch_size: int) -> Iterator[List[Tuple]]:
+    batch: List[Tuple] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _bulk_insert(sql: str, rows: Iterator[Tuple], batch_size: int, label: str) -> int:
+    """Insère les lignes par INSERT multi-lignes (une transaction par lot)."""
+    inserted = 0
+    started = time.perf_counter()
+    for batch in _batched(rows, batch_size):
+        await execute_many(sql, batch)
+        inserted += len(batch)
+        if inserted % (batch_size * 20) == 0:
+            rate = inserted / (time.perf_counter() - started)
+            logger.info(f"{label}: {inserted} lignes insérées ({rate:.0f} lignes/s)")
+    return inserted
+
+
+async def _next_id(table: str, column: str) -> int:
+    row = await execute_query(f"SELECT COALESCE(MAX({column}), 0) + 1 AS next_id FROM {table}", fetch_one=True)
+    return int(row['next_id'])
+
+
+# --- Générateurs de Lignes ---
+
+def _account_rows(first_id: int, count: int, now: datetime, hashed: str, suffix: str) -> Iterator[Tuple]:
+    # Un seul hachage partagé par tous les comptes générés : la génération reste rapide
+    for i in range(count):
+        yield (first_id + i, f"Bench{i}{suffix}", f"Commercial{i}{suffix}",
+               f"bench.commercial{i}{suffix}@prospectius.test", f"bench_commercial_{i}{suffix}", hashed,
+               'Commercial', now - timedelta(days=HISTORY_DAYS))
+
+
+def _prospect_rows(rng: random.Random, first_id: int, count: int, account_ids: List[int],
+                   now: datetime, creation_ages: array) -> Iterator[Tuple]:
+    """creation_ages reçoit l'âge (secondes avant now) de chaque prospect, dans l'ordre des IDs."""
+    pick_status = _weighted_sampler(rng, STATUS_WEIGHTS)
+    pick_type = _weighted_sampler(rng, TYPE_WEIGHTS)
+    for i in range(count):
+        prenom, nom = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        age = rng.randrange(HISTORY_DAYS * 86400)
+        creation_ages.append(age)
+        creation = now - timedelta(seconds=age)
+        updated = creation + timedelta(seconds=rng.randrange(max(1, int((now - creation).total_seconds()))))
+        yield (first_id + i, nom, prenom,
+               f"+261 3{rng.randrange(2, 9)} {rng.randrange(10, 99)} {rng.randrange(100, 999)} {rng.randrange(10, 99)}",
+               f"{prenom.lower()}.{nom.lower()}{rng.randrange(10000)}@{rng.choice(DOMAINS)}",
+               f"Lot {rng.randrange(1, 999)} Antananarivo", pick_type(), pick_status(),
+               creation, updated, rng.choice(account_ids))
+
+
+def _interaction_rows(rng: random.Random, count: int, first_prospect_id: int, creation_ages: array,
+                      account_ids: List[int], now: datetime) -> Iterator[Tuple]:
+    pick_type = _weighted_sampler(rng, INTERACTION_WEIGHTS)
+    for _ in range(count):
+        index = rng.randrange(len(creation_ages))
+        # Entre la création du prospect et la date de référence
+        when = now - timedelta(seconds=rng.randrange(creation_ages[index] + 1))
+        yield (first_prospect_id + index, rng.choice(account_ids), pick_type(), rng.choice(NOTES), when)
+
+
+# --- Point d'Entrée ---
+
+async def generate_dataset(total_interactions: int = SCALES['petit'], seed: int = DEFAULT_SEED,
+                           batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Remplit Account, Prospect et Interaction avec un jeu de données synthétique.
+
+    Le jeu est déterministe pour un même seed et une même échelle (mêmes valeurs, mêmes répartitions).
+    Les lignes sont chargées par INSERT multi-lignes de batch_size lignes, jamais une à une.
+    Les données existantes sont conservées : les identifiants générés suivent les identifiants existants
+    et, si des comptes de benchmark existent déjà, les nouveaux sont suffixés par leur premier ID
+    (contraintes UNIQUE de Account). BENCH_USERNAME reste le compte de la première génération.
+    Le mot de passe est haché au coût bcrypt courant du service : l'authentification ne le rehache pas.
+    """
+    rng = random.Random(seed)
+    sizes = scale_sizes(total_interactions)
+    # Date de référence fixe : le jeu ne dépend pas du jour de génération
+    now = datetime(2025, 10, 1)
+    started = time.perf_counter()
+
+    try:
+        first_account = await _next_id('Account', 'id_compte')
+        existing = await execute_query("SELECT 1 FROM Account WHERE username = %s", (BENCH_USERNAME,),
+                                       fetch_one=True)
+        suffix = f"_{first_account}" if existing else ""
+        hashed = await hash_password_async(BENCH_PASSWORD)
+        await _bulk_insert(SQL_INSERT_ACCOUNT, _account_rows(first_account, sizes['comptes'], now, hashed, suffix),
+                           batch_size, "Comptes")
+        account_ids = list(range(first_account, first_account + sizes['comptes']))
+
+        first_prospect = await _next_id('Prospect', 'id_prospect')
+        creation_ages = array('l')  # 4 à 8 octets par prospect, quelle que soit l'échelle
+        await _bulk_insert(SQL_INSERT_PROSPECT,
+                           _prospect_rows(rng, first_prospect, sizes['prospects'], account_ids, now, creation_ages),
+                           batch_size, "Prospects")
+
+        await _bulk_insert(SQL_INSERT_INTERACTION,
+                           _interaction_rows(rng, sizes['interactions'], first_prospect, creation_ages,
+                                             account_ids, now),
+                           batch_size, "Interactions")
+
+        # Les interactions sont insérées directement : le résumé d'activité des prospects est recalculé ensuite
+        backfill = await backfill_interaction_summary()
+        if not backfill['success']:
+            raise RuntimeError(backfill['message'])
+    except Exception as e:
+        return {"success": False, "message": f"Échec de la génération du jeu de données: {e}"}
+
+    elapsed = time.perf_counter() - started
+    total_rows = sum(sizes.values())
+    return {
+        "success": True,
+        "message": f"Jeu de données généré: {sizes['comptes']} comptes, {sizes['prospects']} prospects, "
+                   f"{sizes['interactions']} interactions.",
+        **sizes,
+        "premier_prospect": first_prospect,
+        "duree_sec": round(elapsed, 1),
+        "lignes_par_sec": round(total_rows / elapsed, 1) if elapsed > 0 else 0.0,
+    }
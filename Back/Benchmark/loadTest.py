@@ -0,0 +1,305 @@
+# loadTest.py - Test de charge : utilisateurs virtuels concurrents sur la couche services
+"""
+Simule N commerciaux utilisant l'application en même temps, à travers le pool partagé de dbManager.
+
+    python -m Back.Benchmark.loadTest --utilisateurs 50 --duree 60
+
+Chaque utilisateur virtuel se connecte puis enchaîne des scénarios tirés selon SCENARIO_WEIGHTS,
+séparés par un temps de réflexion aléatoire. Les comptes utilisés sont ceux créés par dataGenerator.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+
+import numpy as np
+
+from Back.dbManager import execute_query, close_db_pool, get_pool_stats
+from Back.dbMetrics import reset_query_metrics, get_query_metrics_snapshot
+from Back.Account.accountService import authenticate_account, shutdown_hash_executor
+from Back.Prospect.prospectService import get_prospects_page, get_prospect_detail
+from Back.Interaction.interactionService import create_interaction, TYPE_INTERACTION
+from Back.StatsReport.statService import get_dashboard_snapshot, get_prospect_trend
+from Back.Benchmark.dataGenerator import BENCH_PASSWORD, FIRST_NAMES, LAST_NAMES
+from Back.Benchmark.benchmarkSuite import add_db_arguments, connect_from_args, save_results
+
+logger = logging.getLogger("LoadTest")
+
+# --- Paramètres par défaut ---
+DEFAULT_USERS = 50
+DEFAULT_DURATION_SEC = 60.0
+DEFAULT_RAMP_UP_SEC = 10.0
+DEFAULT_THINK_TIME_SEC = 0.5  # Moyenne d'une loi exponentielle
+DEFAULT_SEED = 7
+POOL_SAMPLE_INTERVAL_SEC = 0.1
+DEFAULT_RESULTS_DIR = os.path.join("bench_results", "charge")
+
+# Poids relatifs des scénarios (une connexion a aussi lieu au démarrage de chaque utilisateur)
+SCENARIO_WEIGHTS = {
+    'liste': 30,
+    'recherche': 20,
+    'ouvrir_prospect': 25,
+    'ajouter_interaction': 10,
+    'rapports': 10,
+    'connexion': 5,
+}
+WRITE_SCENARIOS = ('ajouter_interaction',)
+
+
+# --- 1. Collecte des Mesures ---
+
+class LoadStats:
+    """Latences (ms) et erreurs par opération, partagées par tous les utilisateurs virtuels."""
+
+    def __init__(self):
+        self.latencies_ms: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.pool_samples: List[Dict[str, int]] = []
+
+    async def measure(self, operation: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Exécute func() en mesurant sa durée ; une exception ou un résultat en échec compte comme erreur."""
+        start = time.perf_counter()
+        try:
+            result = await func()
+        except Exception as e:
+            self.latencies_ms[operation].append((time.perf_counter() - start) * 1000)
+            self.errors[operation] += 1
+            logger.debug(f"{operation}: {e}")
+            return None
+
+        self.latencies_ms[operation].append((time.perf_counter() - start) * 1000)
+        if isinstance(result, dict) and (result.get("success") is False or result.get("authenticated") is False):
+            self.errors[operation] += 1
+        return result
+
+    def summary(self, elapsed_sec: float) -> Dict[str, Any]:
+        operations = {}
+        for operation, samples in sorted(self.latencies_ms.items()):
+            values = np.asarray(samples, dtype=np.float64)
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            operations[operation] = {
+                "appels": int(values.size),
+                "erreurs": self.errors[operation],
+                "debit_par_sec": round(values.size / elapsed_sec, 2),
+                "p50_ms": round(float(p50), 2),
+                "p95_ms": round(float(p95), 2),
+                "p99_ms": round(float(p99), 2),
+                "max_ms": round(float(values.max()), 2),
+            }
+        total_calls = sum(op["appels"] for op in operations.values())
+        return {
+            "duree_sec": round(elapsed_sec, 1),
+            "operations_totales": total_calls,
+            "debit_par_sec": round(total_calls / elapsed_sec, 2) if elapsed_sec > 0 else 0.0,
+            "erreurs_totales": sum(self.errors.values()),
+            "operations": operations,
+            "pool": self._pool_summary(),
+        }
+
+    def _pool_summary(self) -> Dict[str, Any]:
+        """Saturation du pool : connexions utilisées, part du temps où toutes sont prises, attente d'acquisition."""
+        summary: Dict[str, Any] = {}
+        if self.pool_samples:
+            in_use = np.array([s["utilisees"] for s in self.pool_samples])
+            waiting = np.array([s["en_attente"] for s in self.pool_samples])
+            saturated = np.array([s["utilisees"] >= s["taille_max"] for s in self.pool_samples])
+            summary.update({
+                "taille_max": self.pool_samples[-1]["taille_max"],
+                "utilisees_moyenne": round(float(in_use.mean()), 2),
+                "utilisees_max": int(in_use.max()),
+                "en_attente_moyenne": round(float(waiting.mean()), 2),
+                "en_attente_max": int(waiting.max()),
+                "part_temps_sature_pct": round(float(saturated.mean()) * 100, 1),
+            })
+        pool = get_pool_stats()
+        if pool["initialise"]:
+            summary.update({key: pool[key] for key in ("timeouts_acquisition", "timeouts_requete",
+                                                        "connexions_ecartees", "reconnexions")})
+
+        # Attente d'acquisition mesurée par execute_query (dbMetrics), toutes requêtes confondues
+        queries = get_query_metrics_snapshot()["requetes"]
+        executions = sum(q["executions"] for q in queries)
+        if executions:
+            total_wait = sum(q["attente_pool_moyenne_ms"] * q["executions"] for q in queries)
+            summary["attente_acquisition_moyenne_ms"] = round(total_wait / executions, 2)
+            summary["attente_acquisition_max_ms"] = max(q["attente_pool_max_ms"] for q in queries)
+        return summary
+
+
+async def _sample_pool(stats: LoadStats, stop: asyncio.Event):
+    """Relève périodiquement l'occupation du pool jusqu'à la fin du test."""
+    while not stop.is_set():
+        pool = get_pool_stats()
+        if pool["initialise"]:
+            stats.pool_samples.append({key: pool[key] for key in ("taille", "libres", "utilisees",
+                                                                  "taille_max", "en_attente")})
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=POOL_SAMPLE_INTERVAL_SEC)
+        except asyncio.TimeoutError:
+            pass
+
+
+# --- 2. Utilisateurs Virtuels ---
+
+async def _bench_accounts() -> List[Dict[str, Any]]:
+    """Comptes commerciaux créés par le générateur (mot de passe connu)."""
+    return await execute_query(
+        "SELECT id_compte, username FROM Account WHERE username LIKE %s ORDER BY id_compte",
+        ('bench\\_commercial\\_%',), fetch_all=True
+    ) or []
+
+
+async def _virtual_user(account: Dict[str, Any], deadline: float, stats: LoadStats, rng: random.Random,
+                        weights: Dict[str, int], think_time: float):
+    """Boucle d'un utilisateur : connexion, puis scénarios pondérés jusqu'à deadline."""
+    id_compte, username = account['id_compte'], account['username']
+    scenarios = list(weights)
+    cum_weights = list(np.cumsum([weights[s] for s in scenarios]))
+    known_prospects: List[int] = []
+    cursor: Optional[str] = None
+
+    async def list_page():
+        nonlocal cursor
+        # Une fois sur deux, l'utilisateur passe à la page suivante plutôt que de revenir au début
+        page = await get_prospects_page(cursor=cursor if rng.random() < 0.5 else None,
+                                        assignation_filter=id_compte)
+        cursor = page["next_cursor"]
+        known_prospects[:] = [p['id_prospect'] for p in page["prospects"]] or known_prospects
+        return page
+
+    async def open_prospect():
+        # Même appel que l'écran de détail du CLI
+        return await get_prospect_detail(rng.choice(known_prospects))
+
+    async def open_reports():
+        await get_dashboard_snapshot()
+        return await get_prospect_trend(granularite='semaine')
+
+    actions = {
+        'connexion': lambda: authenticate_account(username, BENCH_PASSWORD),
+        'liste': list_page,
+        # Même chemin que la recherche du CLI : première page, recherche indexée (FULLTEXT)
+        'recherche': lambda: get_prospects_page(search_term=rng.choice(LAST_NAMES + FIRST_NAMES)),
+        'ouvrir_prospect': open_prospect,
+        'ajouter_interaction': lambda: create_interaction(rng.choice(known_prospects), id_compte,
+                                                          rng.choice(TYPE_INTERACTION), "Test de charge"),
+        'rapports': open_reports,
+    }
+
+    await stats.measure('connexion', actions['connexion'])
+    await stats.measure('liste', list_page)
+
+    while time.monotonic() < deadline:
+        scenario = rng.choices(scenarios, cum_weights=cum_weights)[0]
+        if scenario in ('ouvrir_prospect', 'ajouter_interaction') and not known_prospects:
+            scenario = 'liste'
+        await stats.measure(scenario, actions[scenario])
+        if think_time > 0:
+            await asyncio.sleep(min(rng.expovariate(1 / think_time), max(0.0, deadline - time.monotonic())))
+
+
+async def run_load_test(users: int = DEFAULT_USERS, duration: float = DEFAULT_DURATION_SEC,
+                        ramp_up: float = DEFAULT_RAMP_UP_SEC, think_time: float = DEFAULT_THINK_TIME_SEC,
+                        read_only: bool = False, seed: int = DEFAULT_SEED) -> Dict[str, Any]:
+    """
+    Lance users utilisateurs virtuels pendant duration secondes (démarrages étalés sur ramp_up).
+
+    Returns:
+        Débit global, p50/p95/p99 par opération et saturation du pool.
+    """
+    accounts = await _bench_accounts()
+    if not accounts:
+        raise RuntimeError("Aucun compte de benchmark : lancez d'abord 'benchmarkSuite generer'.")
+
+    weights = {s: w for s, w in SCENARIO_WEIGHTS.items() if not (read_only and s in WRITE_SCENARIOS)}
+    stats = LoadStats()
+    reset_query_metrics()
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(_sample_pool(stats, stop))
+
+    start = time.monotonic()
+    deadline = start + duration
+
+    async def delayed_user(index: int):
+        await asyncio.sleep(ramp_up * index / max(1, users))
+        # Un générateur par utilisateur : le scénario de chacun ne dépend pas de l'ordonnancement
+        rng = random.Random(seed * 100_003 + index)
+        await _virtual_user(accounts[index % len(accounts)], deadline, stats, rng, weights, think_time)
+
+    try:
+        await asyncio.gather(*(delayed_user(i) for i in range(users)))
+    finally:
+        stop.set()
+        await sampler
+
+    summary = stats.summary(time.monotonic() - start)
+    summary.update({
+        "genere_le": datetime.now().isoformat(timespec='seconds'),
+        "configuration": {"utilisateurs": users, "duree_sec": duration, "montee_sec": ramp_up,
+                          "reflexion_sec": think_time, "lecture_seule": read_only, "seed": seed,
+                          "poids": weights},
+    })
+    return summary
+
+
+# --- 3. Rapport ---
+
+def print_report(summary: Dict[str, Any]):
+    print(f"\nDébit global: {summary['debit_par_sec']} op/s ({summary['operations_totales']} opérations, "
+          f"{summary['erreurs_totales']} erreurs, {summary['duree_sec']} s)")
+    print(f"\n{'Opération':<22} | {'Appels':>7} | {'Erreurs':>7} | {'op/s':>7} | {'p50':>8} | {'p95':>8} | {'p99':>8}")
+    print("-" * 84)
+    for name, op in summary["operations"].items():
+        print(f"{name:<22} | {op['appels']:>7} | {op['erreurs']:>7} | {op['debit_par_sec']:>7.2f} | "
+              f"{op['p50_ms']:>8.1f} | {op['p95_ms']:>8.1f} | {op['p99_ms']:>8.1f}")
+
+    pool = summary["pool"]
+    if pool:
+        print(f"\nPool: {pool.get('utilisees_max')}/{pool.get('taille_max')} connexions utilisées au maximum "
+              f"(moyenne {pool.get('utilisees_moyenne')}), saturé {pool.get('part_temps_sature_pct')}% du temps, "
+              f"jusqu'à {pool.get('en_attente_max')} appelant(s) en attente, "
+              f"attente d'acquisition moyenne {pool.get('attente_acquisition_moyenne_ms')} ms "
+              f"(max {pool.get('attente_acquisition_max_ms')} ms)")
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Test de charge multi-utilisateurs des services Prospectius.")
+    add_db_arguments(parser)
+    parser.add_argument('--utilisateurs', type=int, default=DEFAULT_USERS)
+    parser.add_argument('--duree', type=float, default=DEFAULT_DURATION_SEC, help="Durée du test (s).")
+    parser.add_argument('--montee', type=float, default=DEFAULT_RAMP_UP_SEC, help="Étalement des démarrages (s).")
+    parser.add_argument('--reflexion', type=float, default=DEFAULT_THINK_TIME_SEC,
+                        help="Temps de réflexion moyen entre deux actions (s), 0 pour enchaîner.")
+    parser.add_argument('--lecture-seule', action='store_true', help="Exclut les scénarios d'écriture.")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--dossier', default=DEFAULT_RESULTS_DIR)
+    parser.add_argument('--etiquette', help="Étiquette ajoutée au nom du fichier de résultats.")
+    return parser.parse_args(argv)
+
+
+async def main(argv: Optional[List[str]] = None):
+    args = _parse_args(argv)
+    pool = await connect_from_args(args)
+    if not pool:
+        logger.error("Test de charge impossible sans connexion DB.")
+        return
+
+    try:
+        summary = await run_load_test(args.utilisateurs, args.duree, args.montee, args.reflexion,
+                                      args.lecture_seule, args.seed)
+        print_report(summary)
+        path = save_results(summary, args.dossier, args.etiquette)
+        print(f"\nRésultats enregistrés dans {path}")
+    finally:
+        await close_db_pool()
+        shutdown_hash_executor()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
@@ -0,0 +1,277 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Dict, Optional, List, Any, Tuple
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.styles import Font
+
+from Back.dbManager import stream_query, execute_query
+from Back.Prospect.prospectService import build_prospect_filters
+from Back.StatsReport.statService import (
+    get_dashboard_snapshot, get_prospects_created_by_month, get_inactive_prospects_by_user
+)
+
+# --- Constantes de l'export ---
+DEFAULT_EXPORT_CHUNK_SIZE = 5000
+# Nombre maximal de lignes d'une feuille Excel (en-tête compris) : au-delà, l'export continue sur une nouvelle feuille
+EXCEL_MAX_ROWS = 1_048_576
+
+PROSPECT_COLUMNS: List[Tuple[str, str]] = [
+    ('id_prospect', 'ID'),
+    ('nomp', 'Nom'),
+    ('prenomp', 'Prénom'),
+    ('telephone', 'Téléphone'),
+    ('email', 'Email'),
+    ('adresse', 'Adresse'),
+    ('type', 'Type'),
+    ('status', 'Statut'),
+    ('username_assigne', 'Assigné à'),
+    ('creation', 'Date de création'),
+    ('date_update', 'Dernière mise à jour'),
+    ('last_interaction_at', 'Dernière interaction'),
+    ('interaction_count', 'Interactions'),
+]
+
+INTERACTION_COLUMNS: List[Tuple[str, str]] = [
+    ('id_interaction', 'ID'),
+    ('date_interaction', 'Date'),
+    ('type', 'Type'),
+    ('createur_username', 'Auteur'),
+    ('note', 'Note'),
+]
+
+
+# --- Fonctions Utilitaires ---
+
+def _header_row(sheet, titles: List[str]) -> List[WriteOnlyCell]:
+    """Construit une ligne d'en-tête en gras (mode write-only : cellules créées à la main)."""
+    cells = []
+    for title in titles:
+        cell = WriteOnlyCell(sheet, value=title)
+        cell.font = Font(bold=True)
+        cells.append(cell)
+    return cells
+
+
+def _clean_row(values: List[Any]) -> List[Any]:
+    """Retire les caractères de contrôle refusés par openpyxl (IllegalCharacterError) des valeurs texte."""
+    return [ILLEGAL_CHARACTERS_RE.sub('', value) if isinstance(value, str) else value for value in values]
+
+
+class _PagedSheet:
+    """Feuille write-only paginée : à EXCEL_MAX_ROWS lignes, ouvre 'Titre (2)', 'Titre (3)'... avec le même en-tête."""
+
+    def __init__(self, workbook: Workbook, title: str, titles: List[str]):
+        self.workbook = workbook
+        self.title = title
+        self.titles = titles
+        self.pages = 0
+        self._new_page()
+
+    def _new_page(self):
+        self.pages += 1
+        name = self.title if self.pages == 1 else f"{self.title} ({self.pages})"
+        self.sheet = self.workbook.create_sheet(name)
+        self.sheet.append(_header_row(self.sheet, self.titles))
+        self.rows = 1
+
+    def append(self, values: List[Any]):
+        if self.rows >= EXCEL_MAX_ROWS:
+            self._new_page()
+        self.sheet.append(_clean_row(values))
+        self.rows += 1
+
+
+def _current_rss_mb() -> Optional[float]:
+    """
+    Mémoire résidente actuelle du processus en Mo (/proc/self/statm, Linux uniquement ; sinon None).
+    ru_maxrss ne convient pas : c'est le pic de toute la vie du processus, pas celui d'un export.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            resident_pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+class _RssSampler:
+    """Pic de mémoire résidente d'un export, échantillonné après chaque bloc et comparé au départ."""
+
+    def __init__(self):
+        self.baseline = _current_rss_mb()
+        self.peak = self.baseline
+
+    def sample(self):
+        current = _current_rss_mb()
+        if current is not None and (self.peak is None or current > self.peak):
+            self.peak = current
+
+    def report(self) -> Dict[str, Optional[float]]:
+        self.sample()
+        if self.baseline is None or self.peak is None:
+            return {"pic_rss_mo": None, "hausse_rss_mo": None}
+        return {"pic_rss_mo": round(self.peak, 1), "hausse_rss_mo": round(self.peak - self.baseline, 1)}
+
+
+async def _save_workbook(workbook: Workbook, path: str):
+    """Enregistre le classeur hors de la boucle asyncio (la compression peut être longue)."""
+    await asyncio.get_running_loop().run_in_executor(None, workbook.save, path)
+
+
+def _export_result(path: str, rows: int, started: float, label: str, rss: _RssSampler) -> Dict[str, Any]:
+    """Construit le rapport d'export commun (débit, pic mémoire et hausse depuis le début de l'export)."""
+    elapsed = time.perf_counter() - started
+    return {
+        "success": True,
+        "message": f"{label} exporté(s) vers {path} ({rows} ligne(s)).",
+        "chemin": path,
+        "lignes": rows,
+        "duree_sec": round(elapsed, 3),
+        "lignes_par_sec": round(rows / elapsed, 1) if elapsed > 0 else 0.0,
+        **rss.report(),
+    }
+
+
+# --- 1. Export de la Liste des Prospects ---
+
+async def export_prospects_to_excel(path: str, assignation_filter: Optional[int] = None,
+                                    status_filter: Optional[str] = None, search_term: Optional[str] = None,
+                                    chunk_size: int = DEFAULT_EXPORT_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Exporte la liste des prospects (mêmes filtres que get_prospects_list) vers un fichier XLSX.
+
+    Les lignes sont lues par blocs via un curseur serveur et écrites en mode write-only :
+    ni le résultat SQL ni le classeur ne sont entièrement chargés en mémoire.
+    """
+    started = time.perf_counter()
+    rss = _RssSampler()
+    sql = """
+          SELECT p.id_prospect, p.nomp, p.prenomp, p.telephone, p.email, p.adresse, p.type, p.status,
+                 a.username AS username_assigne, p.creation, p.date_update, p.last_interaction_at,
+                 p.interaction_count
+          FROM Prospect p
+                   LEFT JOIN Account a ON p.assignation = a.id_compte
+          WHERE p.deleted_at IS NULL \
+          """
+    filters_sql, params = build_prospect_filters(assignation_filter, status_filter, search_term)
+    sql += filters_sql + " ORDER BY p.id_prospect"
+
+    workbook = Workbook(write_only=True)
+    sheet = _PagedSheet(workbook, "Prospects", [title for _, title in PROSPECT_COLUMNS])
+
+    rows_written = 0
+    try:
+        async for rows in stream_query(sql, tuple(params), chunk_size):
+            for row in rows:
+                sheet.append([row[key] for key, _ in PROSPECT_COLUMNS])
+            rows_written += len(rows)
+            rss.sample()
+
+        await _save_workbook(workbook, path)
+    except Exception as e:
+        return {"success": False, "message": f"Échec de l'export des prospects: {e}"}
+
+    return _export_result(path, rows_written, started, "Prospect(s)", rss)
+
+
+# --- 2. Export d'un Prospect et de son Historique ---
+
+async def export_prospect_to_excel(id_prospect: int, path: str,
+                                   chunk_size: int = DEFAULT_EXPORT_CHUNK_SIZE) -> Dict[str, Any]:
+    """Exporte une fiche prospect (feuille 'Prospect') et son historique d'interactions (feuille 'Interactions')."""
+    started = time.perf_counter()
+    rss = _RssSampler()
+    sql_prospect = """
+                   SELECT p.*, a.username AS username_assigne
+                   FROM Prospect p
+                            LEFT JOIN Account a ON p.assignation = a.id_compte
+                   WHERE p.id_prospect = %s
+                     AND p.deleted_at IS NULL \
+                   """
+    sql_interactions = """
+                       SELECT i.id_interaction, i.date_interaction, i.type, a.username AS createur_username, i.note
+                       FROM Interaction i
+                                JOIN Account a ON i.id_compte = a.id_compte
+                       WHERE i.id_prospect = %s
+                       ORDER BY i.date_interaction DESC \
+                       """
+    try:
+        prospect = await execute_query(sql_prospect, (id_prospect,), fetch_one=True)
+        if not prospect:
+            return {"success": False, "message": f"Prospect ID {id_prospect} non trouvé."}
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Prospect")
+        sheet.append(_header_row(sheet, ["Champ", "Valeur"]))
+        for key, title in PROSPECT_COLUMNS:
+            sheet.append(_clean_row([title, prospect.get(key)]))
+
+        sheet = _PagedSheet(workbook, "Interactions", [title for _, title in INTERACTION_COLUMNS])
+        rows_written = 0
+        async for rows in stream_query(sql_interactions, (id_prospect,), chunk_size):
+            for row in rows:
+                sheet.append([row[key] for key, _ in INTERACTION_COLUMNS])
+            rows_written += len(rows)
+            rss.sample()
+
+        await _save_workbook(workbook, path)
+    except Exception as e:
+        return {"success": False, "message": f"Échec de l'export du prospect: {e}"}
+
+    return _export_result(path, rows_written, started, "Prospect et interaction(s)", rss)
+
+
+# --- 3. Export des Statistiques ---
+
+async def export_reports_to_excel(path: str) -> Dict[str, Any]:
+    """Exporte les rapports de statService, une feuille par rapport."""
+    started = time.perf_counter()
+    rss = _RssSampler()
+    try:
+        snapshot = await get_dashboard_snapshot()
+        conversion, status_list, performance_list = snapshot['conversion'], snapshot['statuts'], snapshot['performance']
+        monthly_list = await get_prospects_created_by_month()
+        inactive_list = await get_inactive_prospects_by_user()
+
+        workbook = Workbook(write_only=True)
+
+        sheet = workbook.create_sheet("Conversion globale")
+        sheet.append(_header_row(sheet, ["Total prospects", "Total convertis", "Taux de conversion"]))
+        sheet.append([conversion['total_prospects'], conversion['total_converti'], conversion['taux_conversion']])
+
+        sheet = workbook.create_sheet("Statuts")
+        sheet.append(_header_row(sheet, ["Statut", "Nombre"]))
+        for item in status_list:
+            sheet.append([item['status'], item['count']])
+
+        sheet = workbook.create_sheet("Performance commerciale")
+        sheet.append(_header_row(sheet, ["Commercial", "Total prospects", "Total convertis", "Taux de conversion"]))
+        for item in performance_list:
+            sheet.append([item['username'], item['total_prospects'], item['total_converti'], item['taux_conversion']])
+
+        sheet = workbook.create_sheet("Créations par mois")
+        sheet.append(_header_row(sheet, ["Mois", "Prospects créés"]))
+        for item in monthly_list:
+            sheet.append([item['month_year'], item['total_created']])
+
+        sheet = workbook.create_sheet("Prospects à relancer")
+        sheet.append(_header_row(sheet, ["Commercial", "Prospects inactifs", "Jamais contactés",
+                                         "Plus ancienne interaction"]))
+        for item in inactive_list:
+            sheet.append([item['username'], item['total_inactifs'], item['jamais_contactes'],
+                          item['plus_ancienne_interaction']])
+
+        sheet = workbook.create_sheet("Informations")
+        sheet.append(["Généré le", datetime.now()])
+
+        await _save_workbook(workbook, path)
+    except Exception as e:
+        return {"success": False, "message": f"Échec de l'export des statistiques: {e}"}
+
+    rows = 1 + len(status_list) + len(performance_list) + len(monthly_list) + len(inactive_list)
+    return _export_result(path, rows, started, "Rapport(s)", rss)
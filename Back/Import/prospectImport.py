@@ -0,0 +1,249 @@
+import csv
+import logging
+import os
+import re
+import time
+from typing import Dict, Optional, List, Any, Tuple, Iterator, Callable
+
+from Back.dbManager import execute_query, execute_many
+from Back.Prospect.prospectService import TYPE_PROSPECT, STATUS_PROSPECT
+from Back.StatsReport.statService import invalidate_report_cache
+
+logger = logging.getLogger("ProspectImport")
+
+# --- Constantes de l'import ---
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000  # Au-delà, les erreurs sont seulement comptées
+
+# Longueurs maximales des colonnes (alignées sur scriptSQL/Prospectius.sql)
+MAX_LENGTHS = {'nomp': 50, 'prenomp': 50, 'telephone': 30, 'email': 100, 'adresse': 100}
+
+# En-têtes acceptés dans les fichiers (en minuscules) -> colonne BDD
+HEADER_ALIASES = {
+    'nomp': 'nomp', 'nom': 'nomp',
+    'prenomp': 'prenomp', 'prenom': 'prenomp', 'prénom': 'prenomp',
+    'telephone': 'telephone', 'téléphone': 'telephone', 'tel': 'telephone',
+    'email': 'email', 'mail': 'email',
+    'adresse': 'adresse',
+    'type': 'type', 'type_prospect': 'type',
+    'status': 'status', 'statut': 'status', 'status_prospect': 'status',
+    'assignation': 'assignation', 'assignation_id': 'assignation',
+}
+
+SQL_INSERT_PROSPECT = """
+    INSERT INTO Prospect (nomp, prenomp, telephone, email, adresse, type, status, assignation)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+# --- 1. Lecture des fichiers (ligne par ligne) ---
+
+def _normalize_header(headers: List[Any]) -> List[Optional[str]]:
+    """Traduit les en-têtes du fichier en noms de colonnes BDD (None si colonne inconnue)."""
+    return [HEADER_ALIASES.get(str(h).strip().lower()) if h is not None else None for h in headers]
+
+
+def _iter_csv_rows(path: str, encoding: str = 'utf-8-sig') -> Iterator[Dict[str, Any]]:
+    """Lit un fichier CSV ligne par ligne (séparateur ',' ou ';' détecté automatiquement)."""
+    with open(path, newline='', encoding=encoding) as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+
+        reader = csv.reader(f, dialect)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = _normalize_header(header)
+
+        for values in reader:
+            if not any(v.strip() for v in values):
+                continue  # Ligne vide
+            yield {col: val for col, val in zip(columns, values) if col}
+
+
+def _iter_xlsx_rows(path: str) -> Iterator[Dict[str, Any]]:
+    """Lit la première feuille d'un classeur XLSX en mode lecture seule (streaming)."""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RuntimeError("Le module openpyxl est requis pour importer des fichiers XLSX.")
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _normalize_header(list(header))
+
+        for values in rows:
+            if not any(v is not None and str(v).strip() for v in values):
+                continue  # Ligne vide
+            yield {col: val for col, val in zip(columns, values) if col}
+    finally:
+        workbook.close()
+
+
+def iter_import_rows(path: str) -> Iterator[Dict[str, Any]]:
+    """Choisit le lecteur selon l'extension du fichier (.csv ou .xlsx)."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return _iter_csv_rows(path)
+    if extension in ('.xlsx', '.xlsm'):
+        return _iter_xlsx_rows(path)
+    raise ValueError(f"Format de fichier non supporté: '{extension}'. Formats acceptés: .csv, .xlsx")
+
+
+# --- 2. Validation d'une ligne ---
+
+def validate_import_row(row: Dict[str, Any], default_assignation: int) -> Tuple[Optional[Tuple], Optional[str]]:
+    """
+    Valide et normalise une ligne lue dans le fichier.
+
+    Returns:
+        (paramètres de l'INSERT, None) si la ligne est valide, sinon (None, message d'erreur).
+    """
+    values = {key: (str(val).strip() if val is not None else '') for key, val in row.items()}
+
+    if not values.get('nomp') and not values.get('prenomp'):
+        return None, "Nom et prénom vides."
+
+    for key, max_length in MAX_LENGTHS.items():
+        if len(values.get(key, '')) > max_length:
+            return None, f"Le champ '{key}' dépasse {max_length} caractères."
+
+    email = values.get('email', '')
+    if email and not re.match(r"[^@]+@[^@]+\.[^@]+", email):
+        return None, f"Format d'email invalide: '{email}'."
+
+    type_prospect = values.get('type', '').lower()
+    if type_prospect not in TYPE_PROSPECT:
+        return None, f"Type de prospect '{type_prospect}' invalide. Doit être l'un de: {', '.join(TYPE_PROSPECT)}."
+
+    status_prospect = values.get('status', '').lower() or 'nouveau'
+    if status_prospect not in STATUS_PROSPECT:
+        return None, f"Statut de prospect '{status_prospect}' invalide. Doit être l'un de: {', '.join(STATUS_PROSPECT)}."
+
+    assignation = values.get('assignation', '')
+    try:
+        # openpyxl peut renvoyer 3.0 pour une cellule numérique
+        assignation_id = int(float(assignation)) if assignation else default_assignation
+    except ValueError:
+        return None, f"Assignation '{assignation}' invalide (ID de compte attendu)."
+
+    params = (values.get('nomp') or None, values.get('prenomp') or None, values.get('telephone') or None,
+              email or None, values.get('adresse') or None, type_prospect, status_prospect, assignation_id)
+    return params, None
+
+
+# --- 3. Insertion par lots ---
+
+async def _insert_batch(batch: List[Tuple[int, Tuple]], errors: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """
+    Insère un lot en une transaction. Si le lot échoue (clé étrangère, contrainte...),
+    les lignes sont réinsérées une à une pour isoler les lignes fautives sans perdre les autres.
+
+    Returns:
+        (nombre de lignes insérées, nombre de lignes en erreur)
+    """
+    try:
+        await execute_many(SQL_INSERT_PROSPECT, [params for _, params in batch])
+        return len(batch), 0
+    except (ConnectionError, TimeoutError):
+        # Base injoignable ou trop lente : ce n'est pas une erreur de données, l'import s'arrête
+        raise
+    except Exception as e:
+        logger.warning(f"Échec du lot de {len(batch)} lignes ({e}), insertion ligne par ligne.")
+
+    inserted = failed = 0
+    for line_number, params in batch:
+        try:
+            await execute_query(SQL_INSERT_PROSPECT, params)
+            inserted += 1
+        except (ConnectionError, TimeoutError):
+            raise
+        except Exception as e:
+            failed += 1
+            _record_error(errors, line_number, f"Erreur BDD: {e}")
+    return inserted, failed
+
+
+def _record_error(errors: List[Dict[str, Any]], line_number: int, message: str):
+    """Ajoute une erreur au rapport, dans la limite de MAX_REPORTED_ERRORS."""
+    if len(errors) < MAX_REPORTED_ERRORS:
+        errors.append({"ligne": line_number, "message": message})
+
+
+async def import_prospects(path: str, default_assignation: int, batch_size: int = DEFAULT_BATCH_SIZE,
+                           progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Importe des prospects depuis un fichier CSV ou XLSX, lu en flux.
+
+    Les lignes valides sont insérées par lots de batch_size (executemany, une transaction par lot).
+    Une ligne invalide est signalée dans le rapport sans interrompre l'import.
+    progress_callback, si fourni, reçoit les statistiques après chaque lot (dont 'lignes_par_sec').
+    """
+    batch_size = max(1, batch_size)
+    errors: List[Dict[str, Any]] = []
+    stats = {"lignes_lues": 0, "inserees": 0, "erreurs": 0, "lignes_par_sec": 0.0}
+    start = time.perf_counter()
+
+    def update_progress():
+        elapsed = time.perf_counter() - start
+        stats["duree_sec"] = round(elapsed, 3)
+        stats["lignes_par_sec"] = round(stats["lignes_lues"] / elapsed, 1) if elapsed > 0 else 0.0
+        if progress_callback:
+            progress_callback(dict(stats))
+
+    try:
+        rows = iter_import_rows(path)
+        batch: List[Tuple[int, Tuple]] = []
+
+        # La ligne 1 est l'en-tête
+        for line_number, row in enumerate(rows, start=2):
+            stats["lignes_lues"] += 1
+            params, error = validate_import_row(row, default_assignation)
+            if error:
+                stats["erreurs"] += 1
+                _record_error(errors, line_number, error)
+                continue
+
+            batch.append((line_number, params))
+            if len(batch) >= batch_size:
+                inserted, failed = await _insert_batch(batch, errors)
+                stats["inserees"] += inserted
+                stats["erreurs"] += failed
+                batch = []
+                update_progress()
+
+        if batch:
+            inserted, failed = await _insert_batch(batch, errors)
+            stats["inserees"] += inserted
+            stats["erreurs"] += failed
+
+    # ConnectionError et TimeoutError (pool, délai de requête) héritent d'OSError : interceptées avant
+    except (ConnectionError, TimeoutError) as e:
+        update_progress()
+        return {"success": False, "message": f"Erreur BDD lors de l'import: {e}", **stats, "details_erreurs": errors}
+    except (OSError, ValueError, RuntimeError, csv.Error) as e:
+        update_progress()
+        return {"success": False, "message": f"Échec de la lecture du fichier: {e}", **stats, "details_erreurs": errors}
+    finally:
+        # Les lots déjà validés restent en base, même si l'import est interrompu
+        if stats["inserees"]:
+            invalidate_report_cache()
+
+    update_progress()
+    logger.info(f"Import terminé: {stats['inserees']} insérées, {stats['erreurs']} en erreur, "
+                f"{stats['lignes_par_sec']} lignes/s.")
+
+    return {
+        "success": stats["inserees"] > 0 or stats["lignes_lues"] == 0,
+        "message": f"{stats['inserees']} prospect(s) importé(s), {stats['erreurs']} ligne(s) en erreur.",
+        **stats,
+        "details_erreurs": errors
+    }
@@ -1,15 +1,97 @@
-from typing import Dict, Optional, List, Any, Tuple
-from Back.dbManager import execute_query
+import time
+from typing import Dict, Optional, List, Any, Tuple, Sequence
+import aiomysql
+from Back.dbManager import execute_query, execute_many, transaction
+from Back.StatsReport.statService import invalidate_report_cache
 
 # --- Constantes (Types d'Interaction) ---
 TYPE_INTERACTION = ('email', 'appel', 'sms', 'reunion')
 
+# Nombre maximal d'erreurs de validation détaillées dans la réponse de create_interactions_bulk
+MAX_REPORTED_ERRORS = 100
+
+# Prospects recalculés par UPDATE lors du remplissage (backfill) des résumés d'activité
+BACKFILL_CHUNK_SIZE = 1000
+
+
+# --- Résumé d'Activité (colonnes dénormalisées de Prospect) ---
+# last_interaction_at, last_interaction_type et interaction_count sont tenus à jour par chaque
+# écriture sur Interaction : les listes et rapports les lisent au lieu d'agréger Interaction.
+
+def _summary_update_sql(where_template: str, touch: bool) -> str:
+    """UPDATE du résumé d'activité ; where_template ('{col} IN (...)') filtre les prospects par {col}."""
+    # date_update = p.date_update : sans modification réelle, ON UPDATE CURRENT_TIMESTAMP ne s'applique pas
+    date_update = "NOW()" if touch else "p.date_update"
+    return f"""
+          UPDATE Prospect p
+              LEFT JOIN (SELECT id_prospect, COUNT(*) AS total, MAX(date_interaction) AS derniere
+                         FROM Interaction
+                         WHERE {where_template.format(col='id_prospect')}
+                         GROUP BY id_prospect) s ON s.id_prospect = p.id_prospect
+          SET p.interaction_count     = IFNULL(s.total, 0),
+              p.last_interaction_at   = s.derniere,
+              p.last_interaction_type = (SELECT i.type
+                                         FROM Interaction i
+                                         WHERE i.id_prospect = p.id_prospect
+                                         ORDER BY i.date_interaction DESC, i.id_interaction DESC
+                                         LIMIT 1),
+              p.date_update           = {date_update}
+          WHERE {where_template.format(col='p.id_prospect')} \
+          """
+
+
+async def sync_interaction_summary(prospect_ids: Sequence[int], conn: Optional[aiomysql.Connection] = None,
+                                   touch: bool = False) -> int:
+    """
+    Recalcule le résumé d'activité des prospects donnés depuis leurs interactions (index
+    id_prospect, date_interaction). touch=True met aussi date_update à NOW().
+    """
+    ids = sorted({int(i) for i in prospect_ids})
+    if not ids:
+        return 0
+    placeholders = ", ".join(["%s"] * len(ids))
+    sql = _summary_update_sql(f"{{col}} IN ({placeholders})", touch)
+    return await execute_query(sql, tuple(ids + ids), conn=conn)
+
+
+async def backfill_interaction_summary(chunk_size: int = BACKFILL_CHUNK_SIZE,
+                                       conn: Optional[aiomysql.Connection] = None) -> Dict[str, Any]:
+    """
+    Remplit le résumé d'activité de tous les prospects (données existantes ou réparation).
+    Les prospects sont traités par plages d'ID de chunk_size, un UPDATE validé par plage.
+    L'opération est idempotente : elle peut être relancée ou interrompue sans risque.
+    """
+    chunk_size = max(1, int(chunk_size))
+    started = time.perf_counter()
+    stats = {"plages": 0, "prospects_modifies": 0}
+    sql = _summary_update_sql("{col} > %s AND {col} <= %s", touch=False)
+    try:
+        row = await execute_query("SELECT COALESCE(MAX(id_prospect), 0) AS max_id FROM Prospect",
+                                  fetch_one=True, conn=conn)
+        max_id = row['max_id'] if row else 0
+        for start in range(0, max_id, chunk_size):
+            bounds = (start, start + chunk_size)
+            # Sans limite de durée : une plage dense en interactions peut dépasser query_timeout
+            modified = await execute_query(sql, bounds + bounds, conn=conn, timeout=0)
+            stats["prospects_modifies"] += max(modified, 0)
+            stats["plages"] += 1
+    except Exception as e:
+        return {"success": False, "message": f"Échec du recalcul des résumés d'activité: {e}",
+                **stats, "duree_sec": round(time.perf_counter() - started, 3)}
+
+    if stats["prospects_modifies"]:
+        invalidate_report_cache()
+    return {"success": True,
+            "message": f"Résumés d'activité recalculés: {stats['prospects_modifies']} prospect(s) modifié(s).",
+            **stats, "duree_sec": round(time.perf_counter() - started, 3)}
+
 
 # --- C. CREATE (Ajout d'une Interaction) ---
 async def create_interaction(id_prospect: int, id_compte: int, type_interaction: str, note: str) -> Dict[str, Any]:
     """
     Ajoute une nouvelle interaction à la base de données et met à jour
     l'horodatage de modification ('date_update') du Prospect.
+    Un prospect supprimé (logiquement) est traité comme inexistant.
     """
 
     # Validation du type d'interaction
@@ -17,6 +99,10 @@ async def create_interaction(id_prospect: int, id_compte: int, type_interaction:
         return {"success": False,
                 "message": f"Type d'interaction invalide. Doit être l'un de: {', '.join(TYPE_INTERACTION)}."}
 
+    # Verrou exclusif pris avant l'INSERT : le prospect ne peut pas être supprimé avant la validation, et
+    # deux ajouts concurrents s'attendent (verrou partagé de la clé étrangère puis UPDATE = deadlock)
+    sql_check_prospect = "SELECT 1 FROM Prospect WHERE id_prospect = %s AND deleted_at IS NULL FOR UPDATE"
+
     # 1. Insertion de l'interaction
     sql_insert = """
                  INSERT INTO Interaction (id_prospect, id_compte, type, note)
@@ -24,22 +110,116 @@ async def create_interaction(id_prospect: int, id_compte: int, type_interaction:
                  """
     # NOTE: date_interaction est géré par DEFAULT CURRENT_TIMESTAMP dans la BDD
     params: Tuple = (id_prospect, id_compte, type_interaction, note)
+    # Mise à jour incrémentale à partir de la ligne insérée (LAST_INSERT_ID, même connexion) ;
+    # une interaction plus ancienne que la dernière connue ne change que le compteur
+    sql_update_prospect = """
+                          UPDATE Prospect p
+                              JOIN Interaction i ON i.id_interaction = LAST_INSERT_ID()
+                          SET p.date_update           = NOW(),
+                              p.interaction_count     = p.interaction_count + 1,
+                              p.last_interaction_type = IF(p.last_interaction_at IS NULL
+                                                               OR i.date_interaction >= p.last_interaction_at,
+                                                           i.type, p.last_interaction_type),
+                              p.last_interaction_at   = IF(p.last_interaction_at IS NULL
+                                                               OR i.date_interaction >= p.last_interaction_at,
+                                                           i.date_interaction, p.last_interaction_at)
+                          WHERE p.id_prospect = %s \
+                          """
 
     try:
-        # Exécuter l'insertion
-        await execute_query(sql_insert, params)
+        # Les deux requêtes partagent une connexion et sont validées ensemble
+        async with transaction() as conn:
+            if not await execute_query(sql_check_prospect, (id_prospect,), fetch_one=True, conn=conn):
+                return {"success": False, "message": f"Prospect ID {id_prospect} introuvable."}
 
-        # 2. Mise à jour de la colonne de dernière modification du Prospect
-        # ALIGNÉ BDD: Utilisation de la colonne 'date_update'
-        sql_update_prospect = "UPDATE Prospect SET date_update = NOW() WHERE id_prospect = %s"
-        await execute_query(sql_update_prospect, (id_prospect,))
+            # Exécuter l'insertion
+            await execute_query(sql_insert, params, conn=conn)
 
+            # 2. Mise à jour de la colonne de dernière modification du Prospect et de son résumé d'activité
+            # ALIGNÉ BDD: Utilisation de la colonne 'date_update'
+            await execute_query(sql_update_prospect, (id_prospect,), conn=conn)
+
+        invalidate_report_cache()
         return {"success": True, "message": "Interaction ajoutée et prospect mis à jour avec succès."}
     except Exception as e:
         # Gérer les erreurs de clés étrangères (prospect ou compte invalide)
         return {"success": False, "message": f"Échec de l'ajout de l'interaction: {e}"}
 
 
+# --- C. CREATE (Ajout en Masse d'Interactions) ---
+async def create_interactions_bulk(records: Sequence[Tuple[int, int, str, str]]) -> Dict[str, Any]:
+    """
+    Ajoute un lot d'interactions (campagne d'emails, session d'appels...) en une seule transaction.
+
+    Args:
+        records: Tuples (id_prospect, id_compte, type_interaction, note).
+
+    Le lot est validé entièrement avant toute écriture : un seul enregistrement invalide
+    et rien n'est inséré, de même si un prospect du lot est supprimé. Les interactions sont
+    insérées par un INSERT multi-lignes, puis la date_update et le résumé d'activité de chaque
+    prospect concerné sont mis à jour par un seul UPDATE ensembliste.
+    """
+    if not records:
+        return {"success": True, "message": "Aucune interaction à ajouter.", "inserees": 0, "prospects_mis_a_jour": 0}
+
+    errors: List[Dict[str, Any]] = []
+    invalid_count = 0  # Total réel ; seules les MAX_REPORTED_ERRORS premières erreurs sont détaillées
+    for index, record in enumerate(records):
+        if len(record) != 4:
+            message = "Enregistrement invalide: (id_prospect, id_compte, type, note) attendu."
+        elif record[2] not in TYPE_INTERACTION:
+            message = f"Type d'interaction '{record[2]}' invalide. Doit être l'un de: {', '.join(TYPE_INTERACTION)}."
+        else:
+            continue
+        invalid_count += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({"index": index, "message": message})
+
+    if invalid_count:
+        message = f"Lot refusé: {invalid_count} enregistrement(s) invalide(s)."
+        if invalid_count > len(errors):
+            message += f" Seules les {len(errors)} premières erreurs sont détaillées."
+        return {"success": False, "message": message, "inserees": 0, "prospects_mis_a_jour": 0,
+                "enregistrements_invalides": invalid_count, "details_erreurs": errors}
+
+    sql_insert = """
+                 INSERT INTO Interaction (id_prospect, id_compte, type, note)
+                 VALUES (%s, %s, %s, %s) \
+                 """
+    # Identifiants triés : les verrous de lignes sont pris dans le même ordre par tous les lots.
+    # Verrous exclusifs dès la vérification, comme create_interaction : le résumé d'activité met ensuite
+    # à jour ces mêmes lignes
+    prospect_ids = sorted({record[0] for record in records})
+    placeholders = ", ".join(["%s"] * len(prospect_ids))
+    sql_check_prospects = (f"SELECT id_prospect FROM Prospect"
+                           f" WHERE id_prospect IN ({placeholders}) AND deleted_at IS NULL"
+                           f" ORDER BY id_prospect FOR UPDATE")
+
+    try:
+        async with transaction() as conn:
+            rows = await execute_query(sql_check_prospects, tuple(prospect_ids), fetch_all=True, conn=conn)
+            missing = len(prospect_ids) - len(rows or [])
+            if missing:
+                return {"success": False, "message": f"Lot refusé: {missing} prospect(s) introuvable(s) ou supprimé(s).",
+                        "inserees": 0, "prospects_mis_a_jour": 0}
+            # executemany regroupe les lignes en INSERT multi-lignes
+            inserted = await execute_many(sql_insert, [tuple(record) for record in records], conn=conn)
+            await sync_interaction_summary(prospect_ids, conn=conn, touch=True)
+    except Exception as e:
+        # Clé étrangère invalide (prospect ou compte inexistant) : tout le lot est annulé
+        return {"success": False, "message": f"Échec de l'ajout des interactions: {e}",
+                "inserees": 0, "prospects_mis_a_jour": 0}
+
+    invalidate_report_cache()
+    return {
+        "success": True,
+        "message": f"{inserted} interaction(s) ajoutée(s), {len(prospect_ids)} prospect(s) mis à jour.",
+        "inserees": inserted,
+        # Tous les prospects du lot ont été vérifiés (et verrouillés) avant l'insertion
+        "prospects_mis_a_jour": len(prospect_ids),
+    }
+
+
 # --- R. READ (Historique par Prospect) ---
 async def get_interactions_by_prospect(id_prospect: int) -> List[Dict]:
     """
@@ -56,6 +236,7 @@ async def get_interactions_by_prospect(id_prospect: int) -> List[Dict]:
                  a.nom      AS createur_nom,
                  a.prenom   AS createur_prenom
           FROM Interaction i
+                   JOIN Prospect p ON p.id_prospect = i.id_prospect AND p.deleted_at IS NULL
                    JOIN Account a ON i.id_compte = a.id_compte
           WHERE i.id_prospect = %s
           ORDER BY i.date_interaction DESC \
@@ -66,18 +247,28 @@ async def get_interactions_by_prospect(id_prospect: int) -> List[Dict]:
 # --- D. DELETE (Suppression d'une Interaction) ---
 async def delete_interaction(id_interaction: int) -> Dict[str, Any]:
     """
-    Supprime une interaction spécifique.
-
-    NOTE: Une logique métier plus avancée devrait recalcule la date_update du Prospect
-    si la dernière interaction est supprimée. Pour l'instant, on se contente de la suppression simple.
+    Supprime une interaction spécifique et recalcule le résumé d'activité de son prospect
+    (compteur, date et type de la dernière interaction). La date_update du prospect est conservée.
     """
-
-    sql = "DELETE FROM Interaction WHERE id_interaction = %s"
+    # Les interactions d'un prospect supprimé ne sont plus visibles : elles ne sont effacées que par la purge
+    sql_lock = """
+               SELECT i.id_prospect
+               FROM Interaction i
+                        JOIN Prospect p ON p.id_prospect = i.id_prospect
+               WHERE i.id_interaction = %s
+                 AND p.deleted_at IS NULL
+               FOR UPDATE \
+               """
 
     try:
-        rows_affected = await execute_query(sql, (id_interaction,))
-        if rows_affected > 0:
-            return {"success": True, "message": "Interaction supprimée avec succès."}
-        return {"success": False, "message": "Interaction non trouvée."}
+        async with transaction() as conn:
+            row = await execute_query(sql_lock, (id_interaction,), fetch_one=True, conn=conn)
+            if not row:
+                return {"success": False, "message": "Interaction non trouvée."}
+            await execute_query("DELETE FROM Interaction WHERE id_interaction = %s", (id_interaction,), conn=conn)
+            await sync_interaction_summary([row['id_prospect']], conn=conn)
     except Exception as e:
-        return {"success": False, "message": f"Échec de la suppression: {e}"}
\ No newline at end of file
+        return {"success": False, "message": f"Échec de la suppression: {e}"}
+
+    invalidate_report_cache()
+    return {"success": True, "message": "Interaction supprimée avec succès."}
@@ -0,0 +1,250 @@
+# prospectDedup.py - Détection des prospects en double par blocs (clés hachées) et fusion
+import hashlib
+import re
+import time
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from Back.dbManager import execute_query, stream_query, transaction, DEFAULT_STREAM_CHUNK_SIZE
+from Back.StatsReport.statService import invalidate_report_cache
+from Back.Interaction.interactionService import sync_interaction_summary
+
+# --- Normalisation ---
+# Mêmes définitions que les colonnes générées email_norm et telephone_cle (migration 004) :
+# la vérification avant insertion interroge leurs index avec les valeurs calculées ici.
+PHONE_KEY_DIGITS = 9      # Numéro national sans indicatif ni 0 initial (ex: +261 34 ... et 034 ...)
+PHONE_KEY_MIN_DIGITS = 6  # En dessous, le numéro est jugé trop incomplet pour servir de clé
+
+# --- Score d'une paire ---
+# Seules les paires partageant une clé de bloc (email ou téléphone) sont comparées
+WEIGHT_EMAIL = 0.45
+WEIGHT_PHONE = 0.35
+WEIGHT_NAME = 0.30
+DEFAULT_DUPLICATE_THRESHOLD = 0.6
+MAX_PRE_INSERT_CANDIDATES = 20
+MAX_BLOCK_REPRESENTATIVES = 5  # Représentants conservés par bloc (un par groupe distinct)
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    """LOWER(TRIM(email)) ; None si vide."""
+    email = (email or '').strip(' ').lower()
+    return email or None
+
+
+def phone_key(telephone: Optional[str]) -> Optional[str]:
+    """Les PHONE_KEY_DIGITS derniers chiffres du numéro ; None si le numéro est trop court."""
+    digits = re.sub(r'[^0-9]', '', telephone or '')
+    if len(digits) < PHONE_KEY_MIN_DIGITS:
+        return None
+    return digits[-PHONE_KEY_DIGITS:]
+
+
+def normalize_name(nomp: Optional[str], prenomp: Optional[str]) -> str:
+    """Nom et prénom sans accents ni ponctuation, mots triés (nom et prénom inversés restent égaux)."""
+    text = unicodedata.normalize('NFKD', f"{nomp or ''} {prenomp or ''}")
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return ' '.join(sorted(re.findall(r'[a-z0-9]+', text)))
+
+
+def _block_hash(kind: str, value: str) -> int:
+    """Clé de bloc hachée sur 64 bits : un entier par clé, quelle que soit la longueur de la valeur."""
+    return int.from_bytes(hashlib.blake2b(f"{kind}:{value}".encode('utf8'), digest_size=8).digest(), 'big')
+
+
+def _signature(row: Dict[str, Any]) -> Tuple[int, Optional[str], Optional[str], str]:
+    return (row['id_prospect'], normalize_email(row.get('email')), phone_key(row.get('telephone')),
+            normalize_name(row.get('nomp'), row.get('prenomp')))
+
+
+def score_pair(a: Tuple, b: Tuple) -> float:
+    """Score de similarité (0 à 1) de deux signatures (id, email, clé téléphone, nom)."""
+    score = 0.0
+    if a[1] and a[1] == b[1]:
+        score += WEIGHT_EMAIL
+    if a[2] and a[2] == b[2]:
+        score += WEIGHT_PHONE
+    if a[3] and b[3]:
+        score += WEIGHT_NAME * SequenceMatcher(None, a[3], b[3]).ratio()
+    return round(min(score, 1.0), 3)
+
+
+# --- Union-Find (identifiants de prospects) ---
+
+def _find(parent: Dict[int, int], x: int) -> int:
+    while parent.get(x, x) != x:
+        parent[x] = parent.get(parent[x], parent[x])  # compression de chemin (par moitié)
+        x = parent[x]
+    return x
+
+
+def _union(parent: Dict[int, int], a: int, b: int):
+    root_a, root_b = _find(parent, a), _find(parent, b)
+    if root_a != root_b:
+        # La racine est le plus petit ID : le prospect le plus ancien survit à la fusion
+        parent[max(root_a, root_b)] = min(root_a, root_b)
+        parent.setdefault(min(root_a, root_b), min(root_a, root_b))
+
+
+# --- Détection sur toute la table ---
+async def find_duplicate_groups(threshold: float = DEFAULT_DUPLICATE_THRESHOLD,
+                                chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Détecte les groupes de prospects en double en un seul passage sur la table.
+
+    Chaque prospect est rattaché à ses blocs (email normalisé, clé téléphone), indexés par
+    leur empreinte. Un bloc garde au plus MAX_BLOCK_REPRESENTATIVES représentants, un par
+    groupe distinct : une adresse partagée (ex: email générique d'une société) peut ainsi
+    réunir plusieurs personnes sans masquer leurs doublons respectifs. Chaque ligne est
+    comparée aux représentants de ses blocs (au plus 2 x MAX_BLOCK_REPRESENTATIVES
+    comparaisons) et réunie (union-find) au meilleur, si son score atteint threshold ;
+    dans chaque groupe, le prospect de plus petit ID est le survivant.
+    """
+    sql = """
+          SELECT id_prospect, nomp, prenomp, telephone, email
+          FROM Prospect
+          WHERE deleted_at IS NULL
+          ORDER BY id_prospect \
+          """
+    started = time.perf_counter()
+    blocks: Dict[int, List[Tuple]] = {}
+    parent: Dict[int, int] = {}
+    pair_scores: Dict[int, float] = {}
+    scanned = compared = 0
+
+    try:
+        async for rows in stream_query(sql, None, chunk_size):
+            for row in rows:
+                scanned += 1
+                signature = _signature(row)
+                row_blocks = [blocks.setdefault(_block_hash(kind, value), [])
+                              for kind, value in (('e', signature[1]), ('t', signature[2])) if value]
+                seen = set()
+                best, best_score = None, threshold
+                for representatives in row_blocks:
+                    for representative in representatives:
+                        if representative[0] in seen:
+                            continue
+                        seen.add(representative[0])
+                        compared += 1
+                        score = score_pair(representative, signature)
+                        if score >= best_score:
+                            best, best_score = representative, score
+                if best is not None:
+                    _union(parent, best[0], signature[0])
+                    pair_scores[signature[0]] = best_score
+
+                # La ligne devient représentante des blocs où son groupe n'est pas encore représenté
+                root = _find(parent, signature[0])
+                for representatives in row_blocks:
+                    if (len(representatives) < MAX_BLOCK_REPRESENTATIVES
+                            and all(_find(parent, r[0]) != root for r in representatives)):
+                        representatives.append(signature)
+    except Exception as e:
+        return {"success": False, "message": f"Échec de la détection des doublons: {e}", "groupes": []}
+
+    members: Dict[int, List[int]] = {}
+    for prospect_id in parent:
+        root = _find(parent, prospect_id)
+        if root != prospect_id:
+            members.setdefault(root, []).append(prospect_id)
+    groups = [{"survivant": root, "doublons": sorted(ids),
+               "score_min": min(pair_scores.get(i, 1.0) for i in ids)}
+              for root, ids in sorted(members.items())]
+
+    return {
+        "success": True,
+        "message": f"{len(groups)} groupe(s) de doublons, {sum(len(g['doublons']) for g in groups)} "
+                   f"prospect(s) à fusionner sur {scanned} analysé(s).",
+        "groupes": groups,
+        "analyses": scanned,
+        "comparaisons": compared,
+        "duree_sec": round(time.perf_counter() - started, 3),
+    }
+
+
+# --- Vérification avant insertion ---
+async def find_duplicate_candidates(nomp: str, prenomp: str, telephone: str, email: str,
+                                    threshold: float = DEFAULT_DUPLICATE_THRESHOLD) -> List[Dict]:
+    """
+    Prospects existants probablement identiques au prospect décrit (score décroissant).
+    Une seule requête sur les index email_norm / telephone_cle : utilisable avant chaque insertion.
+    """
+    signature = (0, normalize_email(email), phone_key(telephone), normalize_name(nomp, prenomp))
+    conditions, params = [], []
+    if signature[1]:
+        conditions.append("email_norm = %s")
+        params.append(signature[1])
+    if signature[2]:
+        conditions.append("telephone_cle = %s")
+        params.append(signature[2])
+    if not conditions:
+        return []
+
+    sql = ("SELECT id_prospect, nomp, prenomp, telephone, email, assignation FROM Prospect"
+           " WHERE deleted_at IS NULL AND (" + " OR ".join(conditions) + ") LIMIT %s")
+    rows = await execute_query(sql, tuple(params + [MAX_PRE_INSERT_CANDIDATES]), fetch_all=True)
+
+    candidates = []
+    for row in rows or []:
+        score = score_pair(_signature(row), signature)
+        if score >= threshold:
+            candidates.append({**row, "score": score})
+    return sorted(candidates, key=lambda c: (-c['score'], c['id_prospect']))
+
+
+# --- Fusion ---
+async def merge_prospects(survivor_id: int, duplicate_ids: Sequence[int]) -> Dict[str, Any]:
+    """
+    Fusionne les doublons dans le prospect survivant, en une transaction :
+    leurs interactions sont rattachées au survivant (dont le résumé d'activité est recalculé),
+    les coordonnées manquantes du survivant sont complétées, puis les doublons sont supprimés logiquement.
+    """
+    duplicates = sorted({int(i) for i in duplicate_ids} - {survivor_id})
+    if not duplicates:
+        return {"success": False, "message": "Aucun doublon à fusionner.", "interactions_deplacees": 0}
+
+    ids = sorted(duplicates + [survivor_id])
+    placeholders = ", ".join(["%s"] * len(ids))
+    dup_placeholders = ", ".join(["%s"] * len(duplicates))
+    # Verrous pris dans l'ordre des IDs, comme les mises à jour en masse
+    sql_lock = (f"SELECT id_prospect, telephone, email, adresse FROM Prospect"
+                f" WHERE id_prospect IN ({placeholders}) AND deleted_at IS NULL ORDER BY id_prospect FOR UPDATE")
+
+    try:
+        async with transaction() as conn:
+            rows = await execute_query(sql_lock, tuple(ids), fetch_all=True, conn=conn)
+            found = {row['id_prospect']: row for row in rows or []}
+            if len(found) != len(ids):
+                missing = [i for i in ids if i not in found]
+                return {"success": False, "message": f"Prospect(s) introuvable(s) ou supprimé(s): {missing}",
+                        "interactions_deplacees": 0}
+
+            moved = await execute_query(f"UPDATE Interaction SET id_prospect = %s"
+                                        f" WHERE id_prospect IN ({dup_placeholders})",
+                                        tuple([survivor_id] + duplicates), conn=conn)
+
+            survivor = found[survivor_id]
+            fills = {}
+            for column in ('telephone', 'email', 'adresse'):
+                if not survivor[column]:
+                    value = next((found[i][column] for i in duplicates if found[i][column]), None)
+                    if value:
+                        fills[column] = value
+            set_sql = "".join(f", {column} = %s" for column in fills)
+            await execute_query(f"UPDATE Prospect SET date_update = NOW(){set_sql} WHERE id_prospect = %s",
+                                tuple(list(fills.values()) + [survivor_id]), conn=conn)
+            await sync_interaction_summary([survivor_id], conn=conn)
+
+            await execute_query(f"UPDATE Prospect SET deleted_at = NOW(), date_update = date_update"
+                                f" WHERE id_prospect IN ({dup_placeholders})",
+                                tuple(duplicates), conn=conn)
+    except Exception as e:
+        return {"success": False, "message": f"Échec de la fusion des prospects: {e}", "interactions_deplacees": 0}
+
+    invalidate_report_cache()
+    return {"success": True,
+            "message": f"{len(duplicates)} doublon(s) fusionné(s) dans le prospect ID {survivor_id} "
+                       f"({moved} interaction(s) déplacée(s)).",
+            "interactions_deplacees": moved,
+            "champs_completes": sorted(fills)}
@@ -0,0 +1,181 @@
+# prospectPurge.py - Purge physique, par petits lots, des prospects supprimés logiquement
+import asyncio
+import logging
+import time
+from typing import Dict, Any, List, Optional
+
+from Back.dbManager import execute_query
+from Back.Prospect.prospectService import DEFAULT_PURGE_RETENTION_HOURS
+
+logger = logging.getLogger("ProspectPurge")
+
+# --- Configuration de la Purge ---
+# Chaque DELETE est une instruction indépendante (autocommit) : les verrous sont relâchés entre deux lots
+DEFAULT_PURGE_CONFIG: Dict[str, Any] = {
+    "retention_hours": DEFAULT_PURGE_RETENTION_HOURS,  # Délai de restauration avant purge
+    "prospects_per_batch": 100,    # Prospects purgés ensemble
+    "interactions_per_batch": 500, # Interactions supprimées par DELETE
+    "pause": 0.5,                  # Pause (s) entre deux DELETE, pour laisser passer le trafic applicatif
+    "interval": 60.0,              # Pause (s) entre deux passes du worker
+}
+
+_worker: Optional[asyncio.Task] = None
+_stop: Optional[asyncio.Event] = None
+
+# Compteurs cumulés (voir get_purge_stats)
+_purge_counters: Dict[str, Any] = {
+    "passes": 0,
+    "prospects_purges": 0,
+    "interactions_purgees": 0,
+    "derniere_passe": None,
+    "derniere_erreur": None,
+}
+
+
+async def _pause(seconds: float, stop: Optional[asyncio.Event]) -> bool:
+    """Attend seconds secondes ; retourne True si l'arrêt a été demandé entre-temps."""
+    if stop is None:
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+        return False
+    try:
+        await asyncio.wait_for(stop.wait(), timeout=max(seconds, 0))
+    except asyncio.TimeoutError:
+        pass
+    return stop.is_set()
+
+
+# --- Une Passe de Purge ---
+async def purge_deleted_prospects(retention_hours: float = DEFAULT_PURGE_CONFIG["retention_hours"],
+                                  prospects_per_batch: int = DEFAULT_PURGE_CONFIG["prospects_per_batch"],
+                                  interactions_per_batch: int = DEFAULT_PURGE_CONFIG["interactions_per_batch"],
+                                  pause: float = DEFAULT_PURGE_CONFIG["pause"],
+                                  stop: Optional[asyncio.Event] = None) -> Dict[str, Any]:
+    """
+    Supprime physiquement les prospects supprimés depuis plus de retention_hours, et leurs interactions.
+
+    Les prospects sont traités par groupes de prospects_per_batch : leurs interactions sont
+    supprimées par DELETE ... LIMIT interactions_per_batch, séparés par une pause, puis les
+    prospects eux-mêmes. Une passe interrompue (arrêt, erreur) reprend simplement à la suivante.
+    """
+    retention_sec = int(retention_hours * 3600)
+    prospects_per_batch = max(1, int(prospects_per_batch))
+    interactions_per_batch = max(1, int(interactions_per_batch))
+    # deleted_at < NOW() - rétention : restore_prospect refuse ces prospects, ils ne peuvent plus réapparaître
+    sql_candidates = """
+                     SELECT id_prospect
+                     FROM Prospect
+                     WHERE deleted_at IS NOT NULL
+                       AND deleted_at < NOW() - INTERVAL %s SECOND
+                     ORDER BY deleted_at, id_prospect
+                     LIMIT %s \
+                     """
+    stats = {"prospects_purges": 0, "interactions_purgees": 0, "lots": 0}
+    started = time.perf_counter()
+
+    try:
+        while not (stop and stop.is_set()):
+            rows = await execute_query(sql_candidates, (retention_sec, prospects_per_batch), fetch_all=True)
+            ids: List[int] = [row['id_prospect'] for row in rows or []]
+            if not ids:
+                break
+
+            placeholders = ", ".join(["%s"] * len(ids))
+            sql_interactions = f"DELETE FROM Interaction WHERE id_prospect IN ({placeholders}) LIMIT %s"
+            stopped = False
+            while True:
+                deleted = await execute_query(sql_interactions, tuple(ids + [interactions_per_batch]))
+                stats["interactions_purgees"] += max(deleted, 0)
+                stats["lots"] += 1
+                if deleted < interactions_per_batch:
+                    break
+                if await _pause(pause, stop):
+                    stopped = True
+                    break
+            if stopped:
+                break
+
+            # Les compteurs de statuts ignorent déjà ces lignes (trigger compteur_statut_suppression)
+            sql_prospects = (f"DELETE FROM Prospect WHERE id_prospect IN ({placeholders})"
+                             f" AND deleted_at IS NOT NULL")
+            stats["prospects_purges"] += max(await execute_query(sql_prospects, tuple(ids)), 0)
+            stats["lots"] += 1
+            if await _pause(pause, stop):
+                break
+    except Exception as e:
+        _record_pass(stats, str(e))
+        return {"success": False, "message": f"Échec de la purge des prospects supprimés: {e}",
+                **stats, "duree_sec": round(time.perf_counter() - started, 3)}
+
+    _record_pass(stats, None)
+    return {"success": True,
+            "message": f"{stats['prospects_purges']} prospect(s) et {stats['interactions_purgees']} "
+                       f"interaction(s) purgé(s).",
+            **stats, "duree_sec": round(time.perf_counter() - started, 3)}
+
+
+def _record_pass(stats: Dict[str, int], error: Optional[str]):
+    _purge_counters["passes"] += 1
+    _purge_counters["prospects_purges"] += stats["prospects_purges"]
+    _purge_counters["interactions_purgees"] += stats["interactions_purgees"]
+    _purge_counters["derniere_passe"] = time.time()
+    if error:
+        _purge_counters["derniere_erreur"] = error
+
+
+# --- Worker d'Arrière-Plan ---
+async def _run_worker(config: Dict[str, Any], stop: asyncio.Event):
+    interval = config.pop("interval")
+    while not stop.is_set():
+        result = await purge_deleted_prospects(**config, stop=stop)
+        if not result["success"]:
+            logger.error(result["message"])
+        elif result["prospects_purges"]:
+            logger.info(result["message"])
+        await _pause(interval, stop)
+
+
+def start_purge_worker(**options) -> bool:
+    """
+    Démarre la purge périodique dans la boucle asyncio courante (options : voir DEFAULT_PURGE_CONFIG).
+    Retourne False si le worker tourne déjà.
+    """
+    global _worker, _stop
+    if _worker and not _worker.done():
+        return False
+    unknown = set(options) - set(DEFAULT_PURGE_CONFIG)
+    if unknown:
+        raise ValueError(f"Option(s) de purge inconnue(s): {', '.join(sorted(unknown))}")
+
+    _stop = asyncio.Event()
+    _worker = asyncio.create_task(_run_worker({**DEFAULT_PURGE_CONFIG, **options}, _stop))
+    logger.info("Worker de purge des prospects supprimés démarré.")
+    return True
+
+
+async def stop_purge_worker(timeout: float = 10.0):
+    """Arrête le worker à la fin du lot en cours (annulé au-delà de timeout secondes)."""
+    global _worker, _stop
+    if not _worker:
+        return
+    _stop.set()
+    try:
+        await asyncio.wait_for(_worker, timeout=timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        pass
+    _worker, _stop = None, None
+    logger.info("Worker de purge des prospects supprimés arrêté.")
+
+
+async def get_purge_stats() -> Dict[str, Any]:
+    """Prospects en attente de purge et compteurs cumulés du worker."""
+    row = await execute_query(
+        "SELECT COUNT(*) AS en_attente, MIN(deleted_at) AS plus_ancienne FROM Prospect WHERE deleted_at IS NOT NULL",
+        fetch_one=True
+    )
+    return {
+        "actif": bool(_worker and not _worker.done()),
+        "en_attente": row['en_attente'] if row else 0,
+        "plus_ancienne_suppression": row['plus_ancienne'] if row else None,
+        **_purge_counters,
+    }
@@ -1,18 +1,76 @@
-from typing import Dict, Optional, List, Any, Tuple
+import base64
+import binascii
+import json
+import re
+import time
+from datetime import datetime
+from typing import Dict, Optional, List, Any, Tuple, Sequence
 from Back.dbManager import execute_query
+from Back.StatsReport.statService import invalidate_report_cache
+from Back.Prospect.prospectDedup import find_duplicate_candidates
 
 # --- Constantes (Types et Status) ---
 TYPE_PROSPECT = ('particulier', 'societe', 'organisation')
 STATUS_PROSPECT = ('nouveau', 'interesse', 'negociation', 'perdu', 'converti')
 
+# --- Recherche ---
+# 'fulltext' : index FULLTEXT (nomp, prenomp, email) + préfixe sur telephone_norm ; 'like' : ancien mode LIKE '%terme%'
+SEARCH_MODES = ('fulltext', 'like')
+DEFAULT_SEARCH_MODE = 'fulltext'
+FULLTEXT_MIN_WORD_LENGTH = 3  # innodb_ft_min_token_size par défaut
+PHONE_MIN_DIGITS = 3
+
+# --- Pagination ---
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# --- Tris des listes ---
+# 'maj' : date_update DESC ; 'inactivite' : dernière interaction ASC, les jamais contactés en premier
+PROSPECT_SORTS = ('maj', 'inactivite')
+DEFAULT_PROSPECT_SORT = 'maj'
+
+# Nombre d'interactions récentes renvoyées par get_prospect_detail
+DEFAULT_DETAIL_INTERACTIONS = 20
+
+# Délai pendant lequel un prospect supprimé reste restaurable avant d'être purgé physiquement
+DEFAULT_PURGE_RETENTION_HOURS = 24.0
+
+# --- Opérations en Masse ---
+# Chaque lot est un UPDATE indépendant (autocommit) : les verrous de lignes sont relâchés entre deux lots
+BULK_UPDATE_CHUNK_SIZE = 1000
+MAX_BULK_UPDATE_CHUNK_SIZE = 10000
+
+# Colonnes communes à la liste et à la pagination des prospects
+_PROSPECT_LIST_SELECT = """
+          SELECT p.id_prospect,
+                 p.nomp,
+                 p.prenomp,
+                 p.telephone,
+                 p.email,
+                 p.status,
+                 p.creation,
+                 p.date_update,
+                 p.assignation,
+                 p.last_interaction_at,
+                 p.last_interaction_type,
+                 p.interaction_count,
+                 a.username AS username_assigne
+          FROM Prospect p
+                   LEFT JOIN Account a ON p.assignation = a.id_compte
+          WHERE p.deleted_at IS NULL \
+          """
+
 
 # --- C. CREATE (Création d'un Prospect) ---
 async def create_prospect(nomp: str, prenomp: str, telephone: str, email: str, adresse: str, type_prospect: str,
-                          status_prospect: str, assignation_id: int) -> Dict[str, Any]:
+                          status_prospect: str, assignation_id: int,
+                          check_duplicates: bool = False) -> Dict[str, Any]:
     """
     Ajoute un nouveau prospect à la base de données après validation.
 
     Correction: Ajout de status_prospect dans la signature pour l'alignement avec la BDD/Front.
+    Si check_duplicates est vrai, la création est refusée quand des doublons probables existent
+    (même email ou même téléphone normalisé) ; ils sont renvoyés sous la clé "doublons".
     """
 
     # Validation basique du type et statut de prospect
@@ -23,6 +81,16 @@ async def create_prospect(nomp: str, prenomp: str, telephone: str, email: str, a
         return {"success": False,
                 "message": f"Statut de prospect invalide. Doit être l'un de: {', '.join(STATUS_PROSPECT)}."}
 
+    if check_duplicates:
+        try:
+            duplicates = await find_duplicate_candidates(nomp, prenomp, telephone, email)
+        except Exception as e:
+            return {"success": False, "message": f"Erreur BDD lors de la recherche de doublons: {e}"}
+        if duplicates:
+            return {"success": False,
+                    "message": f"{len(duplicates)} prospect(s) similaire(s) déjà enregistré(s).",
+                    "doublons": duplicates}
+
     sql = """
           INSERT INTO Prospect (nomp, prenomp, telephone, email, adresse, type, status, assignation)
           VALUES (%s, %s, %s, %s, %s, %s, %s, %s) \
@@ -32,6 +100,7 @@ async def create_prospect(nomp: str, prenomp: str, telephone: str, email: str, a
     try:
         rows_affected = await execute_query(sql, params)
         if rows_affected > 0:
+            invalidate_report_cache()
             # Idéalement, on récupérerait l'ID généré pour le front-end
             return {"success": True, "message": "Prospect créé avec succès."}
         return {"success": False, "message": "Échec de la création du prospect (aucune ligne affectée)."}
@@ -49,34 +118,120 @@ async def get_prospect_by_id(id_prospect: int) -> Optional[Dict]:
                  a.nom      AS nom_assigne
           FROM Prospect p
                    LEFT JOIN Account a ON p.assignation = a.id_compte
-          WHERE p.id_prospect = %s \
+          WHERE p.id_prospect = %s
+            AND p.deleted_at IS NULL \
           """
     return await execute_query(sql, (id_prospect,), fetch_one=True)
 
 
-async def get_prospects_list(assignation_filter: Optional[int] = None, status_filter: Optional[str] = None,
-                             search_term: Optional[str] = None) -> List[Dict]:
+async def get_prospect_detail(id_prospect: int,
+                              interactions_limit: int = DEFAULT_DETAIL_INTERACTIONS) -> Optional[Dict[str, Any]]:
     """
-    Récupère la liste des prospects, supportant les filtres et la recherche.
+    Récupère en une seule requête le prospect, son responsable et ses interactions les plus récentes.
 
-    Correction: Inversion de l'ordre des paramètres optionnels status_filter et assignation_filter
-    pour aligner la signature avec la logique de filtrage ci-dessous.
+    Returns:
+        None si le prospect n'existe pas, sinon:
+        {"prospect": {...}, "assigne": {...} ou None, "interactions": [...] (au plus interactions_limit,
+         de la plus récente à la plus ancienne), "nb_interactions": total, "interactions_tronquees": bool}
     """
+    interactions_limit = max(0, min(int(interactions_limit), MAX_PAGE_SIZE))
 
+    # Une ligne par interaction récente (colonnes du prospect répétées), une seule ligne s'il n'y en a aucune
     sql = """
-          SELECT p.id_prospect,
-                 p.nomp,
-                 p.prenomp,
-                 p.telephone,
-                 p.email,
-                 p.status,
-                 p.creation,
-                 p.date_update,
-                 a.username AS username_assigne
+          SELECT p.*,
+                 a.username  AS username_assigne,
+                 a.nom       AS nom_assigne,
+                 a.prenom    AS prenom_assigne,
+                 a.email     AS email_assigne,
+                 i.id_interaction,
+                 i.type      AS type_interaction,
+                 i.note,
+                 i.date_interaction,
+                 ia.username AS createur_username,
+                 ia.nom      AS createur_nom,
+                 ia.prenom   AS createur_prenom
           FROM Prospect p
                    LEFT JOIN Account a ON p.assignation = a.id_compte
-          WHERE 1 = 1 \
+                   LEFT JOIN (SELECT id_interaction, id_prospect, id_compte, type, note, date_interaction
+                              FROM Interaction
+                              WHERE id_prospect = %s
+                              ORDER BY date_interaction DESC, id_interaction DESC
+                              LIMIT %s) i ON i.id_prospect = p.id_prospect
+                   LEFT JOIN Account ia ON i.id_compte = ia.id_compte
+          WHERE p.id_prospect = %s
+            AND p.deleted_at IS NULL
+          ORDER BY i.date_interaction DESC, i.id_interaction DESC \
           """
+    rows = await execute_query(sql, (id_prospect, interactions_limit, id_prospect), fetch_all=True)
+    if not rows:
+        return None
+
+    interaction_keys = ('id_interaction', 'type_interaction', 'note', 'date_interaction',
+                        'createur_username', 'createur_nom', 'createur_prenom')
+    first = rows[0]
+    prospect = {key: value for key, value in first.items() if key not in interaction_keys}
+
+    assigne = None
+    if first['username_assigne'] is not None:
+        assigne = {"id_compte": first['assignation'], "username": first['username_assigne'],
+                   "nom": first['nom_assigne'], "prenom": first['prenom_assigne'], "email": first['email_assigne']}
+
+    # Même forme que get_interactions_by_prospect
+    interactions = [
+        {"id_interaction": row['id_interaction'], "type": row['type_interaction'], "note": row['note'],
+         "date_interaction": row['date_interaction'], "createur_username": row['createur_username'],
+         "createur_nom": row['createur_nom'], "createur_prenom": row['createur_prenom']}
+        for row in rows if row['id_interaction'] is not None
+    ]
+
+    return {
+        "prospect": prospect,
+        "assigne": assigne,
+        "interactions": interactions,
+        # Compteur dénormalisé (interaction_count) : pas de COUNT(*) sur Interaction
+        "nb_interactions": first['interaction_count'],
+        "interactions_tronquees": first['interaction_count'] > len(interactions),
+    }
+
+
+def _phone_search_digits(search_term: str) -> Optional[str]:
+    """Si le terme ressemble à un numéro de téléphone, retourne ses chiffres (forme de telephone_norm)."""
+    if re.fullmatch(r"[\d\s+().-]+", search_term):
+        digits = re.sub(r"\D", "", search_term)
+        if len(digits) >= PHONE_MIN_DIGITS:
+            return digits
+    return None
+
+
+def _fulltext_query(search_term: str) -> Optional[str]:
+    """
+    Construit la requête MATCH ... AGAINST en mode booléen : chaque mot est obligatoire
+    et recherché en préfixe (+mot*). Retourne None si aucun mot n'est indexable.
+    """
+    # Les opérateurs du mode booléen saisis par l'utilisateur sont neutralisés
+    words = re.sub(r'[+\-<>()~*"@.]', ' ', search_term).split()
+    words = [w for w in words if len(w) >= FULLTEXT_MIN_WORD_LENGTH]
+    if not words:
+        return None
+    return " ".join(f"+{w}*" for w in words)
+
+
+def _like_search_filter(search_term: str) -> Tuple[str, List[Any]]:
+    """Recherche LIKE '%terme%' sur le nom, prénom, email et téléphone (parcours complet de la table)."""
+    search_like = f"%{search_term}%"
+    sql = " AND (p.nomp LIKE %s OR p.prenomp LIKE %s OR p.email LIKE %s OR p.telephone LIKE %s)"
+    return sql, [search_like, search_like, search_like, search_like]
+
+
+def build_prospect_filters(assignation_filter: Optional[int], status_filter: Optional[str],
+                           search_term: Optional[str], search_mode: str = DEFAULT_SEARCH_MODE,
+                           inactive_days: Optional[int] = None) -> Tuple[str, List[Any]]:
+    """
+    Construit les clauses WHERE communes à la liste et à la pagination des prospects.
+    inactive_days : seulement les prospects sans interaction depuis ce nombre de jours (ou jamais contactés).
+    Retourne le fragment SQL (commençant par ' AND ...') et ses paramètres.
+    """
+    sql = ""
     params: List[Any] = []
 
     # Vérification de l'assignation en premier (logique Admin/Commercial)
@@ -90,16 +245,149 @@ async def get_prospects_list(assignation_filter: Optional[int] = None, status_fi
         params.append(status_filter)
 
     if search_term:
-        # Recherche dans le nom, prénom ou email, téléphone
-        search_like = f"%{search_term}%"
-        sql += " AND (p.nomp LIKE %s OR p.prenomp LIKE %s OR p.email LIKE %s OR p.telephone LIKE %s)"
-        params.extend([search_like, search_like, search_like, search_like])
+        search_term = search_term.strip()
+        phone_digits = _phone_search_digits(search_term)
+        fulltext_query = _fulltext_query(search_term)
+
+        if search_mode == 'fulltext' and phone_digits:
+            # Préfixe sur la colonne normalisée indexée (chiffres uniquement)
+            sql += " AND p.telephone_norm LIKE %s"
+            params.append(f"{phone_digits}%")
+        elif search_mode == 'fulltext' and fulltext_query:
+            sql += " AND MATCH (p.nomp, p.prenomp, p.email) AGAINST (%s IN BOOLEAN MODE)"
+            params.append(fulltext_query)
+        else:
+            # Mode 'like' demandé, ou terme trop court pour l'index FULLTEXT
+            like_sql, like_params = _like_search_filter(search_term)
+            sql += like_sql
+            params.extend(like_params)
+
+    if inactive_days is not None:
+        # Les NULL précèdent toutes les dates dans l'index : une seule plage sur last_interaction_at
+        sql += " AND (p.last_interaction_at IS NULL OR p.last_interaction_at < NOW() - INTERVAL %s DAY)"
+        params.append(max(0, int(inactive_days)))
+
+    return sql, params
 
-    sql += " ORDER BY p.date_update DESC"
+
+async def get_prospects_list(assignation_filter: Optional[int] = None, status_filter: Optional[str] = None,
+                             search_term: Optional[str] = None, search_mode: str = DEFAULT_SEARCH_MODE,
+                             inactive_days: Optional[int] = None, sort: str = DEFAULT_PROSPECT_SORT) -> List[Dict]:
+    """
+    Récupère la liste des prospects, supportant les filtres et la recherche.
+
+    Correction: Inversion de l'ordre des paramètres optionnels status_filter et assignation_filter
+    pour aligner la signature avec la logique de filtrage ci-dessous.
+
+    En mode 'fulltext', une recherche textuelle est classée par pertinence (MATCH ... AGAINST)
+    et un numéro de téléphone est cherché en préfixe sur telephone_norm. sort='inactivite' trie
+    par dernière interaction (prospects à relancer d'abord) au lieu de la pertinence.
+
+    NOTE: Retourne toutes les lignes correspondantes. Pour les listes volumineuses,
+    utiliser get_prospects_page.
+    """
+
+    if search_mode not in SEARCH_MODES:
+        raise ValueError(f"Mode de recherche invalide. Doit être l'un de: {', '.join(SEARCH_MODES)}.")
+    if sort not in PROSPECT_SORTS:
+        raise ValueError(f"Tri invalide. Doit être l'un de: {', '.join(PROSPECT_SORTS)}.")
+
+    sql = _PROSPECT_LIST_SELECT
+    filters_sql, params = build_prospect_filters(assignation_filter, status_filter, search_term, search_mode,
+                                                 inactive_days)
+    sql += filters_sql
+
+    fulltext_query = _fulltext_query(search_term) if search_term else None
+    if sort == 'inactivite':
+        sql += " ORDER BY p.last_interaction_at ASC, p.id_prospect ASC"
+    elif search_mode == 'fulltext' and fulltext_query and not _phone_search_digits(search_term.strip()):
+        # Classement par pertinence, puis du plus récent au plus ancien
+        sql += " ORDER BY MATCH (p.nomp, p.prenomp, p.email) AGAINST (%s IN BOOLEAN MODE) DESC,"
+        sql += " p.date_update DESC, p.id_prospect DESC"
+        params.append(fulltext_query)
+    else:
+        sql += " ORDER BY p.date_update DESC, p.id_prospect DESC"
 
     return await execute_query(sql, tuple(params), fetch_all=True)
 
 
+# --- Pagination par curseur (keyset) ---
+def encode_prospect_cursor(sort_value: Optional[datetime], id_prospect: int) -> str:
+    """Encode la position (valeur de tri, id_prospect) d'une ligne en curseur opaque."""
+    raw = json.dumps([sort_value.isoformat() if sort_value else None, id_prospect])
+    return base64.urlsafe_b64encode(raw.encode('utf8')).decode('ascii')
+
+
+def decode_prospect_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """Décode un curseur produit par encode_prospect_cursor. Lève ValueError s'il est invalide."""
+    try:
+        date_str, id_prospect = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return (datetime.fromisoformat(date_str) if date_str is not None else None), int(id_prospect)
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise ValueError(f"Curseur de pagination invalide: {e}") from e
+
+
+async def get_prospects_page(page_size: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                             assignation_filter: Optional[int] = None, status_filter: Optional[str] = None,
+                             search_term: Optional[str] = None,
+                             search_mode: str = DEFAULT_SEARCH_MODE, inactive_days: Optional[int] = None,
+                             sort: str = DEFAULT_PROSPECT_SORT) -> Dict[str, Any]:
+    """
+    Récupère une page de prospects triés par date_update DESC, id_prospect DESC (sort='maj'),
+    ou par last_interaction_at ASC, id_prospect ASC (sort='inactivite', jamais contactés en premier).
+
+    La position est portée par un curseur opaque (valeur de tri, id_prospect) plutôt que
+    par un OFFSET : le coût de chaque page reste constant quelle que soit la profondeur.
+    Une recherche filtre les lignes mais ne change pas cet ordre (pas de tri par pertinence).
+    Un curseur n'est valable que pour le tri qui l'a produit.
+
+    Returns:
+        {"prospects": [...], "next_cursor": str | None} ; next_cursor vaut None sur la dernière page.
+    """
+    if search_mode not in SEARCH_MODES:
+        raise ValueError(f"Mode de recherche invalide. Doit être l'un de: {', '.join(SEARCH_MODES)}.")
+    if sort not in PROSPECT_SORTS:
+        raise ValueError(f"Tri invalide. Doit être l'un de: {', '.join(PROSPECT_SORTS)}.")
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    sort_column = 'date_update' if sort == 'maj' else 'last_interaction_at'
+
+    sql = _PROSPECT_LIST_SELECT
+    filters_sql, params = build_prospect_filters(assignation_filter, status_filter, search_term, search_mode,
+                                                 inactive_days)
+    sql += filters_sql
+
+    if cursor:
+        last_value, last_id = decode_prospect_cursor(cursor)
+        if sort == 'maj':
+            sql += " AND (p.date_update < %s OR (p.date_update = %s AND p.id_prospect < %s))"
+            params.extend([last_value, last_value, last_id])
+        elif last_value is None:
+            # Ordre croissant : les NULL (jamais contactés) viennent avant toutes les dates
+            sql += " AND ((p.last_interaction_at IS NULL AND p.id_prospect > %s) OR p.last_interaction_at IS NOT NULL)"
+            params.append(last_id)
+        else:
+            sql += (" AND (p.last_interaction_at > %s"
+                    " OR (p.last_interaction_at = %s AND p.id_prospect > %s))")
+            params.extend([last_value, last_value, last_id])
+
+    # Une ligne de plus que demandé pour savoir s'il existe une page suivante
+    if sort == 'maj':
+        sql += " ORDER BY p.date_update DESC, p.id_prospect DESC LIMIT %s"
+    else:
+        sql += " ORDER BY p.last_interaction_at ASC, p.id_prospect ASC LIMIT %s"
+    params.append(page_size + 1)
+
+    rows = await execute_query(sql, tuple(params), fetch_all=True) or []
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_prospect_cursor(last[sort_column], last['id_prospect'])
+
+    return {"prospects": list(rows), "next_cursor": next_cursor}
+
+
 # --- U. UPDATE (Mise à jour d'un Prospect) ---
 async def update_prospect(id_prospect: int, fields_to_update: Dict[str, Any]) -> Dict[str, Any]:
     """Met à jour un prospect avec un dictionnaire de champs à modifier."""
@@ -127,35 +415,173 @@ async def update_prospect(id_prospect: int, fields_to_update: Dict[str, Any]) ->
     if not set_clauses:
         return {"success": False, "message": "Champs de mise à jour invalides ou non autorisés."}
 
-    sql = "UPDATE Prospect SET " + ", ".join(set_clauses) + " WHERE id_prospect = %s"
+    sql = "UPDATE Prospect SET " + ", ".join(set_clauses) + " WHERE id_prospect = %s AND deleted_at IS NULL"
     params.append(id_prospect)
 
     try:
         rows_affected = await execute_query(sql, tuple(params))
         if rows_affected > 0:
+            invalidate_report_cache()
             return {"success": True, "message": "Prospect mis à jour avec succès."}
         return {"success": False, "message": "Aucune modification effectuée ou prospect non trouvé."}
     except Exception as e:
         return {"success": False, "message": f"Erreur BDD lors de la mise à jour: {e}"}
 
 
-# --- D. DELETE (Suppression d'un Prospect) ---
+# --- U. UPDATE (Réassignation / Changement de Statut en Masse) ---
+async def _bulk_update_prospects(column: str, value: Any, ids: Optional[Sequence[int]],
+                                 assignation_filter: Optional[int], status_filter: Optional[str],
+                                 search_term: Optional[str], search_mode: str, chunk_size: int) -> Dict[str, Any]:
+    """
+    Applique column = value aux prospects désignés par ids, ou par les filtres de get_prospects_list.
+
+    Les prospects sont traités par lots de chunk_size, dans l'ordre de id_prospect :
+    - mode filtres : les IDs du lot sont lus par pagination sur id_prospect (keyset), puis
+      l'UPDATE réapplique les filtres, au cas où une ligne aurait changé entre-temps ;
+    - mode IDs : la liste dédoublonnée et triée est découpée directement ; seuls les IDs
+      existants et non supprimés sont comptés comme sélectionnés, les autres sont « introuvables ».
+    Les prospects ayant déjà la valeur cible ne sont ni verrouillés ni comptés comme modifiés.
+    """
+    chunk_size = max(1, min(int(chunk_size), MAX_BULK_UPDATE_CHUNK_SIZE))
+    filter_sql, filter_params = "", []
+    if ids is None:
+        filter_sql, filter_params = build_prospect_filters(assignation_filter, status_filter, search_term, search_mode)
+        if not filter_sql:
+            return {"success": False, "message": "Au moins un filtre ou une liste d'IDs est requis.",
+                    "selectionnes": 0, "introuvables": 0, "modifies": 0, "lots": 0}
+        pending_ids = None
+    else:
+        pending_ids = sorted({int(i) for i in ids})
+
+    stats = {"selectionnes": 0, "introuvables": 0, "modifies": 0, "lots": 0}
+    started = time.perf_counter()
+    last_id = 0
+    position = 0
+
+    try:
+        while True:
+            if pending_ids is None:
+                sql_select = ("SELECT p.id_prospect FROM Prospect p"
+                              " WHERE p.deleted_at IS NULL AND p.id_prospect > %s" + filter_sql +
+                              " ORDER BY p.id_prospect LIMIT %s")
+                rows = await execute_query(sql_select, tuple([last_id] + filter_params + [chunk_size]), fetch_all=True)
+                chunk = [row['id_prospect'] for row in rows or []]
+            else:
+                chunk = pending_ids[position:position + chunk_size]
+                position += chunk_size
+            if not chunk:
+                break
+
+            last_id = chunk[-1]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            selected = len(chunk)
+            if pending_ids is not None:
+                # IDs fournis par l'appelant : certains peuvent ne pas exister ou être supprimés
+                row = await execute_query(f"SELECT COUNT(*) AS total FROM Prospect"
+                                          f" WHERE id_prospect IN ({placeholders}) AND deleted_at IS NULL",
+                                          tuple(chunk), fetch_one=True)
+                selected = row['total'] if row else 0
+            sql_update = (f"UPDATE Prospect p SET p.{column} = %s"
+                          f" WHERE p.id_prospect IN ({placeholders}) AND p.deleted_at IS NULL"
+                          f" AND NOT (p.{column} <=> %s)" + filter_sql)
+            modified = await execute_query(sql_update, tuple([value] + chunk + [value] + filter_params))
+
+            stats["selectionnes"] += selected
+            stats["introuvables"] += len(chunk) - selected
+            stats["modifies"] += max(modified, 0)
+            stats["lots"] += 1
+    except Exception as e:
+        if stats["modifies"]:
+            invalidate_report_cache()
+        return {"success": False, "message": f"Erreur BDD pendant la mise à jour en masse (lots déjà validés: "
+                                             f"{stats['lots']}, prospects modifiés: {stats['modifies']}): {e}",
+                **stats, "duree_sec": round(time.perf_counter() - started, 3)}
+
+    if stats["modifies"]:
+        invalidate_report_cache()
+    message = f"{stats['modifies']} prospect(s) modifié(s) sur {stats['selectionnes']} sélectionné(s)"
+    if stats["introuvables"]:
+        message += f", {stats['introuvables']} ID(s) introuvable(s) ou supprimé(s)"
+    return {"success": True,
+            "message": message + ".",
+            **stats, "duree_sec": round(time.perf_counter() - started, 3)}
+
+
+async def bulk_reassign_prospects(new_assignation: int, ids: Optional[Sequence[int]] = None,
+                                  assignation_filter: Optional[int] = None, status_filter: Optional[str] = None,
+                                  search_term: Optional[str] = None, search_mode: str = DEFAULT_SEARCH_MODE,
+                                  chunk_size: int = BULK_UPDATE_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Réassigne au compte new_assignation les prospects désignés par ids, ou par les filtres
+    de get_prospects_list (ex: assignation_filter=ancien commercial).
+    """
+    account = await execute_query("SELECT id_compte FROM Account WHERE id_compte = %s", (new_assignation,),
+                                  fetch_one=True)
+    if not account:
+        return {"success": False, "message": f"Compte ID {new_assignation} introuvable.",
+                "selectionnes": 0, "introuvables": 0, "modifies": 0, "lots": 0}
+    return await _bulk_update_prospects('assignation', new_assignation, ids, assignation_filter, status_filter,
+                                        search_term, search_mode, chunk_size)
+
+
+async def bulk_change_status(new_status: str, ids: Optional[Sequence[int]] = None,
+                             assignation_filter: Optional[int] = None, status_filter: Optional[str] = None,
+                             search_term: Optional[str] = None, search_mode: str = DEFAULT_SEARCH_MODE,
+                             chunk_size: int = BULK_UPDATE_CHUNK_SIZE) -> Dict[str, Any]:
+    """Passe au statut new_status les prospects désignés par ids, ou par les filtres de get_prospects_list."""
+    if new_status not in STATUS_PROSPECT:
+        return {"success": False, "message": f"Statut de prospect '{new_status}' invalide.",
+                "selectionnes": 0, "introuvables": 0, "modifies": 0, "lots": 0}
+    return await _bulk_update_prospects('status', new_status, ids, assignation_filter, status_filter,
+                                        search_term, search_mode, chunk_size)
+
+
+# --- D. DELETE (Suppression Logique d'un Prospect) ---
 async def delete_prospect(id_prospect: int) -> Dict[str, Any]:
     """
-    Supprime un prospect par son ID. Gère la suppression des interactions liées.
+    Supprime logiquement un prospect : une seule ligne modifiée (deleted_at), quel que soit
+    le nombre d'interactions. Le prospect disparaît immédiatement de toutes les lectures ;
+    ses interactions puis la ligne elle-même sont effacées plus tard, par lots, par prospectPurge.
     """
+    # date_update inchangée : une suppression logique n'est pas une modification de la fiche
+    sql = """
+          UPDATE Prospect
+          SET deleted_at  = NOW(),
+              date_update = date_update
+          WHERE id_prospect = %s
+            AND deleted_at IS NULL \
+          """
     try:
-        # 1. Suppression des interactions liées (nécessaire avant la suppression du prospect)
-        sql_delete_interactions = "DELETE FROM Interaction WHERE id_prospect = %s"
-        await execute_query(sql_delete_interactions, (id_prospect,))
-
-        # 2. Suppression du prospect
-        sql_delete_prospect = "DELETE FROM Prospect WHERE id_prospect = %s"
-        rows_affected = await execute_query(sql_delete_prospect, (id_prospect,))
-
+        rows_affected = await execute_query(sql, (id_prospect,))
         if rows_affected > 0:
-            return {"success": True, "message": "Prospect et ses interactions supprimés avec succès."}
+            invalidate_report_cache()
+            return {"success": True, "message": "Prospect et ses interactions supprimés avec succès "
+                                               f"(restaurable pendant {DEFAULT_PURGE_RETENTION_HOURS:g} h)."}
         return {"success": False, "message": "Prospect non trouvé."}
 
     except Exception as e:
-        return {"success": False, "message": f"Échec de la suppression du prospect: {e}"}
\ No newline at end of file
+        return {"success": False, "message": f"Échec de la suppression du prospect: {e}"}
+
+
+async def restore_prospect(id_prospect: int, retention_hours: float = DEFAULT_PURGE_RETENTION_HOURS) -> Dict[str, Any]:
+    """
+    Annule la suppression d'un prospect tant que son délai de rétention n'est pas écoulé.
+    Au-delà, le prospect peut être en cours de purge et n'est plus restaurable.
+    date_update est conservée, comme à la suppression.
+    """
+    sql = """
+          UPDATE Prospect
+          SET deleted_at  = NULL,
+              date_update = date_update
+          WHERE id_prospect = %s
+            AND deleted_at IS NOT NULL
+            AND deleted_at >= NOW() - INTERVAL %s SECOND \
+          """
+    try:
+        rows_affected = await execute_query(sql, (id_prospect, int(retention_hours * 3600)))
+        if rows_affected > 0:
+            invalidate_report_cache()
+            return {"success": True, "message": "Prospect restauré avec succès."}
+        return {"success": False, "message": "Prospect non trouvé, non supprimé ou délai de restauration dépassé."}
+    except Exception as e:
+        return {"success": False, "message": f"Échec de la restauration du prospect: {e}"}
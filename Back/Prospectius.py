@@ -6,24 +6,34 @@ from typing import Dict, Any, Optional, Tuple, List
 # --- Importation des Services ---
 try:
     # Services de base et de gestion des comptes
-    from Back.dbManager import initialize_db_pool, close_db_pool
+    from Back.dbManager import initialize_db_pool, close_db_pool, pool_config_from_env
+    from Back.dbMetrics import export_query_metrics
+    from Back.migrationManager import apply_migrations, check_schema_version
+    from Back.Prospect.prospectPurge import start_purge_worker, stop_purge_worker
     from Back.Account.accountService import (
         authenticate_account, create_account, get_all_accounts,
         update_account_info, update_account_password, delete_account,
-        get_account_by_id
+        get_account_by_id, shutdown_hash_executor, calibrate_bcrypt_cost_async
     )
     # Services de gestion des prospects
     from Back.Prospect.prospectService import (
-        create_prospect, get_prospects_list, get_prospect_by_id,
-        update_prospect, delete_prospect
+        create_prospect, get_prospects_page, get_prospect_detail,
+        update_prospect, delete_prospect, restore_prospect, bulk_reassign_prospects, bulk_change_status,
+        DEFAULT_PURGE_RETENTION_HOURS
     )
+    from Back.Prospect.prospectDedup import find_duplicate_groups, merge_prospects
     # Services de gestion des interactions
     from Back.Interaction.interactionService import (
-        create_interaction, get_interactions_by_prospect
+        create_interaction, get_interactions_by_prospect, backfill_interaction_summary
     )
+    # Import en masse de prospects
+    from Back.Import.prospectImport import import_prospects
     # Services de reporting
     from Back.StatsReport.statService import get_prospect_status_distribution, get_conversion_rate
-    # from Back.Export.exportService import export_prospects_to_excel
+    # Export Excel
+    from Back.Excel.reportExcel import (
+        export_prospects_to_excel, export_prospect_to_excel, export_reports_to_excel
+    )
 except ImportError as e:
     print(f"Erreur d'importation. Assurez-vous que les fichiers de services sont dans le chemin correct: {e}")
     exit()
@@ -35,20 +45,31 @@ logger = logging.getLogger("ProspectiusApp")
 # Variable pour stocker l'utilisateur connecté
 CURRENT_USER: Optional[Dict[str, Any]] = None
 
+# Nombre de prospects affichés par page dans la liste
+PROSPECTS_PAGE_SIZE = 20
+
 
 # ==============================================
 #              FONCTIONS UTILITAIRES
 # ==============================================
 
+async def ainput(prompt: str = "") -> str:
+    """
+    input() exécuté dans un thread : la boucle asyncio continue de tourner pendant la saisie
+    (worker de purge en arrière-plan, délais des requêtes en cours).
+    """
+    return await asyncio.to_thread(input, prompt)
+
+
 async def collect_db_params() -> Tuple[str, int, str, str, str]:
     """Collecte les paramètres de la DB via l'entrée utilisateur."""
     print("\n--- Configuration de la Base de Données ---")
-    host = input("Hôte de la base de données (localhost): ") or "localhost"
-    port_str = input("Port de la base de données (3306): ")
+    host = await ainput("Hôte de la base de données (localhost): ") or "localhost"
+    port_str = await ainput("Port de la base de données (3306): ")
     port = int(port_str) if port_str and port_str.isdigit() else 3306
-    user = input("Nom d'utilisateur MySQL: ")
-    password = input("Mot de passe MySQL: ")
-    database = input("Nom de la base de données (Prospectius): ") or 'Prospectius'
+    user = await ainput("Nom d'utilisateur MySQL: ")
+    password = await ainput("Mot de passe MySQL: ")
+    database = await ainput("Nom de la base de données (Prospectius): ") or 'Prospectius'
     return host, port, user, password, database
 
 
@@ -81,8 +102,8 @@ async def handle_login():
     """Gère l'écran de connexion initial."""
     global CURRENT_USER
     print("\n--- ÉCRAN DE CONNEXION ---")
-    username = input("Nom d'utilisateur: ")
-    password = input("Mot de passe: ")
+    username = await ainput("Nom d'utilisateur: ")
+    password = await ainput("Mot de passe: ")
 
     result = await authenticate_account(username, password)
 
@@ -104,11 +125,11 @@ async def handle_create_first_account() -> bool:
     print("*" * 50)
 
     print("\n--- CRÉATION DU COMPTE ADMINISTRATEUR INITIAL ---")
-    nom = input("Nom: ")
-    prenom = input("Prénom: ")
-    email = input("Email: ")
-    username = input("Nom d'utilisateur (unique): ")
-    password = input("Mot de passe (8+ caractères): ")
+    nom = await ainput("Nom: ")
+    prenom = await ainput("Prénom: ")
+    email = await ainput("Email: ")
+    username = await ainput("Nom d'utilisateur (unique): ")
+    password = await ainput("Mot de passe (8+ caractères): ")
     type_compte = 'Administrateur'
 
     result = await create_account(nom, prenom, email, username, password, type_compte)
@@ -136,7 +157,7 @@ async def display_account_management_menu():
         print("4. Supprimer un compte")
         print("9. Retour au menu principal")
 
-        choice = input("Votre choix: ")
+        choice = await ainput("Votre choix: ")
 
         if choice == '1':
             await handle_list_accounts()
@@ -164,27 +185,27 @@ async def handle_list_accounts():
     for a in accounts:
         print(f"[{a['id_compte']:<3}] {a['nom']} {a['prenom']} ({a['username']}) | Rôle: {a['type_compte']}")
     print("-" * 50)
-    input("Appuyez sur Entrée pour continuer...")
+    await ainput("Appuyez sur Entrée pour continuer...")
 
 
 async def handle_create_account():
     """Gère la création d'un nouveau compte (utilisé dans le menu Admin)."""
     print("\n--- CRÉATION DE COMPTE ---")
-    nom = input("Nom: ")
-    prenom = input("Prénom: ")
-    email = input("Email: ")
-    username = input("Nom d'utilisateur (unique): ")
-    password = input("Mot de passe (8+ caractères): ")
-    type_compte = input("Type de compte (Utilisateur, Commercial, Administrateur): ")
+    nom = await ainput("Nom: ")
+    prenom = await ainput("Prénom: ")
+    email = await ainput("Email: ")
+    username = await ainput("Nom d'utilisateur (unique): ")
+    password = await ainput("Mot de passe (8+ caractères): ")
+    type_compte = await ainput("Type de compte (Utilisateur, Commercial, Administrateur): ")
 
     result = await create_account(nom, prenom, email, username, password, type_compte)
     print(result.get('message', 'Erreur inconnue.'))
-    input("Appuyez sur Entrée pour continuer...")
+    await ainput("Appuyez sur Entrée pour continuer...")
 
 
 async def handle_update_account():
     """Gère la modification/suppression d'un compte."""
-    id_compte_str = input("Entrez l'ID du compte à modifier: ")
+    id_compte_str = await ainput("Entrez l'ID du compte à modifier: ")
     try:
         id_compte = int(id_compte_str)
     except ValueError:
@@ -201,12 +222,12 @@ async def handle_update_account():
     print("2. Changer le mot de passe")
     print("9. Annuler et Retour")
 
-    choice = input("Votre choix: ")
+    choice = await ainput("Votre choix: ")
     if choice == '1':
         updates = {}
-        updates['nom'] = input(f"Nouveau Nom ({account['nom']}): ") or None
-        updates['email'] = input(f"Nouvel Email ({account['email']}): ") or None
-        updates['username'] = input(f"Nouveau Username ({account['username']}): ") or None
+        updates['nom'] = await ainput(f"Nouveau Nom ({account['nom']}): ") or None
+        updates['email'] = await ainput(f"Nouvel Email ({account['email']}): ") or None
+        updates['username'] = await ainput(f"Nouveau Username ({account['username']}): ") or None
 
         fields_to_update = {k: v for k, v in updates.items() if v}
         if fields_to_update:
@@ -215,7 +236,7 @@ async def handle_update_account():
         else:
             print("Aucune modification effectuée.")
     elif choice == '2':
-        new_pwd = input("Nouveau mot de passe (8+ caractères): ")
+        new_pwd = await ainput("Nouveau mot de passe (8+ caractères): ")
         result = await update_account_password(id_compte, new_pwd)
         print(result['message'])
     elif choice == '9':
@@ -224,26 +245,26 @@ async def handle_update_account():
         print("Choix invalide.")
 
     if choice in ['1', '2', '9']:
-        input("Appuyez sur Entrée pour continuer...")
+        await ainput("Appuyez sur Entrée pour continuer...")
 
 
 async def handle_delete_account():
     """Gère la suppression d'un compte."""
-    id_compte_str = input("Entrez l'ID du compte à supprimer: ")
+    id_compte_str = await ainput("Entrez l'ID du compte à supprimer: ")
     try:
         id_compte = int(id_compte_str)
     except ValueError:
         print("ID invalide.")
         return
 
-    confirmation = input(f"Êtes-vous sûr de vouloir supprimer le compte {id_compte} ? (O/N): ")
+    confirmation = await ainput(f"Êtes-vous sûr de vouloir supprimer le compte {id_compte} ? (O/N): ")
     if confirmation.upper() == 'O':
         result = await delete_account(id_compte)
         print(result['message'])
     else:
         print("Suppression annulée.")
 
-    input("Appuyez sur Entrée pour continuer...")
+    await ainput("Appuyez sur Entrée pour continuer...")
 
 
 # ==============================================
@@ -257,9 +278,14 @@ async def display_prospects_menu():
         print("1. Lister / Filtrer les prospects")
         print("2. Ajouter un nouveau prospect")
         print("3. Gérer un prospect (Détails, Interagir, Modifier, Supprimer)")
+        print("4. Importer des prospects (CSV/XLSX)")
+        if CURRENT_USER['type_compte'] == 'Administrateur':
+            print("5. Réassigner / changer le statut en masse")
+            print("6. Détecter et fusionner les doublons")
+        print(f"7. Restaurer un prospect supprimé (moins de {DEFAULT_PURGE_RETENTION_HOURS:g} h)")
         print("9. Retour au menu principal")
 
-        choice = input("Votre choix: ")
+        choice = await ainput("Votre choix: ")
 
         if choice == '1':
             await handle_list_prospects()
@@ -267,6 +293,14 @@ async def display_prospects_menu():
             await handle_add_prospect()
         elif choice == '3':
             await handle_prospect_details_menu()
+        elif choice == '4':
+            await handle_import_prospects()
+        elif choice == '5' and CURRENT_USER['type_compte'] == 'Administrateur':
+            await handle_bulk_update_prospects()
+        elif choice == '6' and CURRENT_USER['type_compte'] == 'Administrateur':
+            await handle_merge_duplicates()
+        elif choice == '7':
+            await handle_restore_prospect()
         elif choice == '9':
             break
         else:
@@ -276,13 +310,13 @@ async def display_prospects_menu():
 async def handle_add_prospect():
     """Gère la création d'un nouveau prospect. ALIGNÉ BDD"""
     print("\n--- AJOUT D'UN NOUVEAU PROSPECT ---")
-    nomp = input("Nom: ")
-    prenomp = input("Prénom: ")
-    email = input("Email: ")
-    telephone = input("Téléphone: ")
-    adresse = input("Adresse: ")
+    nomp = await ainput("Nom: ")
+    prenomp = await ainput("Prénom: ")
+    email = await ainput("Email: ")
+    telephone = await ainput("Téléphone: ")
+    adresse = await ainput("Adresse: ")
 
-    type_p = input("Type (particulier, societe, organisation): ").lower()
+    type_p = (await ainput("Type (particulier, societe, organisation): ")).lower()
     if type_p not in ('particulier', 'societe', 'organisation'):
         print("Type invalide. Défaut: particulier.")
         type_p = 'particulier'
@@ -305,7 +339,7 @@ async def handle_add_prospect():
             for c in commercials:
                 print(f"[{c['id_compte']:<3}] {c['username']} ({c['type_compte']})")
 
-            id_assignation_str = input(f"ID du commercial à assigner (Défaut: {CURRENT_USER['id_compte']}): ")
+            id_assignation_str = await ainput(f"ID du commercial à assigner (Défaut: {CURRENT_USER['id_compte']}): ")
             try:
                 id_assignation = int(id_assignation_str) if id_assignation_str else CURRENT_USER['id_compte']
             except ValueError:
@@ -313,10 +347,120 @@ async def handle_add_prospect():
                 id_assignation = CURRENT_USER['id_compte']
 
     # Le service create_prospect doit accepter les 7 arguments: nomp, prenomp, telephone, email, adresse, type, status, assignation
-    result = await create_prospect(nomp, prenomp, telephone, email, adresse, type_p, status, id_assignation)
+    result = await create_prospect(nomp, prenomp, telephone, email, adresse, type_p, status, id_assignation,
+                                   check_duplicates=True)
+    if result.get('doublons'):
+        print(f"⚠️ {result['message']}")
+        for d in result['doublons']:
+            print(f"[{d['id_prospect']}] {d['nomp']} {d['prenomp']} - {d['email']} - {d['telephone']} "
+                  f"(score {d['score']})")
+        if (await ainput("Créer le prospect malgré tout ? (O/N): ")).upper() == 'O':
+            result = await create_prospect(nomp, prenomp, telephone, email, adresse, type_p, status, id_assignation)
+        else:
+            result = {"message": "Création annulée."}
 
     print(result.get('message', 'Erreur inconnue lors de la création du prospect.'))
-    input("Appuyez sur Entrée pour continuer...")
+    await ainput("Appuyez sur Entrée pour continuer...")
+
+
+async def handle_import_prospects():
+    """Importe des prospects depuis un fichier CSV ou XLSX."""
+    print("\n--- IMPORT DE PROSPECTS (CSV/XLSX) ---")
+    print("En-têtes attendus: nomp, prenomp, telephone, email, adresse, type, status, assignation")
+    path = (await ainput("Chemin du fichier: ")).strip()
+    if not path:
+        print("Import annulé.")
+        return
+
+    def show_progress(stats: Dict[str, Any]):
+        print(f"  ... {stats['lignes_lues']} lignes lues, {stats['inserees']} insérées, "
+              f"{stats['erreurs']} erreurs ({stats['lignes_par_sec']} lignes/s)")
+
+    result = await import_prospects(path, CURRENT_USER['id_compte'], progress_callback=show_progress)
+
+    print(result['message'])
+    for error in result['details_erreurs'][:20]:
+        print(f"  Ligne {error['ligne']}: {error['message']}")
+    if result['erreurs'] > 20:
+        print(f"  ... et {result['erreurs'] - 20} autre(s) erreur(s).")
+    await ainput("Appuyez sur Entrée pour continuer...")
+
+
+async def handle_bulk_update_prospects():
+    """Réassignation ou changement de statut d'un ensemble de prospects (Administrateur)."""
+    print("\n--- MISE À JOUR EN MASSE ---")
+    print("1. Réassigner les prospects à un autre compte")
+    print("2. Changer le statut des prospects")
+    action = await ainput("Votre choix: ")
+    if action not in ('1', '2'):
+        print("Choix invalide.")
+        return
+
+    print("Sélection des prospects (laisser vide pour ignorer un critère) :")
+    ids_str = (await ainput("Liste d'IDs séparés par des virgules (sinon, filtres ci-dessous): ")).strip()
+    ids = None
+    assignation_filter = status_filter = search_term = None
+    if ids_str:
+        try:
+            ids = [int(i) for i in ids_str.split(',') if i.strip()]
+        except ValueError:
+            print("Liste d'IDs invalide.")
+            return
+    else:
+        assignation_str = (await ainput("Assignés au compte ID: ")).strip()
+        assignation_filter = int(assignation_str) if assignation_str.isdigit() else None
+        status_filter = (await ainput("Statut actuel: ")).lower() or None
+        search_term = (await ainput("Recherche (nom, prénom, email ou téléphone): ")).strip() or None
+
+    if action == '1':
+        target_str = (await ainput("Nouveau compte ID: ")).strip()
+        if not target_str.isdigit():
+            print("ID de compte invalide.")
+            return
+        target = int(target_str)
+    else:
+        target = (await ainput("Nouveau statut (nouveau, interesse, negociation, perdu, converti): ")).lower()
+
+    if (await ainput("Confirmer la mise à jour en masse ? (O/N): ")).upper() != 'O':
+        print("Opération annulée.")
+        return
+
+    if action == '1':
+        result = await bulk_reassign_prospects(target, ids, assignation_filter, status_filter, search_term)
+    else:
+        result = await bulk_change_status(target, ids, assignation_filter, status_filter, search_term)
+
+    print(result['message'])
+    if result.get('lots'):
+        print(f"{result['lots']} lot(s) en {result['duree_sec']} s.")
+    await ainput("Appuyez sur Entrée pour continuer...")
+
+
+async def handle_merge_duplicates():
+    """Détection des prospects en double sur toute la table, puis fusion groupe par groupe (Administrateur)."""
+    print("\n--- DÉTECTION DES DOUBLONS ---")
+    print("Analyse de la table des prospects...")
+    result = await find_duplicate_groups()
+    print(result['message'])
+    if not result['success'] or not result['groupes']:
+        await ainput("Appuyez sur Entrée pour continuer...")
+        return
+    print(f"{result['comparaisons']} comparaison(s) en {result['duree_sec']} s.")
+
+    merge_all = False
+    for group in result['groupes']:
+        print(f"\nProspect ID {group['survivant']} <- doublons {group['doublons']} (score min {group['score_min']})")
+        if not merge_all:
+            answer = (await ainput("Fusionner ? (O: oui, T: tous les suivants, N: non, Q: quitter): ")).upper()
+            if answer == 'Q':
+                break
+            if answer not in ('O', 'T'):
+                continue
+            merge_all = answer == 'T'
+        merged = await merge_prospects(group['survivant'], group['doublons'])
+        print(merged['message'])
+
+    await ainput("Appuyez sur Entrée pour continuer...")
 
 
 async def handle_list_prospects():
@@ -329,44 +473,70 @@ async def handle_list_prospects():
     else:
         assignation_filter = None
 
-    status_filter = input("Filtrer par statut (laisser vide pour tout): ").lower() or None
+    status_filter = (await ainput("Filtrer par statut (laisser vide pour tout): ")).lower() or None
+    search_term = (await ainput("Rechercher (nom, prénom, email ou téléphone, laisser vide pour tout): ")).strip()
+    search_term = search_term or None
+    inactive_str = (await ainput("Sans interaction depuis N jours (à relancer, laisser vide pour tout): ")).strip()
+    inactive_days = int(inactive_str) if inactive_str.isdigit() else None
+    # Prospects à relancer : les moins récemment contactés d'abord
+    sort = 'inactivite' if inactive_days is not None else 'maj'
 
-    prospects = await get_prospects_list(assignation_filter, status_filter)
+    cursor = None
+    total_displayed = 0
 
-    if not prospects:
-        print("\n=> Aucun prospect trouvé avec ces critères.")
-        input("Appuyez sur Entrée pour continuer...")
-        return
+    # Parcours page par page via le curseur renvoyé par le service
+    while True:
+        page = await get_prospects_page(PROSPECTS_PAGE_SIZE, cursor, assignation_filter, status_filter, search_term,
+                                        inactive_days=inactive_days, sort=sort)
+        prospects = page['prospects']
 
-    print(f"\n| {'ID':<4} | {'NOM & PRENOM':<25} | {'TELEPHONE':<15} | {'STATUT':<12} | {'ASSIGNÉ À':<15} |")
-    print("|" + "―" * 5 + "|" + "―" * 26 + "|" + "―" * 16 + "|" + "―" * 13 + "|" + "―" * 16 + "|")
+        if not prospects and total_displayed == 0:
+            print("\n=> Aucun prospect trouvé avec ces critères.")
+            await ainput("Appuyez sur Entrée pour continuer...")
+            return
 
-    for p in prospects:
-        # NOTE: On suppose que le service a renommé 'nomp' et 'prenomp' en 'nom' et 'prenom' pour la simplicité du Dictionnaire retourné.
-        assigned_user = p.get('username_assigne', f"ID: {p['assignation']}")
-        full_name = f"{p['nom']} {p['prenom']}"  # Si les services renvoient 'nom' et 'prenom'
-        # Si les services renvoient 'nomp' et 'prenomp': full_name = f"{p['nomp']} {p['prenomp']}"
-        print(
-            f"| {p['id_prospect']:<4} | {full_name[:25]:<25} | {p['telephone']:<15} | {p['status']:<12} | {assigned_user:<15} |")
+        print(f"\n| {'ID':<4} | {'NOM & PRENOM':<25} | {'TELEPHONE':<15} | {'STATUT':<12} | {'ASSIGNÉ À':<15} "
+              f"| {'DERN. INTERACTION':<17} |")
+        print("|" + "―" * 5 + "|" + "―" * 26 + "|" + "―" * 16 + "|" + "―" * 13 + "|" + "―" * 16 + "|" + "―" * 19 + "|")
+
+        for p in prospects:
+            assigned_user = p.get('username_assigne') or f"ID: {p['assignation']}"
+            full_name = f"{p['nomp']} {p['prenomp']}"
+            last_contact = p['last_interaction_at'].strftime('%Y-%m-%d') if p['last_interaction_at'] else 'jamais'
+            print(
+                f"| {p['id_prospect']:<4} | {full_name[:25]:<25} | {p['telephone'] or '':<15} | {p['status']:<12} | {assigned_user:<15} "
+                f"| {last_contact:<17} |")
+
+        total_displayed += len(prospects)
+        cursor = page['next_cursor']
+
+        if not cursor:
+            break
+        if (await ainput("\nPage suivante ? (O/N): ")).upper() != 'O':
+            break
 
-    print("\nTotal prospects affichés:", len(prospects))
-    input("Appuyez sur Entrée pour continuer...")
+    print("\nTotal prospects affichés:", total_displayed)
+    await ainput("Appuyez sur Entrée pour continuer...")
 
 
 async def handle_prospect_details_menu():
     """Gère le sous-menu de détails/modification/suppression/interaction."""
-    prospect_id_str = input("\nEntrez l'ID du prospect à gérer: ")
+    prospect_id_str = await ainput("\nEntrez l'ID du prospect à gérer: ")
     try:
         prospect_id = int(prospect_id_str)
     except ValueError:
         print("ID invalide.")
         return
 
+    # Le détail (prospect, responsable, interactions récentes) est relu seulement après une modification
+    detail = None
     while True:
-        prospect = await get_prospect_by_id(prospect_id)
-        if not prospect:
-            print(f"❌ Prospect ID {prospect_id} non trouvé.")
-            return
+        if detail is None:
+            detail = await get_prospect_detail(prospect_id)
+            if not detail:
+                print(f"❌ Prospect ID {prospect_id} non trouvé.")
+                return
+        prospect = detail['prospect']
 
         print("\n--- GESTION DU PROSPECT ---")
         # Utilisation des champs renvoyés par la BDD (nomp, prenomp)
@@ -379,14 +549,15 @@ async def handle_prospect_details_menu():
         print("4. Supprimer le prospect")
         print("9. Retour au menu des Prospects")
 
-        choice = input("Votre choix: ")
+        choice = await ainput("Votre choix: ")
 
         if choice == '1':
-            await handle_display_prospect_details(prospect)
+            await handle_display_prospect_details(detail)
         elif choice == '2':
-            await handle_update_prospect_details(prospect_id, prospect)
+            if await handle_update_prospect_details(prospect_id, prospect):
+                detail = None
         elif choice == '3':
-            await handle_interaction_menu(prospect_id)
+            detail = await handle_interaction_menu(prospect_id, detail)
         elif choice == '4':
             await handle_delete_prospect_item(prospect_id)
             break
@@ -396,12 +567,12 @@ async def handle_prospect_details_menu():
             print("Choix invalide.")
 
 
-async def handle_display_prospect_details(prospect: Dict):
+async def handle_display_prospect_details(detail: Dict):
     """Affiche tous les détails d'un prospect. ALIGNÉ BDD"""
     print("\n--- DÉTAILS DU PROSPECT ---")
 
-    user_info = await get_account_by_id(prospect['assignation'])
-    assigned_user = user_info['username'] if user_info else f"ID Inconnu: {prospect['assignation']}"
+    prospect = detail['prospect']
+    assigned_user = detail['assigne']['username'] if detail['assigne'] else f"ID Inconnu: {prospect['assignation']}"
 
     # Affichage des champs BDD
     print(f"ID Prospect: {prospect['id_prospect']}")
@@ -413,26 +584,27 @@ async def handle_display_prospect_details(prospect: Dict):
     print(f"Statut: {prospect['status'].upper()}")
     print(f"Assigné à: {assigned_user}")
     print(f"Date de Création: {prospect['creation']}")
+    print(f"Interactions: {detail['nb_interactions']}")
 
-    input("\nAppuyez sur Entrée pour continuer...")
+    await ainput("\nAppuyez sur Entrée pour continuer...")
 
 
-async def handle_update_prospect_details(prospect_id: int, prospect: Dict):
-    """Gère la modification des informations d'un prospect. ALIGNÉ BDD"""
+async def handle_update_prospect_details(prospect_id: int, prospect: Dict) -> bool:
+    """Gère la modification des informations d'un prospect. ALIGNÉ BDD. Retourne True si le prospect a changé."""
     print("\n--- MODIFICATION DU PROSPECT ---")
     print("Laisser vide pour conserver la valeur actuelle.")
 
     updates = {}
-    updates['nomp'] = input(f"Nom ({prospect.get('nomp')}): ") or None
-    updates['prenomp'] = input(f"Prénom ({prospect.get('prenomp')}): ") or None
-    updates['email'] = input(f"Email ({prospect['email']}): ") or None
-    updates['telephone'] = input(f"Téléphone ({prospect['telephone']}): ") or None
-    updates['adresse'] = input(f"Adresse ({prospect.get('adresse')}): ") or None
+    updates['nomp'] = await ainput(f"Nom ({prospect.get('nomp')}): ") or None
+    updates['prenomp'] = await ainput(f"Prénom ({prospect.get('prenomp')}): ") or None
+    updates['email'] = await ainput(f"Email ({prospect['email']}): ") or None
+    updates['telephone'] = await ainput(f"Téléphone ({prospect['telephone']}): ") or None
+    updates['adresse'] = await ainput(f"Adresse ({prospect.get('adresse')}): ") or None
 
     # Statut ENUM: nouveau, interesse, negociation, perdu, converti
     current_status = prospect['status']
     valid_statuses = ['nouveau', 'interesse', 'negociation', 'perdu', 'converti']
-    new_status = input(f"Statut ({current_status} | {valid_statuses}): ").lower()
+    new_status = (await ainput(f"Statut ({current_status} | {valid_statuses}): ")).lower()
     if new_status in valid_statuses:
         updates['status'] = new_status
     elif new_status:
@@ -441,17 +613,16 @@ async def handle_update_prospect_details(prospect_id: int, prospect: Dict):
     # Type ENUM: particulier, societe, organisation
     current_type = prospect['type']
     valid_types = ['particulier', 'societe', 'organisation']
-    new_type = input(f"Type ({current_type} | {valid_types}): ").lower()
+    new_type = (await ainput(f"Type ({current_type} | {valid_types}): ")).lower()
     if new_type in valid_types:
         updates['type'] = new_type
     elif new_type:
         print("Type invalide ignoré.")
 
-    # Assignation
-    user_info = await get_account_by_id(prospect['assignation'])
-    current_user = user_info['username'] if user_info else 'Inconnu'
+    # Assignation (username déjà renvoyé par la jointure du détail)
+    current_user = prospect.get('username_assigne') or 'Inconnu'
 
-    new_assignation_str = input(f"Assignation (Actuel: {current_user} | ID Compte): ")
+    new_assignation_str = await ainput(f"Assignation (Actuel: {current_user} | ID Compte): ")
     if new_assignation_str:
         try:
             updates['assignation'] = int(new_assignation_str)
@@ -460,34 +631,56 @@ async def handle_update_prospect_details(prospect_id: int, prospect: Dict):
 
     fields_to_update = {k: v for k, v in updates.items() if v is not None}
 
+    updated = False
     if fields_to_update:
         result = await update_prospect(prospect_id, fields_to_update)
         print(result['message'])
+        updated = result['success']
     else:
         print("Aucune modification effectuée.")
 
-    input("Appuyez sur Entrée pour continuer...")
+    await ainput("Appuyez sur Entrée pour continuer...")
+    return updated
 
 
 async def handle_delete_prospect_item(prospect_id: int):
     """Gère la suppression d'un prospect."""
-    confirmation = input(f"Êtes-vous sûr de vouloir supprimer le prospect ID {prospect_id} ? (O/N): ")
+    confirmation = await ainput(f"Êtes-vous sûr de vouloir supprimer le prospect ID {prospect_id} ? (O/N): ")
     if confirmation.upper() == 'O':
         result = await delete_prospect(prospect_id)
         print(result['message'])
     else:
         print("Suppression annulée.")
-    input("Appuyez sur Entrée pour continuer...")
+    await ainput("Appuyez sur Entrée pour continuer...")
+
+
+async def handle_restore_prospect():
+    """Annule la suppression d'un prospect, tant qu'il n'a pas été purgé."""
+    prospect_id_str = await ainput("ID du prospect à restaurer: ")
+    if not prospect_id_str.isdigit():
+        print("ID invalide.")
+    else:
+        result = await restore_prospect(int(prospect_id_str))
+        print(result['message'])
+    await ainput("Appuyez sur Entrée pour continuer...")
 
 
 # ==============================================
 #             LOGIQUE DES INTERACTIONS
 # ==============================================
 
-async def handle_interaction_menu(prospect_id: int):
-    """Sous-menu de gestion des interactions pour un prospect donné."""
+async def handle_interaction_menu(prospect_id: int, detail: Dict) -> Optional[Dict]:
+    """
+    Sous-menu de gestion des interactions pour un prospect donné.
+    Réutilise le détail déjà chargé ; retourne None s'il doit être relu (interaction ajoutée).
+    """
     while True:
-        prospect = await get_prospect_by_id(prospect_id)
+        if detail is None:
+            detail = await get_prospect_detail(prospect_id)
+            if not detail:
+                print(f"❌ Prospect ID {prospect_id} non trouvé.")
+                return None
+        prospect = detail['prospect']
 
         print("\n--- GESTION DES INTERACTIONS ---")
         prospect_name = f"{prospect.get('nomp', 'Nom')} {prospect.get('prenomp', 'Prénom')}"
@@ -497,26 +690,33 @@ async def handle_interaction_menu(prospect_id: int):
         print("2. Ajouter une nouvelle interaction")
         print("9. Retour à la gestion du Prospect")
 
-        choice = input("Votre choix: ")
+        choice = await ainput("Votre choix: ")
 
         if choice == '1':
-            await handle_display_interactions(prospect_id)
+            await handle_display_interactions(prospect_id, detail)
         elif choice == '2':
-            await handle_add_interaction(prospect_id)
+            if await handle_add_interaction(prospect_id):
+                detail = None
         elif choice == '9':
             break
         else:
             print("Choix invalide.")
 
+    return detail
+
 
-async def handle_display_interactions(prospect_id: int):
-    """Affiche la liste des interactions pour un prospect."""
+async def handle_display_interactions(prospect_id: int, detail: Dict):
+    """Affiche les interactions récentes d'un prospect (l'historique complet à la demande)."""
     print("\n--- HISTORIQUE DES INTERACTIONS ---")
-    interactions = await get_interactions_by_prospect(prospect_id)
+    interactions = detail['interactions']
+    if detail['interactions_tronquees']:
+        print(f"Affichage des {len(interactions)} plus récentes sur {detail['nb_interactions']} interactions.")
+        if (await ainput("Afficher tout l'historique ? (O/N): ")).upper() == 'O':
+            interactions = await get_interactions_by_prospect(prospect_id)
 
     if not interactions:
         print("Aucune interaction enregistrée pour ce prospect.")
-        input("Appuyez sur Entrée pour continuer...")
+        await ainput("Appuyez sur Entrée pour continuer...")
         return
 
     print(f"| {'ID':<4} | {'TYPE':<15} | {'DATE':<19} | {'NOTE':<40} |")
@@ -529,22 +729,22 @@ async def handle_display_interactions(prospect_id: int):
         print(
             f"| {i['id_interaction']:<4} | {i['type']:<15} | {date_str:<19} | {note_display:<40} |")  # Clé 'type' alignée BDD
 
-    input("\nAppuyez sur Entrée pour continuer...")
+    await ainput("\nAppuyez sur Entrée pour continuer...")
 
 
-async def handle_add_interaction(prospect_id: int):
-    """Ajoute une nouvelle interaction au prospect. ALIGNÉ BDD"""
+async def handle_add_interaction(prospect_id: int) -> bool:
+    """Ajoute une nouvelle interaction au prospect. ALIGNÉ BDD. Retourne True si elle a été enregistrée."""
     print("\n--- AJOUT D'UNE INTERACTION ---")
 
     # Types d'interaction ENUM: email, appel, sms, reunion
     valid_types = ['appel', 'email', 'sms', 'reunion']
-    type_inter = input(f"Type d'interaction ({valid_types}): ").lower()
+    type_inter = (await ainput(f"Type d'interaction ({valid_types}): ")).lower()
 
     if type_inter not in valid_types:
         print("Type d'interaction invalide. Annulation.")
-        return
+        return False
 
-    note = input("Note de l'interaction (détails importants): ")
+    note = await ainput("Note de l'interaction (détails importants): ")
 
     id_compte = CURRENT_USER['id_compte']
 
@@ -552,7 +752,8 @@ async def handle_add_interaction(prospect_id: int):
     result = await create_interaction(prospect_id, id_compte, type_inter, note)
 
     print(result.get('message', 'Erreur inconnue lors de l\'enregistrement de l\'interaction.'))
-    input("Appuyez sur Entrée pour continuer...")
+    await ainput("Appuyez sur Entrée pour continuer...")
+    return result.get('success', False)
 
 
 # ==============================================
@@ -566,22 +767,65 @@ async def handle_reporting_menu():
         print("1. Statistiques de distribution par statut")
         print("2. Taux de conversion global")
         print("3. Exporter la liste complète (Excel)")
+        print("4. Exporter un prospect et ses interactions (Excel)")
+        print("5. Exporter les statistiques (Excel)")
+        if CURRENT_USER['type_compte'] == 'Administrateur':
+            print("6. Exporter les métriques des requêtes SQL (JSON)")
+            print("7. Recalculer les résumés d'activité des prospects")
         print("9. Retour au menu principal")
 
-        choice = input("Votre choix: ")
+        choice = await ainput("Votre choix: ")
 
         if choice == '1':
             print("Logique d'affichage des statistiques de statut non implémentée (appel à statService).")
         elif choice == '2':
             print("Logique d'affichage du taux de conversion non implémentée (appel à statService).")
-        elif choice == '3':
-            print("Logique d'export non implémentée.")
+        elif choice in ('3', '4', '5'):
+            await handle_excel_export(choice)
+        elif choice == '6' and CURRENT_USER['type_compte'] == 'Administrateur':
+            path = (await ainput("Fichier de destination (.json): ")).strip() or "metriques_sql.json"
+            print(export_query_metrics(path)['message'])
+        elif choice == '7' and CURRENT_USER['type_compte'] == 'Administrateur':
+            print("Recalcul en cours...")
+            result = await backfill_interaction_summary()
+            print(f"{result['message']} ({result['plages']} plage(s) en {result['duree_sec']} s)")
         elif choice == '9':
             break
         else:
             print("Choix invalide.")
 
 
+async def handle_excel_export(choice: str):
+    """Lance l'export Excel correspondant au choix du menu de reporting."""
+    path = (await ainput("Fichier de destination (.xlsx): ")).strip()
+    if not path:
+        print("Export annulé.")
+        return
+    if not path.lower().endswith('.xlsx'):
+        path += '.xlsx'
+
+    if choice == '3':
+        # Un commercial n'exporte que ses propres prospects
+        assignation_filter = None if CURRENT_USER['type_compte'] == 'Administrateur' else CURRENT_USER['id_compte']
+        result = await export_prospects_to_excel(path, assignation_filter)
+    elif choice == '4':
+        try:
+            prospect_id = int(await ainput("ID du prospect à exporter: "))
+        except ValueError:
+            print("ID invalide.")
+            return
+        result = await export_prospect_to_excel(prospect_id, path)
+    else:
+        result = await export_reports_to_excel(path)
+
+    print(result['message'])
+    if result['success']:
+        print(f"Durée: {result['duree_sec']} s | {result['lignes_par_sec']} lignes/s")
+        if result['pic_rss_mo'] is not None:
+            print(f"Mémoire: pic {result['pic_rss_mo']} Mo (+{result['hausse_rss_mo']} Mo pendant l'export)")
+    await ainput("Appuyez sur Entrée pour continuer...")
+
+
 # ==============================================
 #             BOUCLE PRINCIPALE DE L'APPLICATION
 # ==============================================
@@ -598,7 +842,7 @@ async def application_loop():
             if not accounts:
                 # CAS 1: Base de données vide -> Création forcée du premier compte
                 if not await handle_create_first_account():
-                    if input("Quitter l'application ? (O/N): ").upper() == 'O':
+                    if (await ainput("Quitter l'application ? (O/N): ")).upper() == 'O':
                         break
                     continue
 
@@ -608,13 +852,13 @@ async def application_loop():
                 continue
 
                 # Échoue la connexion
-            if input("Quitter l'application ? (O/N): ").upper() == 'O':
+            if (await ainput("Quitter l'application ? (O/N): ")).upper() == 'O':
                 break
             continue
 
         # Étape 2: Menu principal (après connexion)
         display_user_menu()
-        choice = input("Votre choix: ")
+        choice = await ainput("Votre choix: ")
 
         if choice == '1':
             await display_prospects_menu()
@@ -640,20 +884,38 @@ async def main():
 
     # 1. Connexion à la DB
     host, port, user, password, database = await collect_db_params()
-    pool = await initialize_db_pool(host, port, user, password, database, max_tentatives=3)
+    pool = await initialize_db_pool(host, port, user, password, database, max_tentatives=3,
+                                    **pool_config_from_env())
 
     if not pool:
         logger.error("Démarrage impossible sans connexion DB.")
         return
 
-    # 2. Lancement de l'application
+    # 2. Mise à jour du schéma (migrations versionnées, non destructives)
+    migration_result = await apply_migrations()
+    schema = await check_schema_version() if migration_result['success'] else None
+    if not schema or not schema['a_jour']:
+        logger.error(f"Démarrage impossible, schéma non à jour: {migration_result['message']}")
+        await close_db_pool()
+        return
+    logger.info(migration_result['message'])
+    if schema['inconnues']:
+        logger.warning(f"La base contient des migrations inconnues de cette version: {schema['inconnues']}")
+
+    # 3. Calibration du coût bcrypt sur cette machine
+    await calibrate_bcrypt_cost_async()
+
+    # 4. Purge en arrière-plan des prospects supprimés, puis lancement de l'application
+    start_purge_worker()
     try:
         await application_loop()
     except Exception as e:
         logger.critical(f"Erreur fatale dans la boucle principale: {e}")
     finally:
-        # 3. Fermeture du pool à la fin
+        # 5. Arrêt de la purge, fermeture du pool et de l'exécuteur de hachage à la fin
+        await stop_purge_worker()
         await close_db_pool()
+        shutdown_hash_executor()
 
 
 if __name__ == "__main__":
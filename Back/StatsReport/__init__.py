@@ -0,0 +1,13 @@
+from .statService import (
+    get_prospect_status_distribution,
+    get_conversion_rate,
+    get_user_conversion_performance,
+    get_prospects_created_by_month,
+    get_prospect_trend,
+    get_dashboard_snapshot,
+    get_conversion_funnel,
+    get_cohort_conversion,
+    get_inactive_prospects_by_user,
+    reconcile_status_counters,
+    rebuild_daily_rollup
+)
@@ -0,0 +1,105 @@
+from typing import List, Dict, Any, Tuple, Sequence
+
+import numpy as np
+
+# Moteur d'analyse en colonnes : les résultats de requêtes (listes de dictionnaires) sont convertis
+# une seule fois en tableaux NumPy typés, puis tous les calculs sont vectorisés.
+# Le formatage pour l'affichage (pourcentages en texte) ne se fait qu'en sortie.
+
+# Étapes du tunnel de conversion, dans l'ordre ('perdu' est une sortie du tunnel, pas une étape)
+FUNNEL_STAGES = ('nouveau', 'interesse', 'negociation', 'converti')
+# Statut de sortie : l'étape atteinte avant la perte n'est pas historisée, ces prospects
+# ne comptent donc que dans l'étape d'entrée
+FUNNEL_LOST_STATUS = 'perdu'
+
+Columns = Dict[str, np.ndarray]
+
+
+## --- 1. Conversion Lignes -> Colonnes ---
+
+def to_columns(rows: Sequence[Dict[str, Any]], schema: Dict[str, Any]) -> Columns:
+    """
+    Convertit une liste de dictionnaires en colonnes typées.
+
+    Args:
+        rows: Lignes renvoyées par la BDD (DictCursor).
+        schema: {nom_colonne: dtype NumPy}, ex: {'username': object, 'total_prospects': np.int64}.
+    Returns:
+        {nom_colonne: np.ndarray} ; toutes les colonnes ont la même longueur.
+    """
+    count = len(rows)
+    columns: Columns = {}
+    for name, dtype in schema.items():
+        if np.issubdtype(np.dtype(dtype), np.number):
+            # fromiter évite la liste Python intermédiaire ; None (SUM sur zéro ligne) devient 0
+            columns[name] = np.fromiter((row[name] or 0 for row in rows), dtype=dtype, count=count)
+        else:
+            column = np.empty(count, dtype=object)
+            column[:] = [row[name] for row in rows]
+            columns[name] = column
+    return columns
+
+
+def format_rate(rate: float) -> str:
+    """Formate un taux (en %) pour l'affichage : 12.345 -> '12.35%'."""
+    return f"{rate:.2f}%"
+
+
+## --- 2. Taux de Conversion ---
+
+def conversion_rates(totals: np.ndarray, converted: np.ndarray) -> np.ndarray:
+    """Taux de conversion en % par élément (0 lorsque le total est nul)."""
+    totals = totals.astype(np.float64)
+    rates = np.zeros_like(totals)
+    np.divide(converted, totals, out=rates, where=totals > 0)
+    return rates * 100
+
+
+def rank_by_rate(rates: np.ndarray) -> np.ndarray:
+    """Indices triés par taux décroissant (tri stable : les ex aequo gardent leur ordre d'origine)."""
+    return np.argsort(-rates, kind='stable')
+
+
+## --- 3. Tunnel de Conversion ---
+
+def funnel_ratios(status_counts: Dict[str, int]) -> List[Dict[str, Any]]:
+    """
+    Calcule, pour chaque étape du tunnel, le nombre de prospects l'ayant atteinte
+    (statut courant à cette étape ou au-delà) et le ratio de passage depuis l'étape précédente.
+    Les prospects perdus sont comptés dans l'étape d'entrée : le premier dénominateur est le total
+    des prospects, comme pour le taux de conversion global.
+
+    Args:
+        status_counts: {statut: nombre de prospects} (ex: distribution des statuts).
+    """
+    counts = np.array([status_counts.get(stage, 0) for stage in FUNNEL_STAGES], dtype=np.int64)
+    # Atteint l'étape k = se trouve à l'étape k ou à une étape ultérieure : somme cumulée inversée
+    reached = np.cumsum(counts[::-1])[::-1]
+    reached[0] += status_counts.get(FUNNEL_LOST_STATUS, 0)
+    previous = np.concatenate(([reached[0]], reached[:-1]))
+    ratios = conversion_rates(previous, reached)
+
+    return [
+        {"etape": stage, "atteint": int(reached[i]), "taux_passage": format_rate(ratios[i])}
+        for i, stage in enumerate(FUNNEL_STAGES)
+    ]
+
+
+## --- 4. Tables de Cohortes ---
+
+def cohort_table(cohorts: np.ndarray, statuses: np.ndarray, counts: np.ndarray,
+                 status_order: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Construit la matrice cohorte x statut (ex: mois de création x statut actuel).
+
+    Returns:
+        (cohortes triées, matrice int64 de forme [nb_cohortes, len(status_order)])
+    """
+    unique_cohorts, cohort_index = np.unique(cohorts, return_inverse=True)
+    status_position = {status: i for i, status in enumerate(status_order)}
+    status_index = np.fromiter((status_position[s] for s in statuses), dtype=np.int64, count=len(statuses))
+
+    matrix = np.zeros((len(unique_cohorts), len(status_order)), dtype=np.int64)
+    # add.at accumule correctement les indices répétés
+    np.add.at(matrix, (cohort_index, status_index), counts)
+    return unique_cohorts, matrix
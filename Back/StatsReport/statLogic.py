@@ -1,5 +1,11 @@
 from typing import List, Dict, Any, Tuple
 
+import numpy as np
+
+from .statAnalytics import (
+    to_columns, conversion_rates, rank_by_rate, format_rate, funnel_ratios, cohort_table
+)
+
 
 ## --- 1. Statistiques Basiques de Distribution ---
 
@@ -53,20 +59,65 @@ def calculate_user_performance(data: List[Dict]) -> List[Dict]:
     Returns:
         Liste enrichie avec le taux de conversion par commercial.
     """
-    results = []
-    for item in data:
-        total = item['total_prospects']
-        converted = item['total_converti']
-        rate = 0.0
-
-        if total > 0:
-            rate = (converted / total) * 100
-
-        results.append({
-            "username": item['username'],
-            "total_prospects": total,
-            "total_converti": converted,
-            "taux_conversion": f"{rate:.2f}%"
-        })
-
-    return sorted(results, key=lambda x: float(x['taux_conversion'].strip('%')), reverse=True)
\ No newline at end of file
+    if not data:
+        return []
+
+    # Calcul et tri sur les taux numériques ; le texte '12.50%' n'est produit qu'en sortie
+    columns = to_columns(data, {'username': object, 'total_prospects': np.int64, 'total_converti': np.int64})
+    rates = conversion_rates(columns['total_prospects'], columns['total_converti'])
+
+    return [
+        {
+            "username": columns['username'][i],
+            "total_prospects": int(columns['total_prospects'][i]),
+            "total_converti": int(columns['total_converti'][i]),
+            "taux_conversion": format_rate(rates[i])
+        }
+        for i in rank_by_rate(rates)
+    ]
+
+
+## --- 4. Tunnel de Conversion ---
+
+def calculate_conversion_funnel(data: List[Dict]) -> List[Dict]:
+    """
+    Calcule le tunnel nouveau -> interesse -> negociation -> converti.
+
+    Args:
+        data: Distribution des statuts [{'status': 'nouveau', 'count': 45}, ...]
+    Returns:
+        [{'etape': ..., 'atteint': ..., 'taux_passage': '..%'}, ...] dans l'ordre du tunnel.
+    """
+    return funnel_ratios({item['status']: item['count'] for item in data})
+
+
+## --- 5. Cohortes (Mois de Création x Statut) ---
+
+def calculate_cohort_table(data: List[Dict], status_order: Tuple[str, ...]) -> List[Dict]:
+    """
+    Construit la table de cohortes : pour chaque mois de création, le nombre de prospects
+    par statut actuel et le taux de conversion de la cohorte.
+
+    Args:
+        data: [{'cohorte': '2025-01', 'status': 'converti', 'total': 12}, ...]
+        status_order: Ordre des colonnes de statut.
+    """
+    if not data:
+        return []
+
+    columns = to_columns(data, {'cohorte': object, 'status': object, 'total': np.int64})
+    cohorts, matrix = cohort_table(columns['cohorte'], columns['status'], columns['total'], status_order)
+
+    totals = matrix.sum(axis=1)
+    converted = matrix[:, status_order.index('converti')]
+    rates = conversion_rates(totals, converted)
+
+    return [
+        {
+            "cohorte": cohorts[i],
+            **{status: int(matrix[i, j]) for j, status in enumerate(status_order)},
+            "total": int(totals[i]),
+            "taux_conversion": format_rate(rates[i])
+        }
+        for i in range(len(cohorts))
+    ]
@@ -17,7 +17,8 @@ try:
     from Back.StatsReport import (
         get_prospect_status_distribution,
         get_conversion_rate,
-        get_user_conversion_performance
+        get_user_conversion_performance,
+        get_dashboard_snapshot
     )
 
 except ImportError:
@@ -42,6 +43,12 @@ except ImportError:
             {"username": "Commercial_A", "total_prospects": 35, "total_converti": 6, "taux_conversion": "17.14%"},
             {"username": "Commercial_B", "total_prospects": 48, "total_converti": 2, "taux_conversion": "4.17%"},
         ]
+
+
+    async def get_dashboard_snapshot():
+        conversion, statuts, performance = await asyncio.gather(
+            get_conversion_rate(), get_prospect_status_distribution(), get_user_conversion_performance())
+        return {"conversion": conversion, "statuts": statuts, "performance": performance}
     # ----------------------------------------------------
 
 # --- KivyMD KV Language ---
@@ -98,11 +105,9 @@ class ReportingScreen(MDScreen):
         asyncio.ensure_future(self._fetch_and_display_all_stats())
 
     async def _fetch_and_display_all_stats(self):
-        """ Exécute toutes les requêtes asynchrones et met à jour l'UI. """
-        conversion_data = await get_conversion_rate()
-        status_data = await get_prospect_status_distribution()
-        performance_data = await get_user_conversion_performance()
-        self._update_ui_with_data(conversion_data, status_data, performance_data)
+        """ Charge les trois indicateurs en un seul appel (instantané cohérent) et met à jour l'UI. """
+        snapshot = await get_dashboard_snapshot()
+        self._update_ui_with_data(snapshot['conversion'], snapshot['statuts'], snapshot['performance'])
 
     @mainthread
     def _update_ui_with_data(self, conversion: Dict, status_list: List[Dict], performance_list: List[Dict]):
@@ -1,31 +1,127 @@
-from typing import Dict, Any, List
-from Back.dbManager import execute_query
-from .statLogic import calculate_status_distribution, calculate_conversion_rate, calculate_user_performance
+import copy
+import functools
+import inspect
+import logging
+from datetime import date
+from typing import Dict, Any, List, Callable, Awaitable, Optional
+from Back.dbManager import execute_query, execute_many, transaction
+from Back.cacheManager import TTLCache, SingleFlight, MISSING
+from .statLogic import (
+    calculate_status_distribution, calculate_conversion_rate, calculate_user_performance,
+    calculate_conversion_funnel, calculate_cohort_table
+)
+
+logger = logging.getLogger("StatService")
+
+# Expression SQL du début de période pour chaque granularité des séries temporelles
+TREND_GRANULARITIES = {
+    'jour': "jour",
+    'semaine': "DATE_SUB(jour, INTERVAL WEEKDAY(jour) DAY)",
+    'mois': "DATE_SUB(jour, INTERVAL DAYOFMONTH(jour) - 1 DAY)",
+}
+
+# Seuil par défaut (jours sans interaction) du rapport des prospects à relancer
+DEFAULT_INACTIVE_DAYS = 30
+
+# Ordre des statuts (colonnes) dans les tables de cohortes, aligné sur l'ENUM Prospect.status
+STATUS_ORDER = ('nouveau', 'interesse', 'negociation', 'perdu', 'converti')
+
+# --- Cache des Rapports ---
+# Les rapports sont mis en cache par nom et paramètres pendant REPORT_CACHE_TTL secondes.
+# Chaque écriture sur Prospect incrémente _data_version (invalidate_report_cache) :
+# une entrée calculée avant cette écriture est ignorée même si son TTL n'a pas expiré.
+REPORT_CACHE_TTL = 30.0  # secondes
+REPORT_CACHE_SIZE = 128
+
+_report_cache = TTLCache(maxsize=REPORT_CACHE_SIZE, ttl=REPORT_CACHE_TTL)
+_report_flights = SingleFlight()
+_data_version = 0
+
+
+def invalidate_report_cache():
+    """À appeler après toute écriture sur Prospect : rend obsolètes les rapports en cache."""
+    global _data_version
+    _data_version += 1
+
+
+def configure_report_cache(ttl: float = REPORT_CACHE_TTL, maxsize: int = REPORT_CACHE_SIZE):
+    """Recrée le cache des rapports avec un nouveau TTL (0 désactive de fait le cache)."""
+    global _report_cache
+    _report_cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+
+def get_report_cache_stats() -> Dict[str, Any]:
+    """Retourne les compteurs du cache des rapports."""
+    stats = _report_cache.stats()
+    stats["version_donnees"] = _data_version
+    stats["calculs_en_cours"] = _report_flights.inflight()
+    return stats
+
+
+async def _cached_report(key: tuple, compute: Callable[[], Awaitable[Any]]) -> Any:
+    """Sert le rapport depuis le cache s'il est à jour, sinon le calcule une seule fois (single-flight)."""
+    version = _data_version
+    entry = _report_cache.get(key)
+    if entry is not MISSING and entry[0] == version:
+        return copy.deepcopy(entry[1])
+
+    async def load():
+        result = await compute()
+        # Version lue avant la requête : une écriture pendant le calcul rend l'entrée obsolète
+        _report_cache.set(key, (version, result))
+        return result
+
+    # La version fait partie de la clé : un calcul lancé avant une écriture n'est pas partagé après
+    result = await _report_flights.run((key, version), load)
+    return copy.deepcopy(result)  # Chaque appelant reçoit sa copie
+
+
+def cached_report(name: str):
+    """Décorateur : met en cache le résultat d'un rapport, clé = (nom, arguments)."""
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            # Arguments normalisés (positionnels, nommés ou par défaut) : un même appel donne une même clé
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (name, tuple(bound.arguments.items()))
+            return await _cached_report(key, lambda: func(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
+# NOTE: Les rapports 1 à 3 lisent ProspectStatusCount (compteurs par statut et par responsable,
+# maintenus par triggers) : leur coût dépend du nombre de statuts/commerciaux, pas du nombre de prospects.
 
 # --- 1. Distribution des Statuts ---
+@cached_report("distribution_statuts")
 async def get_prospect_status_distribution() -> List[Dict]:
     """
     Récupère la distribution des prospects par statut et la traite.
     """
     sql = """
-    SELECT status, COUNT(id_prospect) as count
-    FROM Prospect
-    GROUP BY status;
+    SELECT status, CAST(SUM(total) AS SIGNED) AS count
+    FROM ProspectStatusCount
+    GROUP BY status
+    HAVING count > 0;
     """
     data = await execute_query(sql, fetch_all=True)
     return calculate_status_distribution(data) # Utilise la logique
 
 
 # --- 2. Taux de Conversion Global ---
+@cached_report("taux_conversion")
 async def get_conversion_rate() -> Dict[str, Any]:
     """
     Calcule le taux de conversion global.
     """
     sql = """
     SELECT
-        COUNT(CASE WHEN status = 'converti' THEN 1 END) AS total_converti,
-        COUNT(id_prospect) AS total_prospects
-    FROM Prospect;
+        CAST(COALESCE(SUM(CASE WHEN status = 'converti' THEN total END), 0) AS SIGNED) AS total_converti,
+        CAST(COALESCE(SUM(total), 0) AS SIGNED) AS total_prospects
+    FROM ProspectStatusCount;
     """
     data = await execute_query(sql, fetch_one=True)
     # Assurez-vous que data n'est pas None
@@ -35,6 +131,7 @@ async def get_conversion_rate() -> Dict[str, Any]:
 
 
 # --- 3. Performance Commerciale par Utilisateur ---
+@cached_report("performance_commerciale")
 async def get_user_conversion_performance() -> List[Dict]:
     """
     Calcule le nombre de prospects et le taux de conversion par utilisateur.
@@ -42,11 +139,12 @@ async def get_user_conversion_performance() -> List[Dict]:
     sql = """
     SELECT
         a.username,
-        COUNT(p.id_prospect) AS total_prospects,
-        COUNT(CASE WHEN p.status = 'converti' THEN 1 END) AS total_converti
-    FROM Prospect p
-    JOIN Account a ON p.assignation = a.id_compte
+        CAST(SUM(c.total) AS SIGNED) AS total_prospects,
+        CAST(SUM(CASE WHEN c.status = 'converti' THEN c.total ELSE 0 END) AS SIGNED) AS total_converti
+    FROM ProspectStatusCount c
+    JOIN Account a ON c.assignation = a.id_compte
     GROUP BY a.username
+    HAVING total_prospects > 0
     ORDER BY total_converti DESC;
     """
     data = await execute_query(sql, fetch_all=True)
@@ -54,16 +152,247 @@ async def get_user_conversion_performance() -> List[Dict]:
 
 
 # --- 4. Historique des Créations de Prospects (Exemple de rapport Temporel) ---
-async def get_prospects_created_by_month() -> List[Dict]:
+@cached_report("creations_par_mois")
+async def get_prospects_created_by_month(date_debut: Optional[date] = None,
+                                         date_fin: Optional[date] = None) -> List[Dict]:
+    """
+    Compte le nombre de prospects créés par mois/année, éventuellement sur une plage de dates.
+    Lit les cumuls journaliers (ProspectDailyRollup) au lieu de parcourir la table Prospect.
+    """
+    trend = await get_prospect_trend(date_debut, date_fin, granularite='mois')
+    return [{"month_year": item['periode'], "total_created": item['created']} for item in trend]
+
+
+@cached_report("tendance")
+async def get_prospect_trend(date_debut: Optional[date] = None, date_fin: Optional[date] = None,
+                             granularite: str = 'jour', assignation: Optional[int] = None) -> List[Dict]:
+    """
+    Séries temporelles (créations, conversions, pertes) agrégées par jour, semaine ou mois.
+
+    Args:
+        date_debut, date_fin: Bornes incluses (None : pas de borne).
+        granularite: 'jour', 'semaine' (semaines commençant le lundi) ou 'mois'.
+        assignation: Restreint aux prospects d'un commercial (ID de compte).
+    Returns:
+        [{'periode': '2025-03', 'created': 12, 'converted': 3, 'lost': 1}, ...] triés par période.
+    """
+    if granularite not in TREND_GRANULARITIES:
+        raise ValueError(f"Granularité invalide. Doit être l'une de: {', '.join(TREND_GRANULARITIES)}.")
+
+    sql = f"""
+    SELECT {TREND_GRANULARITIES[granularite]} AS periode,
+        CAST(SUM(created) AS SIGNED) AS created,
+        CAST(SUM(converted) AS SIGNED) AS converted,
+        CAST(SUM(lost) AS SIGNED) AS lost
+    FROM ProspectDailyRollup
+    WHERE 1 = 1"""
+    params: List[Any] = []
+    if date_debut:
+        sql += " AND jour >= %s"
+        params.append(date_debut)
+    if date_fin:
+        sql += " AND jour <= %s"
+        params.append(date_fin)
+    if assignation is not None:
+        sql += " AND assignation = %s"
+        params.append(assignation)
+    sql += " GROUP BY periode ORDER BY periode ASC;"
+
+    rows = await execute_query(sql, tuple(params), fetch_all=True) or []
+    # Libellés : '2025-03-14' (jour, lundi de la semaine) ou '2025-03' (mois)
+    label_format = '%Y-%m' if granularite == 'mois' else '%Y-%m-%d'
+    return [
+        {"periode": row['periode'].strftime(label_format), "created": row['created'],
+         "converted": row['converted'], "lost": row['lost']}
+        for row in rows
+    ]
+
+
+# --- 5. Tableau de Bord (instantané cohérent) ---
+@cached_report("tableau_de_bord")
+async def get_dashboard_snapshot() -> Dict[str, Any]:
+    """
+    Calcule en une seule requête les trois indicateurs du tableau de bord :
+    taux de conversion global, distribution des statuts et performance par commercial.
+
+    Les trois proviennent du même parcours de ProspectStatusCount : ils sont donc cohérents
+    entre eux (même instant), et le coût est celui d'une seule requête.
+    """
+    sql = """
+    SELECT c.status, c.total, a.username
+    FROM ProspectStatusCount c
+    LEFT JOIN Account a ON c.assignation = a.id_compte
+    WHERE c.total > 0;
+    """
+    rows = await execute_query(sql, fetch_all=True) or []
+
+    by_status: Dict[str, int] = {}
+    by_user: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        by_status[row['status']] = by_status.get(row['status'], 0) + row['total']
+
+        # Comme get_user_conversion_performance : les prospects non assignés sont ignorés
+        if row['username'] is not None:
+            user = by_user.setdefault(row['username'], {"username": row['username'], "total_prospects": 0,
+                                                        "total_converti": 0})
+            user['total_prospects'] += row['total']
+            if row['status'] == 'converti':
+                user['total_converti'] += row['total']
+
+    conversion = calculate_conversion_rate({
+        "total_converti": by_status.get('converti', 0),
+        "total_prospects": sum(by_status.values())
+    })
+    status_list = calculate_status_distribution([{"status": k, "count": v} for k, v in by_status.items()])
+    performance_list = calculate_user_performance(list(by_user.values()))
+
+    return {"conversion": conversion, "statuts": status_list, "performance": performance_list}
+
+
+# --- 6. Tunnel de Conversion ---
+@cached_report("tunnel_conversion")
+async def get_conversion_funnel() -> List[Dict]:
     """
-    Compte le nombre de prospects créés par mois/année.
+    Calcule le tunnel nouveau -> interesse -> negociation -> converti à partir des compteurs de statuts.
+    """
+    distribution = await get_prospect_status_distribution()
+    return calculate_conversion_funnel(distribution)
+
+
+# --- 7. Cohortes de Création ---
+@cached_report("cohortes_creation")
+async def get_cohort_conversion() -> List[Dict]:
+    """
+    Table de cohortes : pour chaque mois de création, répartition des prospects par statut actuel
+    et taux de conversion de la cohorte.
     """
     sql = """
-    SELECT 
-        DATE_FORMAT(creation, '%Y-%m') AS month_year,
-        COUNT(id_prospect) AS total_created
+    SELECT DATE_FORMAT(creation, '%Y-%m') AS cohorte, status, COUNT(id_prospect) AS total
     FROM Prospect
-    GROUP BY month_year
-    ORDER BY month_year ASC;
+    WHERE status IS NOT NULL AND deleted_at IS NULL
+    GROUP BY cohorte, status;
+    """
+    data = await execute_query(sql, fetch_all=True)
+    return calculate_cohort_table(data, STATUS_ORDER)
+
+
+# --- 8. Réconciliation des Compteurs de Statuts ---
+async def reconcile_status_counters(fix: bool = True) -> Dict[str, Any]:
+    """
+    Recalcule les compteurs par statut et par responsable depuis la table Prospect,
+    les compare à ProspectStatusCount et, si fix=True, reconstruit la table.
+
+    Les compteurs sont verrouillés (FOR UPDATE) avant le comptage : les écritures concurrentes
+    sur Prospect attendent la fin de la réconciliation, le résultat est donc cohérent.
+    """
+    sql_lock_counters = "SELECT status, assignation, total FROM ProspectStatusCount FOR UPDATE"
+    sql_actual = """
+    SELECT status, IFNULL(assignation, 0) AS assignation, COUNT(*) AS total
+    FROM Prospect
+    WHERE status IS NOT NULL AND deleted_at IS NULL
+    GROUP BY status, IFNULL(assignation, 0);
+    """
+    try:
+        async with transaction() as conn:
+            # Sans limite de durée : le comptage parcourt toute la table Prospect
+            stored_rows = await execute_query(sql_lock_counters, fetch_all=True, conn=conn, timeout=0)
+            actual_rows = await execute_query(sql_actual, fetch_all=True, conn=conn, timeout=0)
+
+            stored = {(r['status'], r['assignation']): r['total'] for r in stored_rows}
+            actual = {(r['status'], r['assignation']): r['total'] for r in actual_rows}
+
+            drift = []
+            for key in sorted(set(stored) | set(actual)):
+                expected, found = actual.get(key, 0), stored.get(key, 0)
+                if expected != found:
+                    drift.append({"status": key[0], "assignation": key[1], "attendu": expected, "constate": found})
+
+            if fix and (drift or len(stored) != len(actual)):
+                await execute_query("DELETE FROM ProspectStatusCount", conn=conn, timeout=0)
+                await execute_many(
+                    "INSERT INTO ProspectStatusCount (status, assignation, total) VALUES (%s, %s, %s)",
+                    [(status, assignation, total) for (status, assignation), total in actual.items()],
+                    conn=conn
+                )
+    except Exception as e:
+        return {"success": False, "message": f"Échec de la réconciliation des compteurs: {e}"}
+
+    if drift:
+        if fix:
+            invalidate_report_cache()
+        logger.warning(f"Réconciliation des compteurs de statuts: {len(drift)} écart(s) détecté(s).")
+    return {
+        "success": True,
+        "message": f"{len(drift)} écart(s) détecté(s)" + (" et corrigé(s)." if fix and drift else "."),
+        "ecarts": drift,
+        "corrige": bool(fix and drift),
+    }
+
+
+# --- 9. Reconstruction des Cumuls Journaliers ---
+async def rebuild_daily_rollup() -> Dict[str, Any]:
+    """
+    Reconstruit ProspectDailyRollup à partir de la table Prospect (initialisation ou réparation).
+
+    Les créations et les conversions/pertes sont rattachées au statut, au responsable et au type
+    actuels, à la date de création et au dernier changement de statut (date_statut), comme le font
+    les triggers cumul_journalier_* : reconstruction et maintenance incrémentale donnent les mêmes
+    nombres. Avant la migration 009 (pas de date_statut), la date de dernière mise à jour sert
+    d'approximation.
+    """
+    sql_created = """
+    INSERT INTO ProspectDailyRollup (jour, status, assignation, type, created)
+    SELECT DATE(creation), IFNULL(status, ''), IFNULL(assignation, 0), IFNULL(type, ''), COUNT(*)
+    FROM Prospect
+    WHERE deleted_at IS NULL
+    GROUP BY DATE(creation), IFNULL(status, ''), IFNULL(assignation, 0), IFNULL(type, '');
+    """
+    sql_outcomes = """
+    INSERT INTO ProspectDailyRollup (jour, status, assignation, type, converted, lost)
+    SELECT DATE({status_date}), status, IFNULL(assignation, 0), IFNULL(type, ''),
+        SUM(status = 'converti'), SUM(status = 'perdu')
+    FROM Prospect
+    WHERE status IN ('converti', 'perdu') AND deleted_at IS NULL
+    GROUP BY DATE({status_date}), status, IFNULL(assignation, 0), IFNULL(type, '')
+    ON DUPLICATE KEY UPDATE converted = converted + VALUES(converted), lost = lost + VALUES(lost);
+    """
+    sql_has_status_date = """
+    SELECT 1 FROM INFORMATION_SCHEMA.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Prospect' AND COLUMN_NAME = 'date_statut';
+    """
+    try:
+        async with transaction() as conn:
+            has_status_date = await execute_query(sql_has_status_date, fetch_one=True, conn=conn) is not None
+            sql_outcomes = sql_outcomes.format(status_date='date_statut' if has_status_date else 'date_update')
+            # Sans limite de durée : la reconstruction parcourt toute la table Prospect
+            await execute_query("DELETE FROM ProspectDailyRollup", conn=conn, timeout=0)
+            rows = await execute_query(sql_created, conn=conn, timeout=0)
+            await execute_query(sql_outcomes, conn=conn, timeout=0)
+    except Exception as e:
+        return {"success": False, "message": f"Échec de la reconstruction des cumuls journaliers: {e}"}
+
+    invalidate_report_cache()
+    return {"success": True, "message": f"Cumuls journaliers reconstruits ({rows} ligne(s) de créations)."}
+
+
+# --- 10. Prospects à Relancer par Commercial ---
+@cached_report("prospects_inactifs")
+async def get_inactive_prospects_by_user(jours: int = DEFAULT_INACTIVE_DAYS) -> List[Dict]:
+    """
+    Compte, par commercial, les prospects sans interaction depuis au moins `jours` jours
+    (dont ceux jamais contactés). Lit le résumé d'activité dénormalisé de Prospect
+    (index idx_prospect_inactivite) au lieu d'agréger la table Interaction.
+    """
+    sql = """
+    SELECT a.username,
+        CAST(COUNT(*) AS SIGNED) AS total_inactifs,
+        CAST(SUM(p.last_interaction_at IS NULL) AS SIGNED) AS jamais_contactes,
+        MIN(p.last_interaction_at) AS plus_ancienne_interaction
+    FROM Prospect p
+    JOIN Account a ON p.assignation = a.id_compte
+    WHERE p.deleted_at IS NULL
+        AND (p.last_interaction_at IS NULL OR p.last_interaction_at < NOW() - INTERVAL %s DAY)
+    GROUP BY a.username
+    ORDER BY total_inactifs DESC;
     """
-    return await execute_query(sql, fetch_all=True)
\ No newline at end of file
+    return await execute_query(sql, (max(0, int(jours)),), fetch_all=True) or []
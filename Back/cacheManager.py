@@ -0,0 +1,98 @@
+# cacheManager.py - Caches en mémoire partagés par les services
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+# Sentinelle distinguant "absent du cache" d'une valeur None mise en cache
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Cache LRU en mémoire avec expiration (TTL) et compteurs de succès/échecs.
+
+    Non thread-safe : prévu pour être utilisé depuis la boucle asyncio uniquement.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0):
+        if maxsize < 1:
+            raise ValueError("maxsize doit être supérieur ou égal à 1.")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any:
+        """Retourne la valeur associée à key, ou MISSING si elle est absente ou expirée."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return MISSING
+
+        self._entries.move_to_end(key)  # Entrée la plus récemment utilisée
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Enregistre value sous key ; évince l'entrée la moins récemment utilisée si le cache est plein."""
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *keys: Hashable):
+        """Supprime les clés données (les clés absentes sont ignorées)."""
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Vide le cache (les compteurs sont conservés)."""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Retourne les compteurs de succès/échecs et l'occupation du cache."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "taux_succes": round(self.hits / total, 4) if total else 0.0,
+            "taille": len(self._entries),
+            "taille_max": self.maxsize,
+            "ttl_sec": self.ttl,
+        }
+
+
+class SingleFlight:
+    """
+    Regroupe les appels concurrents portant sur une même clé : le premier lance le calcul,
+    les suivants attendent son résultat au lieu de relancer la même requête.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Exécute func() une seule fois pour tous les appelants concurrents de key."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # shield : l'annulation d'un appelant n'interrompt pas le calcul partagé par les autres
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def inflight(self) -> int:
+        """Nombre de calculs en cours."""
+        return len(self._inflight)
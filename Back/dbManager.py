@@ -1,8 +1,15 @@
 # db_manager.py (Version Améliorée)
 import asyncio
 import logging
+import os
+import random
+import time
+from contextlib import asynccontextmanager
 import aiomysql
-from typing import Optional, Any, Dict, List, Tuple
+import aiomysql.cursors
+from typing import Optional, Any, Dict, List, Tuple, Sequence, AsyncIterator
+
+from Back.dbMetrics import record_query
 
 # Configuration du logger
 logger = logging.getLogger("DBManager")
@@ -11,21 +18,103 @@ logger.setLevel(logging.INFO)
 # Variable globale pour stocker le pool de connexions
 _pool: Optional[aiomysql.Pool] = None
 
+# Taille par défaut des blocs lus par stream_query
+DEFAULT_STREAM_CHUNK_SIZE = 1000
+
+# --- Configuration du Pool ---
+# Durées en secondes ; un timeout <= 0 est désactivé. Surchargeable par initialize_db_pool(**options)
+# ou par les variables d'environnement PROSPECTIUS_POOL_<CLÉ EN MAJUSCULES> (pool_config_from_env).
+DEFAULT_POOL_CONFIG: Dict[str, Any] = {
+    "minsize": 1,
+    "maxsize": 10,
+    "pool_recycle": 3600,          # Âge max d'une connexion inactive avant recréation (-1 : jamais)
+    "connect_timeout": 10.0,       # Établissement d'une connexion
+    "query_timeout": 30.0,         # Exécution d'une requête par execute_query
+    "acquire_timeout": 10.0,       # Attente d'une connexion libre dans le pool
+    "acquire_warning": 1.0,        # Attente au-delà de laquelle un avertissement est journalisé
+    "pre_ping": True,              # Vérifie (PING) une connexion restée inactive avant de la prêter
+    "pre_ping_idle": 30.0,         # Inactivité à partir de laquelle le PING est fait
+    "reconnect_attempts": 3,       # Tentatives d'acquisition quand le serveur est injoignable
+    "backoff_base": 0.5,           # Délai de base du backoff exponentiel
+    "backoff_max": 30.0,           # Délai maximal entre deux tentatives
+}
+
+_config: Dict[str, Any] = dict(DEFAULT_POOL_CONFIG)
+
+# Jauges et compteurs du pool (voir get_pool_stats)
+_waiting = 0
+_pool_counters: Dict[str, float] = {
+    "acquisitions": 0,
+    "attente_totale_ms": 0.0,
+    "attente_max_ms": 0.0,
+    "timeouts_acquisition": 0,
+    "timeouts_requete": 0,
+    "connexions_ecartees": 0,
+    "reconnexions": 0,
+}
+
+# Erreurs après lesquelles l'état de la connexion est incertain : elle est fermée au lieu d'être rendue
+_BROKEN_CONNECTION_ERRORS = (aiomysql.OperationalError, aiomysql.InterfaceError, asyncio.CancelledError,
+                             TimeoutError, asyncio.TimeoutError, OSError)
+
 
 # --- Fonctions de Gestion de la Connexion ---
 
+def pool_config_from_env(environ: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Lit les options du pool dans les variables PROSPECTIUS_POOL_* (ex: PROSPECTIUS_POOL_MAXSIZE=20).
+    Chaque valeur est convertie dans le type de la valeur par défaut ; les variables absentes sont ignorées.
+    """
+    environ = os.environ if environ is None else environ
+    options: Dict[str, Any] = {}
+    for key, default in DEFAULT_POOL_CONFIG.items():
+        raw = environ.get(f"PROSPECTIUS_POOL_{key.upper()}")
+        if raw is None:
+            continue
+        try:
+            if isinstance(default, bool):
+                options[key] = raw.strip().lower() in ('1', 'true', 'oui', 'yes', 'on')
+            else:
+                options[key] = type(default)(raw)
+        except ValueError:
+            logger.warning(f"Valeur ignorée pour PROSPECTIUS_POOL_{key.upper()}: '{raw}'")
+    return options
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Backoff exponentiel avec gigue complète : délai tiré dans [0, min(max, base * 2^(tentative-1))]."""
+    ceiling = min(_config["backoff_max"], _config["backoff_base"] * (2 ** (attempt - 1)))
+    return random.uniform(0, ceiling)
+
+
+def _timeout(key: str) -> Optional[float]:
+    value = _config[key]
+    return value if value and value > 0 else None
+
+
 async def initialize_db_pool(
         host: str,
         port: int,
         user: str,
         password: str,
         database: str,
-        max_tentatives: int = 3
+        max_tentatives: int = 3,
+        **pool_options: Any
 ) -> Optional[aiomysql.Pool]:
     """
-    Tente d'établir un pool de connexions aiomysql avec une logique de nouvelles tentatives.
+    Tente d'établir un pool de connexions aiomysql avec une logique de nouvelles tentatives
+    (backoff exponentiel avec gigue entre deux tentatives).
+
+    pool_options surcharge DEFAULT_POOL_CONFIG (minsize, maxsize, pool_recycle, timeouts, pre_ping...).
     """
-    global _pool
+    global _pool, _config
+
+    unknown = set(pool_options) - set(DEFAULT_POOL_CONFIG)
+    if unknown:
+        raise ValueError(f"Option(s) de pool inconnue(s): {', '.join(sorted(unknown))}")
+    _config = {**DEFAULT_POOL_CONFIG, **pool_options}
+    if _config["minsize"] > _config["maxsize"]:
+        raise ValueError("minsize ne peut pas dépasser maxsize.")
 
     for tentative in range(1, max_tentatives + 1):
         try:
@@ -38,9 +127,13 @@ async def initialize_db_pool(
                 # Utilisation de DictCursor pour des résultats plus faciles à manipuler
                 cursorclass=aiomysql.cursors.DictCursor,
                 autocommit=True,
-                maxsize=10
+                minsize=_config["minsize"],
+                maxsize=_config["maxsize"],
+                pool_recycle=_config["pool_recycle"],
+                connect_timeout=_timeout("connect_timeout")
             )
-            logger.info("Pool de connexion à la base de données établi avec succès.")
+            logger.info(f"Pool de connexion à la base de données établi avec succès "
+                        f"(min {_config['minsize']}, max {_config['maxsize']}).")
             _pool = pool
             return pool
 
@@ -52,8 +145,9 @@ async def initialize_db_pool(
             logger.error(f"Tentative {tentative} - Erreur inconnue lors de la connexion : {e}")
 
         if tentative < max_tentatives:
-            logger.info("Nouvelle tentative dans 5 secondes...")
-            await asyncio.sleep(5)
+            delay = _backoff_delay(tentative)
+            logger.info(f"Nouvelle tentative dans {delay:.1f} secondes...")
+            await asyncio.sleep(delay)
         else:
             logger.error("Impossible de se connecter à la base de données après plusieurs tentatives.")
 
@@ -70,21 +164,189 @@ async def close_db_pool():
         _pool = None
 
 
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Jauges instantanées du pool (taille, connexions libres/utilisées, appelants en attente)
+    et compteurs cumulés (acquisitions, attente, timeouts, connexions écartées, reconnexions).
+    """
+    if not _pool:
+        return {"initialise": False}
+
+    acquisitions = _pool_counters["acquisitions"]
+    return {
+        "initialise": True,
+        "taille": _pool.size,
+        "libres": _pool.freesize,
+        "utilisees": _pool.size - _pool.freesize,
+        "taille_min": _pool.minsize,
+        "taille_max": _pool.maxsize,
+        "en_attente": _waiting,
+        "acquisitions": acquisitions,
+        "attente_moyenne_ms": round(_pool_counters["attente_totale_ms"] / acquisitions, 2) if acquisitions else 0.0,
+        "attente_max_ms": round(_pool_counters["attente_max_ms"], 2),
+        "timeouts_acquisition": _pool_counters["timeouts_acquisition"],
+        "timeouts_requete": _pool_counters["timeouts_requete"],
+        "connexions_ecartees": _pool_counters["connexions_ecartees"],
+        "reconnexions": _pool_counters["reconnexions"],
+    }
+
+
+async def _wait_for_connection() -> aiomysql.Connection:
+    """Attend une connexion libre, au plus acquire_timeout secondes ; l'attente est mesurée."""
+    global _waiting
+    started = time.perf_counter()
+    _waiting += 1
+    try:
+        conn = await asyncio.wait_for(_pool.acquire(), timeout=_timeout("acquire_timeout"))
+    except asyncio.TimeoutError:
+        _pool_counters["timeouts_acquisition"] += 1
+        raise ConnectionError(
+            f"Aucune connexion libre après {_config['acquire_timeout']} s "
+            f"(pool: {_pool.size - _pool.freesize}/{_pool.maxsize} utilisées, {_waiting - 1} autre(s) en attente)."
+        )
+    finally:
+        _waiting -= 1
+
+    waited_ms = (time.perf_counter() - started) * 1000
+    _pool_counters["acquisitions"] += 1
+    _pool_counters["attente_totale_ms"] += waited_ms
+    _pool_counters["attente_max_ms"] = max(_pool_counters["attente_max_ms"], waited_ms)
+    if waited_ms >= _config["acquire_warning"] * 1000:
+        logger.warning(f"Attente de {waited_ms:.0f} ms pour une connexion "
+                       f"(pool: {_pool.size}/{_pool.maxsize}, {_waiting} en attente).")
+    return conn
+
+
+async def _is_alive(conn: aiomysql.Connection) -> bool:
+    """PING d'une connexion restée inactive plus de pre_ping_idle secondes (sans reconnexion implicite)."""
+    # last_usage est exprimé dans l'horloge de la boucle asyncio
+    idle = asyncio.get_running_loop().time() - conn.last_usage
+    if not _config["pre_ping"] or idle < _config["pre_ping_idle"]:
+        return True
+    try:
+        await asyncio.wait_for(conn.ping(reconnect=False), timeout=_timeout("connect_timeout"))
+        return True
+    except Exception as e:
+        logger.info(f"Connexion inactive écartée après échec du PING: {e}")
+        return False
+
+
+async def _checkout() -> aiomysql.Connection:
+    """
+    Emprunte une connexion saine au pool.
+
+    Les connexions mortes (serveur redémarré, délai d'inactivité du serveur dépassé) sont écartées
+    par le PING ; si le serveur est injoignable, l'acquisition est retentée avec backoff.
+    """
+    if not _pool:
+        raise ConnectionError("Le pool de connexions n'est pas initialisé ou a échoué.")
+
+    attempt = 0
+    discarded = 0
+    while True:
+        try:
+            conn = await _wait_for_connection()
+        except (aiomysql.OperationalError, aiomysql.InterfaceError) as e:
+            # Création d'une nouvelle connexion impossible : serveur arrêté ou en redémarrage
+            attempt += 1
+            if attempt >= _config["reconnect_attempts"]:
+                raise
+            _pool_counters["reconnexions"] += 1
+            delay = _backoff_delay(attempt)
+            logger.warning(f"Serveur injoignable ({e}), nouvelle tentative dans {delay:.1f} s.")
+            await asyncio.sleep(delay)
+            continue
+
+        if await _is_alive(conn):
+            return conn
+
+        _pool_counters["connexions_ecartees"] += 1
+        conn.close()
+        _pool.release(conn)
+        discarded += 1
+        # Après un redémarrage, toutes les connexions libres sont mortes : on les écarte une à une
+        if discarded > _pool.maxsize:
+            raise ConnectionError("Aucune connexion valide n'a pu être obtenue du pool.")
+
+
+@asynccontextmanager
+async def _acquire() -> AsyncIterator[aiomysql.Connection]:
+    """Emprunte une connexion et la rend au pool ; elle est fermée si son état est devenu incertain."""
+    conn = await _checkout()
+    try:
+        yield conn
+    except _BROKEN_CONNECTION_ERRORS:
+        conn.close()
+        raise
+    finally:
+        _pool.release(conn)
+
+
+@asynccontextmanager
+async def connection() -> AsyncIterator[aiomysql.Connection]:
+    """
+    Réserve une connexion du pool (en autocommit) pour plusieurs requêtes successives,
+    par exemple pour conserver un verrou de session (GET_LOCK) entre elles.
+
+    Usage:
+        async with connection() as conn:
+            await execute_query(sql, params, conn=conn)
+    """
+    async with _acquire() as conn:
+        yield conn
+
+
 # --- Fonction d'Exécution de Requête (celle que les services utiliseront) ---
 
 async def execute_query(sql: str, params: Optional[Tuple] = None, fetch_one: bool = False,
-                        fetch_all: bool = False) -> Any:
+                        fetch_all: bool = False, conn: Optional[aiomysql.Connection] = None,
+                        timeout: Optional[float] = None) -> Any:
     """
     Exécute une requête SQL de manière asynchrone en utilisant le pool global.
+
+    Si conn est fourni (connexion issue de transaction()), la requête s'exécute sur cette
+    connexion au lieu d'en acquérir une nouvelle dans le pool.
+    timeout (secondes) remplace query_timeout pour cette requête ; 0 désactive la limite (DDL longs).
+    Chaque exécution est mesurée (latence, attente du pool, lignes, erreurs) par dbMetrics.
     """
-    if not _pool:
+    if conn is None and not _pool:
         # Lève une erreur si la BDD n'est pas disponible pour forcer l'arrêt du service
         raise ConnectionError("Le pool de connexions n'est pas initialisé ou a échoué.")
 
-    async with _pool.acquire() as conn:
+    started = time.perf_counter()
+    acquire_wait = 0.0
+    try:
+        if conn is not None:
+            result = await _execute_on(conn, sql, params, fetch_one, fetch_all, timeout)
+        else:
+            async with _acquire() as pooled_conn:
+                acquire_wait = time.perf_counter() - started
+                result = await _execute_on(pooled_conn, sql, params, fetch_one, fetch_all, timeout)
+    except Exception as e:
+        record_query(sql, time.perf_counter() - started - acquire_wait, acquire_wait, 0, e)
+        raise
+
+    record_query(sql, time.perf_counter() - started - acquire_wait, acquire_wait, _result_rows(result))
+    return result
+
+
+def _result_rows(result: Any) -> int:
+    """Nombre de lignes renvoyées (SELECT) ou affectées (INSERT/UPDATE/DELETE)."""
+    if isinstance(result, int):
+        return max(result, 0)
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return 1 if result else 0
+
+
+async def _execute_on(conn: aiomysql.Connection, sql: str, params: Optional[Tuple], fetch_one: bool,
+                      fetch_all: bool, timeout: Optional[float] = None) -> Any:
+    """Exécute la requête sur une connexion donnée, dans la limite de query_timeout secondes."""
+    async def run() -> Any:
         async with conn.cursor() as cur:
             # cur est maintenant un DictCursor
-            await cur.execute(sql, params or ())
+            # Sans paramètres, la requête est envoyée telle quelle ('%Y' dans DATE_FORMAT reste intact)
+            await cur.execute(sql, params)
 
             if fetch_one:
                 return await cur.fetchone()
@@ -92,4 +354,134 @@ async def execute_query(sql: str, params: Optional[Tuple] = None, fetch_one: boo
                 return await cur.fetchall()
 
             # Retourne le nombre de lignes affectées pour INSERT/UPDATE/DELETE
-            return cur.rowcount
\ No newline at end of file
+            return cur.rowcount
+
+    limit = _timeout("query_timeout") if timeout is None else (timeout if timeout > 0 else None)
+    try:
+        return await asyncio.wait_for(run(), timeout=limit)
+    except asyncio.TimeoutError:
+        _pool_counters["timeouts_requete"] += 1
+        # Fermer la connexion n'arrête pas la requête côté serveur : elle est tuée explicitement
+        await _kill_query(conn.thread_id())
+        # Réponse à moitié lue : la connexion est inutilisable et ne doit pas retourner au pool
+        conn.close()
+        raise TimeoutError(f"Requête interrompue après {limit} s.")
+
+
+async def _kill_query(thread_id: int):
+    """
+    Interrompt côté serveur la requête en cours du thread MySQL thread_id (KILL QUERY),
+    depuis une autre connexion du pool. Au mieux : un échec est journalisé, pas propagé.
+    """
+    try:
+        async with _acquire() as conn:
+            async with conn.cursor() as cur:
+                await asyncio.wait_for(cur.execute("KILL QUERY %s", (thread_id,)),
+                                       timeout=_timeout("connect_timeout"))
+        logger.warning(f"Requête du thread MySQL {thread_id} interrompue (KILL QUERY) après dépassement du délai.")
+    except Exception as e:
+        logger.error(f"Impossible d'interrompre la requête du thread MySQL {thread_id}: {e}")
+
+
+@asynccontextmanager
+async def transaction() -> AsyncIterator[aiomysql.Connection]:
+    """
+    Ouvre une transaction sur une seule connexion du pool.
+
+    START TRANSACTION suspend l'autocommit du pool jusqu'au COMMIT (sortie normale)
+    ou au ROLLBACK (exception). Les requêtes du bloc passent la connexion à execute_query.
+
+    Usage:
+        async with transaction() as conn:
+            await execute_query(sql_1, params_1, conn=conn)
+            await execute_query(sql_2, params_2, conn=conn)
+    """
+    async with _acquire() as conn:
+        await conn.begin()
+        try:
+            yield conn
+        except BaseException:
+            # Si le ROLLBACK échoue (connexion perdue), le pool ferme la connexion restée en transaction
+            if not conn.closed:
+                await conn.rollback()
+            raise
+        await conn.commit()
+
+
+async def execute_many(sql: str, params_list: Sequence[Tuple], conn: Optional[aiomysql.Connection] = None) -> int:
+    """
+    Exécute une même requête pour plusieurs jeux de paramètres, sur une seule connexion
+    et dans une seule transaction (tout ou rien).
+
+    Pour un INSERT ... VALUES (%s, ...), aiomysql regroupe les lignes en INSERT multi-lignes.
+    Si conn est fourni, la requête s'exécute dans la transaction de l'appelant.
+    Retourne le nombre total de lignes affectées.
+    """
+    if not params_list:
+        return 0
+
+    if conn is not None:
+        return await _execute_many_on(conn, sql, params_list)
+
+    async with transaction() as tx_conn:
+        return await _execute_many_on(tx_conn, sql, params_list)
+
+
+async def _execute_many_on(conn: aiomysql.Connection, sql: str, params_list: Sequence[Tuple]) -> int:
+    """Exécute executemany sur une connexion donnée et enregistre la mesure."""
+    started = time.perf_counter()
+    try:
+        async with conn.cursor() as cur:
+            await cur.executemany(sql, params_list)
+            rowcount = cur.rowcount
+    except Exception as e:
+        record_query(sql, time.perf_counter() - started, 0.0, 0, e)
+        raise
+    record_query(sql, time.perf_counter() - started, 0.0, max(rowcount, 0))
+    return rowcount
+
+
+async def stream_query(sql: str, params: Optional[Tuple] = None,
+                       chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE) -> AsyncIterator[List[Dict]]:
+    """
+    Exécute une requête de lecture avec un curseur serveur non bufferisé (SSDictCursor)
+    et produit les lignes par blocs de chunk_size au fur et à mesure de leur arrivée.
+
+    La mémoire consommée reste bornée à un bloc, quelle que soit la taille du résultat.
+    La connexion est monopolisée pendant toute la lecture et rendue au pool à la fin,
+    y compris en cas de sortie anticipée (break) ou d'annulation.
+
+    Usage:
+        async for rows in stream_query(sql, params, chunk_size=1000):
+            ...
+    """
+    started = time.perf_counter()
+    conn = await _checkout()
+    acquire_wait = time.perf_counter() - started
+    exhausted = False
+    total_rows = 0
+    error: Optional[BaseException] = None
+    try:
+        cur = await conn.cursor(aiomysql.cursors.SSDictCursor)
+        await cur.execute(sql, params)
+
+        while True:
+            rows = await cur.fetchmany(chunk_size)
+            if not rows:
+                exhausted = True
+                break
+            total_rows += len(rows)
+            yield rows
+
+        await cur.close()
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        # Durée totale de la lecture, temps de traitement de l'appelant entre les blocs compris
+        record_query(sql, time.perf_counter() - started - acquire_wait, acquire_wait, total_rows, error)
+        if not exhausted:
+            # Résultat partiellement lu (break, exception, annulation) : vider le flux serveur
+            # pourrait lire des millions de lignes ; on ferme la connexion, que le pool écartera.
+            conn.close()
+        _pool.release(conn)
@@ -0,0 +1,176 @@
+# dbMetrics.py - Instrumentation des requêtes SQL exécutées par dbManager
+import json
+import logging
+import re
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional, Any, Dict, List
+
+logger = logging.getLogger("DBManager.SlowQuery")
+
+# Bornes supérieures (ms) des classes de l'histogramme de latence ; la dernière classe est ouverte
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+DEFAULT_SLOW_QUERY_MS = 500.0
+SLOW_QUERY_LOG_SIZE = 200
+MAX_LOGGED_SQL_LENGTH = 500
+
+_enabled = True
+_slow_query_ms = DEFAULT_SLOW_QUERY_MS
+_stats: Dict[str, Dict[str, Any]] = {}
+_slow_queries: deque = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+
+
+# --- Empreinte des Requêtes ---
+
+@lru_cache(maxsize=2048)
+def fingerprint_sql(sql: str) -> str:
+    """
+    Normalise une requête pour regrouper ses exécutions : littéraux et paramètres remplacés par '?',
+    listes IN (...) et lignes VALUES multiples réduites, espaces compactés.
+    """
+    text = re.sub(r"--[^\n]*|/\*.*?\*/", " ", sql, flags=re.S)
+    text = re.sub(r"'(?:[^'\\]|\\.)*'", "?", text)
+    text = re.sub(r"%\(\w+\)s|%s", "?", text)
+    text = re.sub(r"\b\d+(?:\.\d+)?\b", "?", text)
+    text = re.sub(r"\s+", " ", text).strip().rstrip(';').strip()
+    text = re.sub(r"\(\s*\?(?:\s*,\s*\?)*\s*\)", "(?+)", text)
+    text = re.sub(r"(VALUES\s*\(\?\+\))(?:\s*,\s*\(\?\+\))+", r"\1", text, flags=re.I)
+    return text
+
+
+# --- Configuration ---
+
+def configure_query_metrics(slow_query_ms: Optional[float] = None, enabled: Optional[bool] = None):
+    """Règle le seuil du journal des requêtes lentes (ms) et active/désactive l'instrumentation."""
+    global _slow_query_ms, _enabled
+    if slow_query_ms is not None:
+        _slow_query_ms = slow_query_ms
+    if enabled is not None:
+        _enabled = enabled
+
+
+def reset_query_metrics():
+    """Remet à zéro les statistiques et le journal des requêtes lentes."""
+    _stats.clear()
+    _slow_queries.clear()
+
+
+# --- Enregistrement ---
+
+def record_query(sql: str, duration_s: float, acquire_wait_s: float = 0.0, rows: int = 0,
+                 error: Optional[BaseException] = None):
+    """Enregistre une exécution : latence, attente d'acquisition du pool, lignes, erreur éventuelle."""
+    if not _enabled:
+        return
+
+    fingerprint = fingerprint_sql(sql)
+    stats = _stats.get(fingerprint)
+    if stats is None:
+        stats = _stats[fingerprint] = {
+            "executions": 0,
+            "erreurs": 0,
+            "lignes": 0,
+            "duree_totale_ms": 0.0,
+            "duree_max_ms": 0.0,
+            "attente_pool_totale_ms": 0.0,
+            "attente_pool_max_ms": 0.0,
+            "histogramme": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+        }
+
+    duration_ms = duration_s * 1000
+    acquire_wait_ms = acquire_wait_s * 1000
+    stats["executions"] += 1
+    stats["lignes"] += rows
+    stats["duree_totale_ms"] += duration_ms
+    stats["duree_max_ms"] = max(stats["duree_max_ms"], duration_ms)
+    stats["attente_pool_totale_ms"] += acquire_wait_ms
+    stats["attente_pool_max_ms"] = max(stats["attente_pool_max_ms"], acquire_wait_ms)
+    stats["histogramme"][_bucket_index(duration_ms)] += 1
+    if error is not None:
+        stats["erreurs"] += 1
+
+    if duration_ms >= _slow_query_ms:
+        entry = {
+            "horodatage": datetime.now().isoformat(timespec='seconds'),
+            "duree_ms": round(duration_ms, 2),
+            "attente_pool_ms": round(acquire_wait_ms, 2),
+            "lignes": rows,
+            "erreur": repr(error) if error is not None else None,
+            "empreinte": fingerprint,
+            # Les paramètres ne sont jamais journalisés (données personnelles)
+            "sql": " ".join(sql.split())[:MAX_LOGGED_SQL_LENGTH],
+        }
+        _slow_queries.append(entry)
+        logger.warning(f"Requête lente ({entry['duree_ms']} ms, {rows} ligne(s)): {entry['sql']}")
+
+
+def _bucket_index(duration_ms: float) -> int:
+    for i, bound in enumerate(LATENCY_BUCKETS_MS):
+        if duration_ms <= bound:
+            return i
+    return len(LATENCY_BUCKETS_MS)
+
+
+def _percentile_ms(histogram: List[int], total: int, quantile: float, max_ms: float) -> Optional[float]:
+    """
+    Estime un quantile à partir de l'histogramme : borne supérieure de la classe atteinte,
+    plafonnée à la durée maximale observée (utile pour la dernière classe, ouverte).
+    """
+    if not total:
+        return None
+    threshold = quantile * total
+    cumulative = 0
+    for i, count in enumerate(histogram):
+        cumulative += count
+        if cumulative >= threshold and i < len(LATENCY_BUCKETS_MS):
+            return round(min(float(LATENCY_BUCKETS_MS[i]), max_ms), 2)
+    return round(max_ms, 2)
+
+
+# --- Consultation / Export ---
+
+def get_query_metrics_snapshot() -> Dict[str, Any]:
+    """
+    Retourne un instantané des métriques : une entrée par empreinte de requête (triées par durée
+    cumulée décroissante) et le journal des requêtes lentes.
+    """
+    queries = []
+    for fingerprint, stats in _stats.items():
+        executions = stats["executions"]
+        histogram = list(stats["histogramme"])
+        queries.append({
+            "empreinte": fingerprint,
+            "executions": executions,
+            "erreurs": stats["erreurs"],
+            "lignes": stats["lignes"],
+            "duree_totale_ms": round(stats["duree_totale_ms"], 2),
+            "duree_moyenne_ms": round(stats["duree_totale_ms"] / executions, 2) if executions else 0.0,
+            "duree_max_ms": round(stats["duree_max_ms"], 2),
+            "p50_ms": _percentile_ms(histogram, executions, 0.50, stats["duree_max_ms"]),
+            "p95_ms": _percentile_ms(histogram, executions, 0.95, stats["duree_max_ms"]),
+            "p99_ms": _percentile_ms(histogram, executions, 0.99, stats["duree_max_ms"]),
+            "attente_pool_moyenne_ms": round(stats["attente_pool_totale_ms"] / executions, 2) if executions else 0.0,
+            "attente_pool_max_ms": round(stats["attente_pool_max_ms"], 2),
+            "histogramme": dict(zip([f"<={b}ms" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"],
+                                    histogram)),
+        })
+    queries.sort(key=lambda q: q["duree_totale_ms"], reverse=True)
+
+    return {
+        "genere_le": datetime.now().isoformat(timespec='seconds'),
+        "seuil_requete_lente_ms": _slow_query_ms,
+        "requetes": queries,
+        "requetes_lentes": list(_slow_queries),
+    }
+
+
+def export_query_metrics(path: str) -> Dict[str, Any]:
+    """Écrit l'instantané des métriques au format JSON dans path."""
+    snapshot = get_query_metrics_snapshot()
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False, indent=2, default=str)
+    except OSError as e:
+        return {"success": False, "message": f"Échec de l'export des métriques: {e}"}
+    return {"success": True, "message": f"Métriques exportées vers {path}.", "requetes": len(snapshot["requetes"])}
@@ -0,0 +1,589 @@
+# migrationManager.py - Migrations versionnées et non destructives du schéma
+import logging
+import time
+from typing import Dict, Any, List, Optional, Sequence
+
+import aiomysql
+
+from Back.dbManager import execute_query, connection
+from Back.Interaction.interactionService import backfill_interaction_summary
+from Back.StatsReport.statService import reconcile_status_counters, rebuild_daily_rollup
+
+logger = logging.getLogger("MigrationManager")
+
+# Verrou nommé (GET_LOCK) : deux instances démarrées en même temps n'appliquent pas les migrations deux fois
+MIGRATION_LOCK_NAME = "prospectius_migrations"
+MIGRATION_LOCK_TIMEOUT = 60  # secondes
+# Lignes mises à jour par UPDATE lors du remplissage d'une nouvelle colonne
+MIGRATION_BACKFILL_CHUNK_SIZE = 1000
+
+SQL_CREATE_MIGRATION_TABLE = """
+    CREATE TABLE IF NOT EXISTS SchemaMigration
+    (
+        version     INT PRIMARY KEY,
+        nom         VARCHAR(100) NOT NULL,
+        applique_le TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        duree_ms    INT NOT NULL DEFAULT 0
+    )
+"""
+
+Migration = Dict[str, Any]
+
+
+# --- Opérations Idempotentes ---
+# Chaque migration n'utilise que ces opérations : rejouer une migration déjà (partiellement)
+# appliquée, ou l'appliquer à une base créée par scriptSQL/Prospectius.sql, ne change rien.
+
+async def index_exists(conn: aiomysql.Connection, table: str, index: str) -> bool:
+    sql = """
+          SELECT 1 FROM INFORMATION_SCHEMA.STATISTICS
+          WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+          LIMIT 1 \
+          """
+    return await execute_query(sql, (table, index), fetch_one=True, conn=conn) is not None
+
+
+async def column_exists(conn: aiomysql.Connection, table: str, column: str) -> bool:
+    sql = """
+          SELECT 1 FROM INFORMATION_SCHEMA.COLUMNS
+          WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+          LIMIT 1 \
+          """
+    return await execute_query(sql, (table, column), fetch_one=True, conn=conn) is not None
+
+
+async def table_exists(conn: aiomysql.Connection, table: str) -> bool:
+    sql = """
+          SELECT 1 FROM INFORMATION_SCHEMA.TABLES
+          WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+          LIMIT 1 \
+          """
+    return await execute_query(sql, (table,), fetch_one=True, conn=conn) is not None
+
+
+async def add_index(conn: aiomysql.Connection, table: str, index: str, columns: Sequence[str],
+                    kind: str = "INDEX"):
+    """
+    Ajoute un index s'il n'existe pas (InnoDB le construit sans bloquer les écritures).
+    kind : "INDEX" ou "FULLTEXT INDEX".
+    """
+    if await index_exists(conn, table, index):
+        logger.info(f"Index {table}.{index} déjà présent.")
+        return
+    # Sans limite de durée : la construction de l'index dépend du volume de la table
+    await execute_query(f"ALTER TABLE {table} ADD {kind} {index} ({', '.join(columns)})", conn=conn, timeout=0)
+    logger.info(f"Index {table}.{index} ajouté.")
+
+
+async def add_column(conn: aiomysql.Connection, table: str, column: str, definition: str):
+    """Ajoute une colonne si elle n'existe pas."""
+    if await column_exists(conn, table, column):
+        logger.info(f"Colonne {table}.{column} déjà présente.")
+        return
+    await execute_query(f"ALTER TABLE {table} ADD COLUMN {column} {definition}", conn=conn, timeout=0)
+    logger.info(f"Colonne {table}.{column} ajoutée.")
+
+
+async def replace_trigger(conn: aiomysql.Connection, name: str, definition: str):
+    """
+    Remplace un trigger par sa nouvelle définition (CREATE TRIGGER complet, sans DELIMITER).
+    Seul le code du trigger change : aucune donnée n'est modifiée. Une écriture concurrente entre
+    le DROP et le CREATE échappe au trigger ; statService.reconcile_status_counters() la rattrape.
+    """
+    await execute_query(f"DROP TRIGGER IF EXISTS {name}", conn=conn)
+    await execute_query(definition, conn=conn)
+    logger.info(f"Trigger {name} remplacé.")
+
+
+# --- Migrations ---
+
+async def _m001_prospect_list_indexes(conn: aiomysql.Connection):
+    # get_prospects_list / get_prospects_page : filtres d'égalité puis tri date_update DESC, id_prospect DESC
+    await add_index(conn, 'Prospect', 'idx_prospect_assign_status_maj',
+                    ('assignation', 'status', 'date_update', 'id_prospect'))
+    await add_index(conn, 'Prospect', 'idx_prospect_status_maj', ('status', 'date_update', 'id_prospect'))
+    await add_index(conn, 'Prospect', 'idx_prospect_maj', ('date_update', 'id_prospect'))
+    # Cohortes et reconstruction des cumuls journaliers (par date de création)
+    await add_index(conn, 'Prospect', 'idx_prospect_creation', ('creation',))
+
+
+async def _m002_interaction_history_indexes(conn: aiomysql.Connection):
+    # get_interactions_by_prospect : WHERE id_prospect = ? ORDER BY date_interaction DESC
+    # (remplace l'index créé implicitement pour la clé étrangère id_prospect)
+    await add_index(conn, 'Interaction', 'idx_interaction_prospect_date', ('id_prospect', 'date_interaction'))
+    await add_index(conn, 'Interaction', 'idx_interaction_date', ('date_interaction',))
+
+
+# Compteurs de statuts : les prospects supprimés logiquement ne sont pas comptés
+# (mêmes définitions que scriptSQL/Prospectius.sql)
+SQL_TRIGGER_COUNTER_INSERT = """
+CREATE TRIGGER compteur_statut_ajout
+    AFTER INSERT ON Prospect
+    FOR EACH ROW
+BEGIN
+    IF NEW.status IS NOT NULL AND NEW.deleted_at IS NULL THEN
+        INSERT INTO ProspectStatusCount (status, assignation, total)
+        VALUES (NEW.status, IFNULL(NEW.assignation, 0), 1)
+        ON DUPLICATE KEY UPDATE total = total + 1;
+    END IF;
+END
+"""
+SQL_TRIGGER_COUNTER_UPDATE = """
+CREATE TRIGGER compteur_statut_maj
+    AFTER UPDATE ON Prospect
+    FOR EACH ROW
+BEGIN
+    IF NOT (OLD.status <=> NEW.status) OR NOT (OLD.assignation <=> NEW.assignation)
+        OR NOT (OLD.deleted_at <=> NEW.deleted_at) THEN
+        IF OLD.status IS NOT NULL AND OLD.deleted_at IS NULL THEN
+            UPDATE ProspectStatusCount SET total = total - 1
+            WHERE status = OLD.status AND assignation = IFNULL(OLD.assignation, 0);
+        END IF;
+        IF NEW.status IS NOT NULL AND NEW.deleted_at IS NULL THEN
+            INSERT INTO ProspectStatusCount (status, assignation, total)
+            VALUES (NEW.status, IFNULL(NEW.assignation, 0), 1)
+            ON DUPLICATE KEY UPDATE total = total + 1;
+        END IF;
+    END IF;
+END
+"""
+SQL_TRIGGER_COUNTER_DELETE = """
+CREATE TRIGGER compteur_statut_suppression
+    AFTER DELETE ON Prospect
+    FOR EACH ROW
+BEGIN
+    IF OLD.status IS NOT NULL AND OLD.deleted_at IS NULL THEN
+        UPDATE ProspectStatusCount SET total = total - 1
+        WHERE status = OLD.status AND assignation = IFNULL(OLD.assignation, 0);
+    END IF;
+END
+"""
+
+
+async def _m003_prospect_soft_delete(conn: aiomysql.Connection):
+    await add_column(conn, 'Prospect', 'deleted_at', "TIMESTAMP NULL DEFAULT NULL")
+    # Sélection des lignes à purger
+    await add_index(conn, 'Prospect', 'idx_prospect_suppression', ('deleted_at',))
+    # Sans la table des compteurs (base antérieure), ses triggers ne sont pas créés ici :
+    # la migration 006 crée la table, ses triggers et l'initialise
+    if not await table_exists(conn, 'ProspectStatusCount'):
+        logger.warning("Table ProspectStatusCount absente : triggers des compteurs de statuts non créés "
+                       "(ils le seront par la migration 006).")
+        return
+    await replace_trigger(conn, 'compteur_statut_ajout', SQL_TRIGGER_COUNTER_INSERT)
+    await replace_trigger(conn, 'compteur_statut_maj', SQL_TRIGGER_COUNTER_UPDATE)
+    await replace_trigger(conn, 'compteur_statut_suppression', SQL_TRIGGER_COUNTER_DELETE)
+
+
+async def _m004_prospect_dedup_keys(conn: aiomysql.Connection):
+    # Clés de dédoublonnage (prospectDedup) : colonnes virtuelles, seul leur index est stocké
+    await add_column(conn, 'Prospect', 'email_norm', "VARCHAR(100) GENERATED ALWAYS AS (LOWER(TRIM(email))) VIRTUAL")
+    await add_column(conn, 'Prospect', 'telephone_cle',
+                     "VARCHAR(9) GENERATED ALWAYS AS (RIGHT(REGEXP_REPLACE(telephone, '[^0-9]', ''), 9)) VIRTUAL")
+    await add_index(conn, 'Prospect', 'idx_prospect_email_norm', ('email_norm',))
+    await add_index(conn, 'Prospect', 'idx_prospect_telephone_cle', ('telephone_cle',))
+
+
+async def _m005_prospect_activity_summary(conn: aiomysql.Connection):
+    # Résumé d'activité dénormalisé, tenu à jour par interactionService
+    await add_column(conn, 'Prospect', 'last_interaction_at', "TIMESTAMP NULL DEFAULT NULL")
+    await add_column(conn, 'Prospect', 'last_interaction_type', "ENUM ('email', 'appel', 'sms', 'reunion') NULL")
+    await add_column(conn, 'Prospect', 'interaction_count', "INT NOT NULL DEFAULT 0")
+    # Prospects inactifs (tri par dernière interaction, les jamais contactés en premier)
+    await add_index(conn, 'Prospect', 'idx_prospect_inactivite', ('deleted_at', 'last_interaction_at', 'id_prospect'))
+    await add_index(conn, 'Prospect', 'idx_prospect_assign_inactivite',
+                    ('assignation', 'deleted_at', 'last_interaction_at', 'id_prospect'))
+    # Remplissage par plages d'ID (idempotent) : une migration interrompue reprend sans risque
+    result = await backfill_interaction_summary(conn=conn)
+    if not result['success']:
+        raise RuntimeError(result['message'])
+    logger.info(result['message'])
+
+
+# Compteurs de statuts et cumuls journaliers.
+# Le SQL d'une migration publiée est figé (suffixe = version) : une correction ultérieure d'un trigger
+# passe par une nouvelle constante et une nouvelle migration. La définition courante est celle de
+# scriptSQL/Prospectius.sql.
+SQL_CREATE_STATUS_COUNT_TABLE = """
+    CREATE TABLE IF NOT EXISTS ProspectStatusCount
+    (
+        status      ENUM ('nouveau', 'interesse', 'negociation', 'perdu', 'converti') NOT NULL,
+        assignation INT NOT NULL DEFAULT 0,
+        total       INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (status, assignation)
+    )
+"""
+SQL_CREATE_DAILY_ROLLUP_TABLE = """
+    CREATE TABLE IF NOT EXISTS ProspectDailyRollup
+    (
+        jour        DATE NOT NULL,
+        status      VARCHAR(20) NOT NULL DEFAULT '',
+        assignation INT NOT NULL DEFAULT 0,
+        type        VARCHAR(20) NOT NULL DEFAULT '',
+        created     INT NOT NULL DEFAULT 0,
+        converted   INT NOT NULL DEFAULT 0,
+        lost        INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (jour, status, assignation, type)
+    )
+"""
+SQL_TRIGGER_ROLLUP_INSERT_006 = """
+CREATE TRIGGER cumul_journalier_ajout
+    AFTER INSERT ON Prospect
+    FOR EACH ROW
+BEGIN
+    INSERT INTO ProspectDailyRollup (jour, status, assignation, type, created, converted, lost)
+    VALUES (DATE(NEW.creation), IFNULL(NEW.status, ''), IFNULL(NEW.assignation, 0), IFNULL(NEW.type, ''),
+            1, NEW.status <=> 'converti', NEW.status <=> 'perdu')
+    ON DUPLICATE KEY UPDATE created   = created + 1,
+                            converted = converted + (NEW.status <=> 'converti'),
+                            lost      = lost + (NEW.status <=> 'perdu');
+END
+"""
+SQL_TRIGGER_ROLLUP_UPDATE_006 = """
+CREATE TRIGGER cumul_journalier_maj
+    AFTER UPDATE ON Prospect
+    FOR EACH ROW
+BEGIN
+    IF NOT (OLD.status <=> NEW.status) AND NEW.status IN ('converti', 'perdu') THEN
+        INSERT INTO ProspectDailyRollup (jour, status, assignation, type, converted, lost)
+        VALUES (CURDATE(), NEW.status, IFNULL(NEW.assignation, 0), IFNULL(NEW.type, ''),
+                NEW.status = 'converti', NEW.status = 'perdu')
+        ON DUPLICATE KEY UPDATE converted = converted + (NEW.status = 'converti'),
+                                lost      = lost + (NEW.status = 'perdu');
+    END IF;
+END
+"""
+# Migration 007 : les suppressions logiques et restaurations sont reportées dans les cumuls
+SQL_TRIGGER_ROLLUP_UPDATE_007 = """
+CREATE TRIGGER cumul_journalier_maj
+    AFTER UPDATE ON Prospect
+    FOR EACH ROW
+BEGIN
+    IF OLD.deleted_at IS NULL AND NEW.deleted_at IS NOT NULL THEN
+        -- Suppression logique : la création et l'issue du prospect sont retirées des cumuls
+        INSERT INTO ProspectDailyRollup (jour, status, assignation, type, created)
+        VALUES (DATE(OLD.creation), IFNULL(OLD.status, ''), IFNULL(OLD.assignation, 0), IFNULL(OLD.type, ''), -1)
+        ON DUPLICATE KEY UPDATE created = created - 1;
+        IF OLD.status IN ('converti', 'perdu') THEN
+            INSERT INTO ProspectDailyRollup (jour, status, assignation, type, converted, lost)
+            VALUES (DATE(OLD.date_update), OLD.status, IFNULL(OLD.assignation, 0), IFNULL(OLD.type, ''),
+                    -(OLD.status = 'converti'), -(OLD.status = 'perdu'))
+            ON DUPLICATE KEY UPDATE converted = converted - (OLD.status = 'converti'),
+                                    lost      = lost - (OLD.status = 'perdu');
+        END IF;
+    ELSEIF OLD.deleted_at IS NOT NULL AND NEW.deleted_at IS NULL THEN
+        -- Restauration : mêmes lignes rajoutées (date_update est conservée par restore_prospect)
+        INSERT INTO ProspectDailyRollup (jour, status, assignation, type, created)
+        VALUES (DATE(NEW.creation), IFNULL(NEW.status, ''), IFNULL(NEW.assignation, 0), IFNULL(NEW.type, ''), 1)
+        ON DUPLICATE KEY UPDATE created = created + 1;
+        IF NEW.status IN ('converti', 'perdu') THEN
+            INSERT INTO ProspectDailyRollup (jour, status, assignation, type, converted, lost)
+            VALUES (DATE(NEW.date_update), NEW.status, IFNULL(NEW.assignation, 0), IFNULL(NEW.type, ''),
+                    NEW.status = 'converti', NEW.status = 'perdu')
+            ON DUPLICATE KEY UPDATE converted = converted + (NEW.status = 'converti'),
+                                    lost      = lost + (NEW.status = 'perdu');
+        END IF;
+    ELSEIF NEW.deleted_at IS NULL AND NOT (OLD.status <=> NEW.status) AND NEW.status IN ('converti', 'perdu') THEN
+        INSERT INTO ProspectDailyRollup (jour, status, assignation, type, converted, lost)
+        VALUES (CURDATE(), NEW.status, IFNULL(NEW.assignation, 0), IFNULL(NEW.type, ''),
+                NEW.status = 'converti', NEW.status = 'perdu')
+        ON DUPLICATE KEY UPDATE converted = converted + (NEW.status = 'converti'),
+                                lost      = lost + (NEW.status = 'perdu');
+    END IF;
+END
+"""
+
+# Migration 008 : les créations suivent le statut, le responsable et le type actuels du prospect,
+# comme dans rebuild_daily_rollup (auparavant : statut à la création, inconnu de la reconstruction)
+SQL_TRIGGER_ROLLUP_UPDATE_008 = """
+CREATE TRIGGER cumul_journalier_maj
+    AFTER UPDATE ON Prospect
+    FOR EACH ROW
+BEGIN
+    -- Créations : comptées sous le statut, le responsable et le type actuels (comme rebuild_daily_rollup),
+    -- déplacées quand l'un d'eux change, retirées à la suppression logique, rajoutées à la restauration
+    IF NOT (OLD.status <=> NEW.status) OR NOT (OLD.assignation <=> NEW.assignation)
+        OR NOT (OLD.type <=> NEW.type) OR NOT (OLD.deleted_at <=> NEW.deleted_at) THEN
+        IF OLD.deleted_at IS NULL THEN
+            INSERT INTO ProspectDailyRollup (jour, status, assignation, type, created)
+            VALUES (DATE(OLD.creation), IFNULL(OLD.status, ''), IFNULL(OLD.assignation, 0), IFNULL(OLD.type, ''), -1)
+            ON DUPLICATE KEY UPDATE created = created - 1;
+        END IF;
+        IF NEW.deleted_at IS NULL THEN
+            INSERT INTO ProspectDailyRollup (jour, status, assignation, type, created)
+            VALUES (DATE(NEW.creation), IFNULL(NEW.status, ''), IFNULL(NEW.assignation, 0), IFNULL(NEW.type, ''), 1)
+            ON DUPLICATE KEY UPDATE created = created + 1;
+        END IF;
+    END IF;
+
+    -- Conversions et pertes
+    IF OLD.deleted_at IS NULL AND NEW.deleted_at IS NOT NULL THEN
+        IF OLD.status IN ('converti', 'perdu') THEN
+            INSERT INTO ProspectDailyRollup (jour, status, assignation, type, converted, lost)
+            VALUES (DATE(OLD.date_update), OLD.status, IFNULL(OLD.assignation, 0), IFNULL(OLD.type, ''),
+                    -(OLD.status = 'converti'), -(OLD.status = 'perdu'))
+            ON DUPLICATE KEY UPDATE converted = converted - (OLD.status = 'converti'),
+                                    lost      = lost - (OLD.status = 'perdu');
+        END IF;
+    ELSEIF OLD.deleted_at IS NOT NULL AND NEW.deleted_at IS NULL THEN
+        IF NEW.status IN ('converti', 'perdu') THEN
+            INSERT INTO ProspectDailyRollup (jour, status, assignation, type, converted, lost)
+            VALUES (DATE(NEW.date_update), NEW.status, IFNULL(NEW.assignation, 0), IFNULL(NEW.type, ''),
+                    NEW.status = 'converti', NEW.status = 'perdu')
+            ON DUPLICATE KEY UPDATE converted = converted + (NEW.status = 'converti'),
+                                    lost      = lost + (NEW.status = 'perdu');
+        END IF;
+    ELSEIF NEW.deleted_at IS NULL AND NOT (OLD.status <=> NEW.status) AND NEW.status IN ('converti', 'perdu') THEN
+        INSERT INTO ProspectDailyRollup (jour, status, assignation, type, converted, lost)
+        VALUES (CURDATE(), NEW.status, IFNULL(NEW.assignation, 0), IFNULL(NEW.type, ''),
+                NEW.status = 'converti', NEW.status = 'perdu')
+        ON DUPLICATE KEY UPDATE converted = converted + (NEW.status = 'converti'),
+                                lost      = lost + (NEW.status = 'perdu');
+    END IF;
+END
+"""
+
+# Migration 009 : chaque valeur des cumuls est retirée sous les clés exactes où elle a été ajoutée.
+# date_statut (date du dernier changement de statut) remplace CURDATE() à l'ajout et date_update,
+# modifiée par toute écriture, au retrait ; les conversions/pertes suivent, comme les créations,
+# le statut, le responsable et le type actuels.
+SQL_TRIGGER_STATUS_DATE_INSERT_009 = """
+CREATE TRIGGER date_statut_ajout
+    BEFORE INSERT ON Prospect
+    FOR EACH ROW
+BEGIN
+    IF NEW.date_statut IS NULL THEN
+        SET NEW.date_statut = IFNULL(NEW.creation, NOW());
+    END IF;
+END
+"""
+SQL_TRIGGER_STATUS_DATE_UPDATE_009 = """
+CREATE TRIGGER date_statut_maj
+    BEFORE UPDATE ON Prospect
+    FOR EACH ROW
+BEGIN
+    IF NOT (OLD.status <=> NEW.status) THEN
+        SET NEW.date_statut = NOW();
+    END IF;
+END
+"""
+SQL_TRIGGER_ROLLUP_INSERT_009 = """
+CREATE TRIGGER cumul_journalier_ajout
+    AFTER INSERT ON Prospect
+    FOR EACH ROW
+BEGIN
+    INSERT INTO ProspectDailyRollup (jour, status, assignation, type, created)
+    VALUES (DATE(NEW.creation), IFNULL(NEW.status, ''), IFNULL(NEW.assignation, 0), IFNULL(NEW.type, ''), 1)
+    ON DUPLICATE KEY UPDATE created = created + 1;
+    IF NEW.status IN ('converti', 'perdu') THEN
+        INSERT INTO ProspectDailyRollup (jour, status, assignation, type, converted, lost)
+        VALUES (DATE(NEW.date_statut), NEW.status, IFNULL(NEW.assignation, 0), IFNULL(NEW.type, ''),
+                NEW.status = 'converti', NEW.status = 'perdu')
+        ON DUPLICATE KEY UPDATE converted = converted + (NEW.status = 'converti'),
+                                lost      = lost + (NEW.status = 'perdu');
+    END IF;
+END
+"""
+SQL_TRIGGER_ROLLUP_UPDATE_009 = """
+CREATE TRIGGER cumul_journalier_maj
+    AFTER UPDATE ON Prospect
+    FOR EACH ROW
+BEGIN
+    -- Un prospect est compté sous (création, statut, responsable, type) et, s'il est converti ou perdu,
+    -- sous (date_statut, statut, responsable, type). Si l'une de ces clés change, la contribution de
+    -- l'ancienne ligne est retirée exactement où elle avait été ajoutée, puis celle de la nouvelle ajoutée.
+    -- Une ligne supprimée logiquement ne contribue pas (retirée à la suppression, rajoutée à la restauration).
+    IF NOT (OLD.status <=> NEW.status) OR NOT (OLD.assignation <=> NEW.assignation)
+        OR NOT (OLD.type <=> NEW.type) OR NOT (OLD.deleted_at <=> NEW.deleted_at)
+        OR NOT (OLD.creation <=> NEW.creation) OR NOT (OLD.date_statut <=> NEW.date_statut) THEN
+        IF OLD.deleted_at IS NULL THEN
+            INSERT INTO ProspectDailyRollup (jour, status, assignation, type, created)
+            VALUES (DATE(OLD.creation), IFNULL(OLD.status, ''), IFNULL(OLD.assignation, 0), IFNULL(OLD.type, ''), -1)
+            ON DUPLICATE KEY UPDATE created = created - 1;
+            IF OLD.status IN ('converti', 'perdu') THEN
+                INSERT INTO ProspectDailyRollup (jour, status, assignation, type, converted, lost)
+                VALUES (DATE(OLD.date_statut), OLD.status, IFNULL(OLD.assignation, 0), IFNULL(OLD.type, ''),
+                        -(OLD.status = 'converti'), -(OLD.status = 'perdu'))
+                ON DUPLICATE KEY UPDATE converted = converted - (OLD.status = 'converti'),
+                                        lost      = lost - (OLD.status = 'perdu');
+            END IF;
+        END IF;
+        IF NEW.deleted_at IS NULL THEN
+            INSERT INTO ProspectDailyRollup (jour, status, assignation, type, created)
+            VALUES (DATE(NEW.creation), IFNULL(NEW.status, ''), IFNULL(NEW.assignation, 0), IFNULL(NEW.type, ''), 1)
+            ON DUPLICATE KEY UPDATE created = created + 1;
+            IF NEW.status IN ('converti', 'perdu') THEN
+                INSERT INTO ProspectDailyRollup (jour, status, assignation, type, converted, lost)
+                VALUES (DATE(NEW.date_statut), NEW.status, IFNULL(NEW.assignation, 0), IFNULL(NEW.type, ''),
+                        NEW.status = 'converti', NEW.status = 'perdu')
+                ON DUPLICATE KEY UPDATE converted = converted + (NEW.status = 'converti'),
+                                        lost      = lost + (NEW.status = 'perdu');
+            END IF;
+        END IF;
+    END IF;
+END
+"""
+
+
+async def _m006_search_and_report_objects(conn: aiomysql.Connection):
+    # Bases créées avant la recherche indexée et les tables de rapports : objets du script SQL manquants
+    await add_column(conn, 'Prospect', 'telephone_norm',
+                     "VARCHAR(30) GENERATED ALWAYS AS (REGEXP_REPLACE(telephone, '[^0-9]', '')) STORED")
+    await add_index(conn, 'Prospect', 'idx_prospect_telephone_norm', ('telephone_norm',))
+    await add_index(conn, 'Prospect', 'ft_prospect_recherche', ('nomp', 'prenomp', 'email'), kind="FULLTEXT INDEX")
+
+    await execute_query(SQL_CREATE_STATUS_COUNT_TABLE, conn=conn)
+    await execute_query(SQL_CREATE_DAILY_ROLLUP_TABLE, conn=conn)
+    await replace_trigger(conn, 'compteur_statut_ajout', SQL_TRIGGER_COUNTER_INSERT)
+    await replace_trigger(conn, 'compteur_statut_maj', SQL_TRIGGER_COUNTER_UPDATE)
+    await replace_trigger(conn, 'compteur_statut_suppression', SQL_TRIGGER_COUNTER_DELETE)
+    await replace_trigger(conn, 'cumul_journalier_ajout', SQL_TRIGGER_ROLLUP_INSERT_006)
+    await replace_trigger(conn, 'cumul_journalier_maj', SQL_TRIGGER_ROLLUP_UPDATE_006)
+
+    # Initialisation, une fois les triggers en place : les écritures concurrentes ne sont pas perdues.
+    # Les compteurs sont toujours réconciliés (sans effet s'ils sont justes) ; les cumuls ne sont
+    # reconstruits que s'ils sont vides (table créée ou migration interrompue avant ce point).
+    result = await reconcile_status_counters(fix=True)
+    if not result['success']:
+        raise RuntimeError(result['message'])
+    logger.info(f"Compteurs de statuts: {result['message']}")
+    if await execute_query("SELECT 1 FROM ProspectDailyRollup LIMIT 1", fetch_one=True, conn=conn) is None:
+        result = await rebuild_daily_rollup()
+        if not result['success']:
+            raise RuntimeError(result['message'])
+        logger.info(result['message'])
+
+
+async def _m007_rollup_soft_delete(conn: aiomysql.Connection):
+    # Les cumuls journaliers ignorent les prospects supprimés logiquement, comme les compteurs de statuts
+    await replace_trigger(conn, 'cumul_journalier_maj', SQL_TRIGGER_ROLLUP_UPDATE_007)
+    # Les suppressions antérieures restent comptées : les cumuls sont reconstruits sans elles
+    result = await rebuild_daily_rollup()
+    if not result['success']:
+        raise RuntimeError(result['message'])
+    logger.info(result['message'])
+
+
+
+async def _m008_rollup_current_keys(conn: aiomysql.Connection):
+    # Mêmes clés pour les triggers et la reconstruction des cumuls journaliers
+    await replace_trigger(conn, 'cumul_journalier_maj', SQL_TRIGGER_ROLLUP_UPDATE_008)
+    # Les créations déjà comptées sous leur statut initial sont reclassées sous le statut actuel
+    result = await rebuild_daily_rollup()
+    if not result['success']:
+        raise RuntimeError(result['message'])
+    logger.info(result['message'])
+
+
+
+async def _m009_rollup_status_date(conn: aiomysql.Connection):
+    await add_column(conn, 'Prospect', 'date_statut', "TIMESTAMP NULL DEFAULT NULL")
+    # Triggers BEFORE d'abord : les lignes écrites pendant le remplissage ont déjà leur date_statut
+    await replace_trigger(conn, 'date_statut_ajout', SQL_TRIGGER_STATUS_DATE_INSERT_009)
+    await replace_trigger(conn, 'date_statut_maj', SQL_TRIGGER_STATUS_DATE_UPDATE_009)
+
+    # Historique des statuts non conservé : la dernière mise à jour est la meilleure approximation
+    # (date_update inchangée). Par plages d'ID, idempotent : une migration interrompue reprend sans risque.
+    sql_fill = """
+               UPDATE Prospect
+               SET date_statut = date_update,
+                   date_update = date_update
+               WHERE id_prospect > %s
+                 AND id_prospect <= %s
+                 AND date_statut IS NULL \
+               """
+    row = await execute_query("SELECT COALESCE(MAX(id_prospect), 0) AS max_id FROM Prospect", fetch_one=True, conn=conn)
+    max_id = row['max_id'] if row else 0
+    for start in range(0, max_id, MIGRATION_BACKFILL_CHUNK_SIZE):
+        await execute_query(sql_fill, (start, start + MIGRATION_BACKFILL_CHUNK_SIZE), conn=conn, timeout=0)
+
+    await replace_trigger(conn, 'cumul_journalier_ajout', SQL_TRIGGER_ROLLUP_INSERT_009)
+    await replace_trigger(conn, 'cumul_journalier_maj', SQL_TRIGGER_ROLLUP_UPDATE_009)
+    # Les valeurs déjà comptées aux anciennes dates sont recalculées sur date_statut
+    result = await rebuild_daily_rollup()
+    if not result['success']:
+        raise RuntimeError(result['message'])
+    logger.info(result['message'])
+
+
+# Liste ordonnée ; une migration publiée n'est jamais modifiée, on en ajoute une nouvelle
+MIGRATIONS: List[Migration] = [
+    {"version": 1, "nom": "index_liste_prospects", "appliquer": _m001_prospect_list_indexes},
+    {"version": 2, "nom": "index_historique_interactions", "appliquer": _m002_interaction_history_indexes},
+    {"version": 3, "nom": "suppression_logique_prospects", "appliquer": _m003_prospect_soft_delete},
+    {"version": 4, "nom": "cles_dedoublonnage_prospects", "appliquer": _m004_prospect_dedup_keys},
+    {"version": 5, "nom": "resume_activite_prospects", "appliquer": _m005_prospect_activity_summary},
+    {"version": 6, "nom": "recherche_et_tables_rapports", "appliquer": _m006_search_and_report_objects},
+    {"version": 7, "nom": "cumuls_suppression_logique", "appliquer": _m007_rollup_soft_delete},
+    {"version": 8, "nom": "cumuls_cles_actuelles", "appliquer": _m008_rollup_current_keys},
+    {"version": 9, "nom": "cumuls_date_statut", "appliquer": _m009_rollup_status_date},
+]
+
+
+# --- Exécution ---
+
+async def _applied_versions(conn: Optional[aiomysql.Connection] = None) -> List[int]:
+    await execute_query(SQL_CREATE_MIGRATION_TABLE, conn=conn)
+    rows = await execute_query("SELECT version FROM SchemaMigration ORDER BY version", fetch_all=True, conn=conn)
+    return [row['version'] for row in rows or []]
+
+
+async def check_schema_version() -> Dict[str, Any]:
+    """
+    État du schéma au démarrage : version appliquée, migrations en attente et migrations
+    inconnues (base migrée par une version plus récente de l'application).
+    """
+    applied = await _applied_versions()
+    known = {m["version"] for m in MIGRATIONS}
+    pending = [m for m in MIGRATIONS if m["version"] not in set(applied)]
+    return {
+        "version_actuelle": max(applied, default=0),
+        "version_attendue": max(known, default=0),
+        "en_attente": [f"{m['version']:03d}_{m['nom']}" for m in pending],
+        "inconnues": sorted(set(applied) - known),
+        "a_jour": not pending,
+    }
+
+
+async def apply_migrations(target_version: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Applique dans l'ordre les migrations en attente (jusqu'à target_version incluse si fournie).
+
+    Les migrations s'exécutent sur une connexion dédiée qui détient le verrou MIGRATION_LOCK_NAME.
+    Chaque migration appliquée est enregistrée dans SchemaMigration ; en cas d'échec, les
+    suivantes ne sont pas tentées et la migration fautive sera rejouée au prochain démarrage.
+    """
+    applied_now: List[str] = []
+    try:
+        async with connection() as conn:
+            lock = await execute_query("SELECT GET_LOCK(%s, %s) AS acquis",
+                                       (MIGRATION_LOCK_NAME, MIGRATION_LOCK_TIMEOUT),
+                                       fetch_one=True, conn=conn, timeout=MIGRATION_LOCK_TIMEOUT + 5)
+            if not lock or lock['acquis'] != 1:
+                return {"success": False, "message": "Migrations déjà en cours sur une autre instance.",
+                        "appliquees": applied_now}
+            try:
+                # Relu sous verrou : une autre instance a pu appliquer des migrations entre-temps
+                applied = set(await _applied_versions(conn))
+                for migration in MIGRATIONS:
+                    version = migration["version"]
+                    if version in applied or (target_version is not None and version > target_version):
+                        continue
+
+                    label = f"{version:03d}_{migration['nom']}"
+                    logger.info(f"Application de la migration {label}...")
+                    started = time.perf_counter()
+                    await migration["appliquer"](conn)
+                    duration_ms = int((time.perf_counter() - started) * 1000)
+                    await execute_query("INSERT INTO SchemaMigration (version, nom, duree_ms) VALUES (%s, %s, %s)",
+                                        (version, migration['nom'], duration_ms), conn=conn)
+                    applied_now.append(label)
+                    logger.info(f"Migration {label} appliquée en {duration_ms} ms.")
+            finally:
+                await execute_query("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK_NAME,), conn=conn)
+    except Exception as e:
+        return {"success": False, "message": f"Échec de la migration du schéma: {e}", "appliquees": applied_now}
+
+    if not applied_now:
+        return {"success": True, "message": "Schéma à jour, aucune migration à appliquer.", "appliquees": applied_now}
+    return {"success": True, "message": f"{len(applied_now)} migration(s) appliquée(s).", "appliquees": applied_now}
@@ -142,9 +142,202 @@ CREATE TABLE Prospect
     creation    TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     date_update    TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     assignation INT,
-    FOREIGN KEY (assignation) REFERENCES Account(id_compte)
+    -- Suppression logique : renseignée par delete_prospect, la ligne est purgée plus tard par lots
+    deleted_at  TIMESTAMP NULL DEFAULT NULL,
+    -- Dernier changement de statut (triggers date_statut_*) : date des conversions/pertes dans les cumuls
+    date_statut TIMESTAMP NULL DEFAULT NULL,
+    -- Résumé d'activité, tenu à jour par interactionService à chaque écriture sur Interaction
+    last_interaction_at   TIMESTAMP NULL DEFAULT NULL,
+    last_interaction_type ENUM ('email', 'appel', 'sms', 'reunion') NULL,
+    interaction_count     INT NOT NULL DEFAULT 0,
+    -- Téléphone réduit à ses chiffres, pour la recherche par préfixe (indexée)
+    telephone_norm VARCHAR(30) GENERATED ALWAYS AS (REGEXP_REPLACE(telephone, '[^0-9]', '')) STORED,
+    -- Clés de dédoublonnage (prospectDedup) : email normalisé, 9 derniers chiffres du téléphone
+    email_norm  VARCHAR(100) GENERATED ALWAYS AS (LOWER(TRIM(email))) VIRTUAL,
+    telephone_cle VARCHAR(9) GENERATED ALWAYS AS (RIGHT(REGEXP_REPLACE(telephone, '[^0-9]', ''), 9)) VIRTUAL,
+    FOREIGN KEY (assignation) REFERENCES Account(id_compte),
+    -- Listes filtrées et paginées (tri date_update DESC, id_prospect DESC), cohortes par création
+    INDEX idx_prospect_assign_status_maj (assignation, status, date_update, id_prospect),
+    INDEX idx_prospect_status_maj (status, date_update, id_prospect),
+    INDEX idx_prospect_maj (date_update, id_prospect),
+    INDEX idx_prospect_creation (creation),
+    INDEX idx_prospect_suppression (deleted_at),
+    -- Prospects inactifs (sans interaction depuis N jours, jamais contactés en premier)
+    INDEX idx_prospect_inactivite (deleted_at, last_interaction_at, id_prospect),
+    INDEX idx_prospect_assign_inactivite (assignation, deleted_at, last_interaction_at, id_prospect),
+    INDEX idx_prospect_telephone_norm (telephone_norm),
+    INDEX idx_prospect_email_norm (email_norm),
+    INDEX idx_prospect_telephone_cle (telephone_cle),
+    -- Recherche plein texte classée par pertinence (MATCH ... AGAINST)
+    FULLTEXT INDEX ft_prospect_recherche (nomp, prenomp, email)
 );
 
+/*
+    Base existante : telephone_norm, ft_prospect_recherche, ProspectStatusCount, ProspectDailyRollup
+    et leurs triggers sont créés puis initialisés par la migration 006 (Back/migrationManager.py).
+*/
+
+/*
+    Compteurs de prospects par statut et par responsable.
+    Maintenus incrémentalement par les triggers ci-dessous : les rapports (statService) lisent
+    cette table au lieu d'agréger toute la table Prospect.
+    assignation = 0 : prospect non assigné.
+    Les prospects supprimés logiquement (deleted_at renseigné) ne sont pas comptés.
+    En cas de doute, statService.reconcile_status_counters() reconstruit la table et signale les écarts.
+*/
+CREATE TABLE ProspectStatusCount
+(
+    status      ENUM ('nouveau', 'interesse', 'negociation', 'perdu', 'converti') NOT NULL,
+    assignation INT NOT NULL DEFAULT 0,
+    total       INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (status, assignation)
+);
+
+DELIMITER $$
+
+CREATE TRIGGER compteur_statut_ajout
+    AFTER INSERT ON Prospect
+    FOR EACH ROW
+BEGIN
+    IF NEW.status IS NOT NULL AND NEW.deleted_at IS NULL THEN
+        INSERT INTO ProspectStatusCount (status, assignation, total)
+        VALUES (NEW.status, IFNULL(NEW.assignation, 0), 1)
+        ON DUPLICATE KEY UPDATE total = total + 1;
+    END IF;
+END$$
+
+CREATE TRIGGER compteur_statut_maj
+    AFTER UPDATE ON Prospect
+    FOR EACH ROW
+BEGIN
+    IF NOT (OLD.status <=> NEW.status) OR NOT (OLD.assignation <=> NEW.assignation)
+        OR NOT (OLD.deleted_at <=> NEW.deleted_at) THEN
+        IF OLD.status IS NOT NULL AND OLD.deleted_at IS NULL THEN
+            UPDATE ProspectStatusCount SET total = total - 1
+            WHERE status = OLD.status AND assignation = IFNULL(OLD.assignation, 0);
+        END IF;
+        IF NEW.status IS NOT NULL AND NEW.deleted_at IS NULL THEN
+            INSERT INTO ProspectStatusCount (status, assignation, total)
+            VALUES (NEW.status, IFNULL(NEW.assignation, 0), 1)
+            ON DUPLICATE KEY UPDATE total = total + 1;
+        END IF;
+    END IF;
+END$$
+
+CREATE TRIGGER compteur_statut_suppression
+    AFTER DELETE ON Prospect
+    FOR EACH ROW
+BEGIN
+    -- Une ligne supprimée logiquement a déjà été décomptée
+    IF OLD.status IS NOT NULL AND OLD.deleted_at IS NULL THEN
+        UPDATE ProspectStatusCount SET total = total - 1
+        WHERE status = OLD.status AND assignation = IFNULL(OLD.assignation, 0);
+    END IF;
+END$$
+
+DELIMITER ;
+
+/*
+    Cumuls journaliers pour les rapports temporels, par (jour, statut, responsable, type).
+    - created   : prospects créés ce jour, comptés sous leur statut, responsable et type actuels
+    - converted : prospects passés ce jour au statut 'converti' (date_statut) et toujours convertis
+    - lost      : prospects passés ce jour au statut 'perdu' (date_statut) et toujours perdus
+    Chaque valeur est retirée sous les clés exactes où elle a été ajoutée (le prospect les porte :
+    creation, date_statut, statut, responsable, type) : un prospect supprimé logiquement est retiré des
+    cumuls et y est rajouté s'il est restauré. Mêmes clés que rebuild_daily_rollup() : maintenance
+    incrémentale et reconstruction donnent les mêmes nombres.
+    Alimentée incrémentalement par les triggers ci-dessous ; statService.rebuild_daily_rollup()
+    la reconstruit à partir de la table Prospect (initialisation d'une base existante).
+    assignation = 0 : non assigné ; type = '' : type non renseigné.
+*/
+CREATE TABLE ProspectDailyRollup
+(
+    jour        DATE NOT NULL,
+    status      VARCHAR(20) NOT NULL DEFAULT '',
+    assignation INT NOT NULL DEFAULT 0,
+    type        VARCHAR(20) NOT NULL DEFAULT '',
+    created     INT NOT NULL DEFAULT 0,
+    converted   INT NOT NULL DEFAULT 0,
+    lost        INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (jour, status, assignation, type)
+);
+
+DELIMITER $$
+
+CREATE TRIGGER date_statut_ajout
+    BEFORE INSERT ON Prospect
+    FOR EACH ROW
+BEGIN
+    IF NEW.date_statut IS NULL THEN
+        SET NEW.date_statut = IFNULL(NEW.creation, NOW());
+    END IF;
+END$$
+
+CREATE TRIGGER date_statut_maj
+    BEFORE UPDATE ON Prospect
+    FOR EACH ROW
+BEGIN
+    IF NOT (OLD.status <=> NEW.status) THEN
+        SET NEW.date_statut = NOW();
+    END IF;
+END$$
+
+CREATE TRIGGER cumul_journalier_ajout
+    AFTER INSERT ON Prospect
+    FOR EACH ROW
+BEGIN
+    INSERT INTO ProspectDailyRollup (jour, status, assignation, type, created)
+    VALUES (DATE(NEW.creation), IFNULL(NEW.status, ''), IFNULL(NEW.assignation, 0), IFNULL(NEW.type, ''), 1)
+    ON DUPLICATE KEY UPDATE created = created + 1;
+    IF NEW.status IN ('converti', 'perdu') THEN
+        INSERT INTO ProspectDailyRollup (jour, status, assignation, type, converted, lost)
+        VALUES (DATE(NEW.date_statut), NEW.status, IFNULL(NEW.assignation, 0), IFNULL(NEW.type, ''),
+                NEW.status = 'converti', NEW.status = 'perdu')
+        ON DUPLICATE KEY UPDATE converted = converted + (NEW.status = 'converti'),
+                                lost      = lost + (NEW.status = 'perdu');
+    END IF;
+END$$
+
+CREATE TRIGGER cumul_journalier_maj
+    AFTER UPDATE ON Prospect
+    FOR EACH ROW
+BEGIN
+    -- Un prospect est compté sous (création, statut, responsable, type) et, s'il est converti ou perdu,
+    -- sous (date_statut, statut, responsable, type). Si l'une de ces clés change, la contribution de
+    -- l'ancienne ligne est retirée exactement où elle avait été ajoutée, puis celle de la nouvelle ajoutée.
+    -- Une ligne supprimée logiquement ne contribue pas (retirée à la suppression, rajoutée à la restauration).
+    IF NOT (OLD.status <=> NEW.status) OR NOT (OLD.assignation <=> NEW.assignation)
+        OR NOT (OLD.type <=> NEW.type) OR NOT (OLD.deleted_at <=> NEW.deleted_at)
+        OR NOT (OLD.creation <=> NEW.creation) OR NOT (OLD.date_statut <=> NEW.date_statut) THEN
+        IF OLD.deleted_at IS NULL THEN
+            INSERT INTO ProspectDailyRollup (jour, status, assignation, type, created)
+            VALUES (DATE(OLD.creation), IFNULL(OLD.status, ''), IFNULL(OLD.assignation, 0), IFNULL(OLD.type, ''), -1)
+            ON DUPLICATE KEY UPDATE created = created - 1;
+            IF OLD.status IN ('converti', 'perdu') THEN
+                INSERT INTO ProspectDailyRollup (jour, status, assignation, type, converted, lost)
+                VALUES (DATE(OLD.date_statut), OLD.status, IFNULL(OLD.assignation, 0), IFNULL(OLD.type, ''),
+                        -(OLD.status = 'converti'), -(OLD.status = 'perdu'))
+                ON DUPLICATE KEY UPDATE converted = converted - (OLD.status = 'converti'),
+                                        lost      = lost - (OLD.status = 'perdu');
+            END IF;
+        END IF;
+        IF NEW.deleted_at IS NULL THEN
+            INSERT INTO ProspectDailyRollup (jour, status, assignation, type, created)
+            VALUES (DATE(NEW.creation), IFNULL(NEW.status, ''), IFNULL(NEW.assignation, 0), IFNULL(NEW.type, ''), 1)
+            ON DUPLICATE KEY UPDATE created = created + 1;
+            IF NEW.status IN ('converti', 'perdu') THEN
+                INSERT INTO ProspectDailyRollup (jour, status, assignation, type, converted, lost)
+                VALUES (DATE(NEW.date_statut), NEW.status, IFNULL(NEW.assignation, 0), IFNULL(NEW.type, ''),
+                        NEW.status = 'converti', NEW.status = 'perdu')
+                ON DUPLICATE KEY UPDATE converted = converted + (NEW.status = 'converti'),
+                                        lost      = lost + (NEW.status = 'perdu');
+            END IF;
+        END IF;
+    END IF;
+END$$
+
+DELIMITER ;
+
 CREATE TABLE Interaction (
     id_interaction INT AUTO_INCREMENT PRIMARY KEY,
     id_prospect INT,
@@ -153,7 +346,23 @@ CREATE TABLE Interaction (
     note TEXT,
     date_interaction TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (id_prospect) REFERENCES Prospect(id_prospect),
-    FOREIGN KEY (id_compte) REFERENCES Account(id_compte)
+    FOREIGN KEY (id_compte) REFERENCES Account(id_compte),
+    -- Historique d'un prospect (ORDER BY date_interaction DESC) et requêtes par période
+    INDEX idx_interaction_prospect_date (id_prospect, date_interaction),
+    INDEX idx_interaction_date (date_interaction)
+);
+
+/*
+    Versions du schéma appliquées par Back/migrationManager.py.
+    Une base existante est mise à niveau au démarrage de l'application (migrations non destructives,
+    sans DROP) ; sur une base créée par ce script, les migrations constatent que les index existent déjà.
+*/
+CREATE TABLE SchemaMigration
+(
+    version     INT PRIMARY KEY,
+    nom         VARCHAR(100) NOT NULL,
+    applique_le TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    duree_ms    INT NOT NULL DEFAULT 0
 );
 
 /*
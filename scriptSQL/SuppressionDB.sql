@@ -3,7 +3,10 @@
 */
 
 # Suppression des Tables
+DROP TABLE IF EXISTS SchemaMigration;
 DROP TABLE IF EXISTS Interaction;
+DROP TABLE IF EXISTS ProspectStatusCount;
+DROP TABLE IF EXISTS ProspectDailyRollup;
 DROP TABLE IF EXISTS Prospect;
 DROP TABLE IF EXISTS Account;
 
@@ -0,0 +1,15 @@
+/*
+    Données de test de la base Prospectius
+
+    Les jeux de données de test (performance) ne sont pas écrits ici à la main : ils sont générés
+    de façon déterministe par Back/Benchmark/dataGenerator.py, par INSERT multi-lignes.
+
+        python -m Back.Benchmark.benchmarkSuite generer --echelle petit    -- 10 000 interactions
+        python -m Back.Benchmark.benchmarkSuite generer --echelle moyen    -- 1 000 000 interactions
+        python -m Back.Benchmark.benchmarkSuite generer --echelle grand    -- 10 000 000 interactions
+
+    Puis, pour mesurer les services et comparer avec l'exécution précédente :
+
+        python -m Back.Benchmark.benchmarkSuite mesurer --etiquette <nom>
+*/
+USE Prospectius;
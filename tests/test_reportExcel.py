@@ -0,0 +1,72 @@
+# test_reportExcel.py - Débit et mémoire de l'export Excel en flux (source factice, sans base de données)
+import asyncio
+from datetime import datetime
+
+from openpyxl import load_workbook
+
+from Back.Excel import reportExcel
+
+TOTAL_ROWS = 50_000
+CHUNK_SIZE = reportExcel.DEFAULT_EXPORT_CHUNK_SIZE
+# Le classeur write-only et la lecture par blocs gardent la mémoire bornée, quel que soit le volume
+MAX_RSS_INCREASE_MB = 100
+
+
+def _fake_stream(total_rows: int):
+    """Remplace stream_query : produit les lignes par blocs, générées à la demande."""
+    async def stream_query(sql, params=None, chunk_size=CHUNK_SIZE):
+        when = datetime(2025, 10, 1)
+        for start in range(0, total_rows, chunk_size):
+            yield [
+                {"id_prospect": i, "nomp": f"Nom{i}", "prenomp": f"Prenom{i}", "telephone": f"+261 34 {i:07d}",
+                 "email": f"prospect{i}@exemple.mg", "adresse": f"Lot {i} Antananarivo", "type": "particulier",
+                 "status": "nouveau", "username_assigne": "commercial", "creation": when, "date_update": when,
+                 "last_interaction_at": when, "interaction_count": i % 50}
+                for i in range(start, min(start + chunk_size, total_rows))
+            ]
+    return stream_query
+
+
+def test_export_prospects_streams_with_bounded_memory(tmp_path, monkeypatch):
+    monkeypatch.setattr(reportExcel, "stream_query", _fake_stream(TOTAL_ROWS))
+    path = tmp_path / "prospects.xlsx"
+
+    result = asyncio.run(reportExcel.export_prospects_to_excel(str(path), chunk_size=CHUNK_SIZE))
+
+    assert result["success"], result["message"]
+    assert result["lignes"] == TOTAL_ROWS
+    assert result["lignes_par_sec"] > 0
+    print(f"\nExport de {TOTAL_ROWS} lignes: {result['lignes_par_sec']} lignes/s, "
+          f"pic RSS {result['pic_rss_mo']} Mo, hausse {result['hausse_rss_mo']} Mo")
+    if result["hausse_rss_mo"] is not None:
+        assert result["hausse_rss_mo"] < MAX_RSS_INCREASE_MB
+
+    # Le mode write-only n'enregistre pas les dimensions de la feuille : les lignes sont comptées
+    sheet = load_workbook(path, read_only=True)["Prospects"]
+    assert sum(1 for _ in sheet.iter_rows(values_only=True)) == TOTAL_ROWS + 1  # en-tête compris
+
+
+def test_export_prospects_cleans_text_and_splits_sheets(tmp_path, monkeypatch):
+    # Limite réduite : 1 en-tête + 9 lignes par feuille, 20 lignes -> 3 feuilles
+    monkeypatch.setattr(reportExcel, "EXCEL_MAX_ROWS", 10)
+    stream = _fake_stream(20)
+
+    async def stream_with_control_chars(sql, params=None, chunk_size=CHUNK_SIZE):
+        async for rows in stream(sql, params, chunk_size):
+            for row in rows:
+                row["adresse"] = f"Lot\x0b{row['id_prospect']}\x00"
+            yield rows
+
+    monkeypatch.setattr(reportExcel, "stream_query", stream_with_control_chars)
+    path = tmp_path / "prospects.xlsx"
+
+    result = asyncio.run(reportExcel.export_prospects_to_excel(str(path), chunk_size=7))
+
+    assert result["success"], result["message"]
+    assert result["lignes"] == 20
+    workbook = load_workbook(path, read_only=True)
+    assert workbook.sheetnames == ["Prospects", "Prospects (2)", "Prospects (3)"]
+    pages = [list(workbook[name].iter_rows(values_only=True)) for name in workbook.sheetnames]
+    assert [len(rows) for rows in pages] == [10, 10, 3]
+    assert all(rows[0][0] == "ID" for rows in pages)
+    assert pages[0][1][5] == "Lot0"